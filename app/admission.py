@@ -0,0 +1,309 @@
+# app/admission.py
+"""
+LLM 호출 앞단의 admission control / 우선순위 부하 차단.
+
+점심 피크에 키오스크가 한꺼번에 말을 걸면 모든 턴이 업스트림 대기로 느려지다 타임아웃에 걸린다.
+그 대신 진행 중인 LLM 턴 수를 ADMISSION_MAX_INFLIGHT로 묶고, 넘치는 요청은 짧은 우선순위 대기열에 세운다.
+
+- 우선순위: 0 = CONFIRM 화면이거나 결제 의사 발화, 1 = 주문 단계(SELECT_*/CUSTOMIZE_* 등), 2 = GREETING(인사/잡담),
+  3 = /analyze/batch 재생 (살아 있는 키오스크 턴보다 항상 뒤)
+- 같은 우선순위 안에서는 매장(storeId → kioskId → sessionId) 단위로 돌아가며 꺼낸다
+  (한 매장의 키오스크 여러 대가 대기열을 독차지하지 않도록)
+- 대기열에서 기다리다가 턴 마감(LLM_TURN_DEADLINE) 안에 답할 수 없게 되면
+  (대기 시간 + 최근 업스트림 p50 > 마감) 일찍 포기하고 scene에 맞는 짧은 안내로 응답한다 (shed)
+- 대기열이 가득 차면 가장 낮은 우선순위의 마지막 요청을 밀어내고, 새 요청이 더 낮으면 새 요청을 바로 shed
+
+llm_client가 fast-path / 응답 캐시 뒤, 업스트림 호출 전에 admission_controller.slot(req)로 감싼다.
+(대기 시간 히스토그램은 llm_client가 kiosk_llm_stage_seconds{stage="admission_wait"}로 기록)
+(이벤트 루프 스레드 하나에서만 쓰므로 락은 두지 않는다)
+"""
+import os
+import time
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional
+
+from .fast_router import is_payment_intent
+from .models import AnalyzeRequest, AnalyzeResponse, KioskAction
+from .resilience import default_policy, latency_tracker
+
+logger = logging.getLogger(__name__)
+
+# --------------------------------------------------
+# 설정
+# - ADMISSION_ENABLED: false면 대기열 없이 바로 호출 (llm_client의 LLM_MAX_CONCURRENCY 세마포어만)
+# - ADMISSION_MAX_INFLIGHT: 동시에 진행할 LLM 턴 수
+# - ADMISSION_QUEUE_SIZE: 대기열 길이 (짧게: 오래 기다려 봐야 어차피 마감에 걸림)
+# - ADMISSION_MAX_WAIT: 대기열에서 기다릴 최대 시간(초), 마감 기준보다 짧으면 이 값이 우선
+# - ADMISSION_DEFAULT_SERVICE: 업스트림 지연 표본이 없을 때 가정할 처리 시간(초)
+# --------------------------------------------------
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+ADMISSION_MAX_INFLIGHT = int(os.getenv("ADMISSION_MAX_INFLIGHT", "64"))
+ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", "128"))
+ADMISSION_MAX_WAIT = float(os.getenv("ADMISSION_MAX_WAIT", "3"))
+ADMISSION_DEFAULT_SERVICE = float(os.getenv("ADMISSION_DEFAULT_SERVICE", "1.5"))
+
+PRIORITY_PAYMENT = 0
+PRIORITY_ORDER = 1
+PRIORITY_SMALL_TALK = 2
+PRIORITY_BATCH = 3
+PRIORITY_NAMES = ("payment", "order", "small_talk", "batch")
+
+# shed 이유
+SHED_QUEUE_FULL = "queue_full"    # 대기열이 가득 차서 들어가지도 못함
+SHED_EVICTED = "evicted"          # 더 급한 요청에 밀려남
+SHED_DEADLINE = "deadline"        # 기다리면 마감 안에 답할 수 없음
+
+# scene별 짧은 안내 (LLM 없이 바로)
+_SHED_TEXTS = {
+    "CONFIRM": "지금 주문이 많아 음성 안내가 조금 늦어지고 있어요. 화면의 결제하기 버튼을 누르시면 바로 결제하실 수 있어요.",
+    "SELECT_BURGER": "지금 주문이 많아 답변이 조금 늦어지고 있어요. 화면에서 원하시는 버거를 눌러 바로 담으실 수도 있어요.",
+    "CUSTOMIZE_BURGER": "지금 주문이 많아 답변이 조금 늦어지고 있어요. 빼거나 추가할 재료를 화면에서 골라 주시거나 잠시 후 다시 말씀해 주세요.",
+    "SELECT_SIDE": "지금 주문이 많아 답변이 조금 늦어지고 있어요. 화면에서 사이드 메뉴를 골라 주시거나 잠시 후 다시 말씀해 주세요.",
+    "SELECT_DRINK": "지금 주문이 많아 답변이 조금 늦어지고 있어요. 화면에서 음료를 골라 주시거나 잠시 후 다시 말씀해 주세요.",
+}
+_SHED_DEFAULT_TEXT = "지금 주문이 많아 답변이 조금 늦어지고 있어요. 잠시 후 다시 한 번 말씀해 주시겠어요?"
+
+
+def request_priority(req: AnalyzeRequest) -> int:
+    if req.scene == "CONFIRM" or is_payment_intent(req):
+        return PRIORITY_PAYMENT
+    if req.scene in (None, "GREETING"):
+        return PRIORITY_SMALL_TALK
+    return PRIORITY_ORDER
+
+
+def tenant_key(req: AnalyzeRequest) -> str:
+    return req.storeId or req.kioskId or req.sessionId or "-"
+
+
+def shed_response(req: AnalyzeRequest) -> AnalyzeResponse:
+    """부하 차단 시 응답 (장바구니 변화 없음, 화면 유지)."""
+    return AnalyzeResponse(
+        assistant_text=_SHED_TEXTS.get(req.scene, _SHED_DEFAULT_TEXT),
+        actions=[KioskAction(type="NONE", menuId=None, qty=1, customize=None)],
+        should_finish=False,
+        next_scene=req.scene,
+    )
+
+
+class _Waiter:
+    __slots__ = ("future", "priority", "tenant", "enqueued_at")
+
+    def __init__(self, future: asyncio.Future, priority: int, tenant: str):
+        self.future = future
+        self.priority = priority
+        self.tenant = tenant
+        self.enqueued_at = time.monotonic()
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        max_inflight: int = ADMISSION_MAX_INFLIGHT,
+        queue_size: int = ADMISSION_QUEUE_SIZE,
+        max_wait: float = ADMISSION_MAX_WAIT,
+    ):
+        self.max_inflight = max_inflight
+        self.queue_size = queue_size
+        self.max_wait = max_wait
+        self.inflight = 0
+        self.depth = 0
+        # 우선순위별: tenant → 대기 중인 요청 (OrderedDict 순서 = 다음에 꺼낼 tenant 순서)
+        self._queues: List["OrderedDict[str, Deque[_Waiter]]"] = [OrderedDict() for _ in PRIORITY_NAMES]
+
+        self.admitted = [0] * len(PRIORITY_NAMES)
+        self.queued = [0] * len(PRIORITY_NAMES)
+        self.shed: Dict[str, List[int]] = {
+            reason: [0] * len(PRIORITY_NAMES) for reason in (SHED_QUEUE_FULL, SHED_EVICTED, SHED_DEADLINE)
+        }
+        self.max_depth = 0
+        self.wait_total = 0.0
+        self.wait_count = 0
+
+    # ---------------------------------
+    # 대기열
+    # ---------------------------------
+    def _push(self, w: _Waiter) -> None:
+        queue = self._queues[w.priority]
+        tenant_queue = queue.get(w.tenant)
+        if tenant_queue is None:
+            tenant_queue = queue[w.tenant] = deque()
+        tenant_queue.append(w)
+        self.depth += 1
+        self.max_depth = max(self.max_depth, self.depth)
+
+    def _remove(self, w: _Waiter) -> None:
+        queue = self._queues[w.priority]
+        tenant_queue = queue.get(w.tenant)
+        if tenant_queue is None or w not in tenant_queue:
+            return
+        tenant_queue.remove(w)
+        if not tenant_queue:
+            del queue[w.tenant]
+        self.depth -= 1
+
+    def _pop_next(self) -> Optional[_Waiter]:
+        """가장 높은 우선순위에서, 차례가 된 tenant의 가장 오래된 요청 (tenant는 뒤로 돌린다)."""
+        for queue in self._queues:
+            if not queue:
+                continue
+            tenant, tenant_queue = next(iter(queue.items()))
+            w = tenant_queue.popleft()
+            if tenant_queue:
+                queue.move_to_end(tenant)
+            else:
+                del queue[tenant]
+            self.depth -= 1
+            return w
+        return None
+
+    def _evict_lowest(self, priority: int) -> bool:
+        """priority보다 낮은(숫자가 큰) 우선순위의 가장 최근 요청 하나를 밀어낸다."""
+        for p in range(len(self._queues) - 1, priority, -1):
+            queue = self._queues[p]
+            if not queue:
+                continue
+            tenant = next(reversed(queue))
+            w = queue[tenant].pop()
+            if not queue[tenant]:
+                del queue[tenant]
+            self.depth -= 1
+            self.shed[SHED_EVICTED][p] += 1
+            if not w.future.done():
+                w.future.set_result(False)
+            return True
+        return False
+
+    def _wait_budget(self) -> float:
+        """지금 대기열에 들어가는 요청이 기다려도 되는 시간 (마감 - 예상 처리 시간)."""
+        expected = latency_tracker.percentile(50) or ADMISSION_DEFAULT_SERVICE
+        return min(self.max_wait, default_policy.deadline - expected)
+
+    # ---------------------------------
+    # 획득 / 반납
+    # ---------------------------------
+    async def acquire(self, priority: int, tenant: str) -> bool:
+        """자리를 얻으면 True (반드시 release), shed되면 False."""
+        if self.inflight < self.max_inflight and self.depth == 0:
+            self.inflight += 1
+            self.admitted[priority] += 1
+            self._record_wait(0.0)
+            return True
+
+        budget = self._wait_budget()
+        if budget <= 0:
+            self.shed[SHED_DEADLINE][priority] += 1
+            return False
+        if self.depth >= self.queue_size and not self._evict_lowest(priority):
+            self.shed[SHED_QUEUE_FULL][priority] += 1
+            return False
+
+        w = _Waiter(asyncio.get_running_loop().create_future(), priority, tenant)
+        self._push(w)
+        self.queued[priority] += 1
+        try:
+            admitted = await asyncio.wait_for(asyncio.shield(w.future), timeout=budget)
+        except asyncio.TimeoutError:
+            self._remove(w)
+            if w.future.done() and w.future.result():
+                # 시간 초과와 동시에 자리를 받은 경우: 받은 자리는 쓴다
+                admitted = True
+            else:
+                w.future.cancel()
+                self.shed[SHED_DEADLINE][priority] += 1
+                return False
+        except asyncio.CancelledError:
+            # 요청 자체가 취소됨 (클라이언트 끊김): 이미 받은 자리가 있으면 돌려준다
+            self._remove(w)
+            if w.future.done() and not w.future.cancelled() and w.future.result():
+                self.release()
+            else:
+                w.future.cancel()
+            raise
+        if admitted:
+            self.admitted[priority] += 1
+            self._record_wait(time.monotonic() - w.enqueued_at)
+        return admitted
+
+    def release(self) -> None:
+        while True:
+            w = self._pop_next()
+            if w is None:
+                self.inflight -= 1
+                return
+            if not w.future.done():
+                # 자리를 그대로 넘긴다 (inflight 유지)
+                w.future.set_result(True)
+                return
+
+    def _record_wait(self, seconds: float) -> None:
+        self.wait_total += seconds
+        self.wait_count += 1
+
+    @asynccontextmanager
+    async def slot(self, req: AnalyzeRequest, priority: Optional[int] = None) -> AsyncIterator[bool]:
+        """
+        async with admission_controller.slot(req) as admitted:
+            if not admitted: return shed_response(req)
+        priority를 주면 request_priority(req) 대신 그 값 (배치 재생은 PRIORITY_BATCH).
+        """
+        if not ADMISSION_ENABLED:
+            yield True
+            return
+        if priority is None:
+            priority = request_priority(req)
+        admitted = await self.acquire(priority, tenant_key(req))
+        if not admitted:
+            logger.warning(
+                f"[ADMISSION] shed scene={req.scene}, priority={PRIORITY_NAMES[priority]}, "
+                f"inflight={self.inflight}, depth={self.depth}"
+            )
+        try:
+            yield admitted
+        finally:
+            if admitted:
+                self.release()
+
+    # ---------------------------------
+    # 지표
+    # ---------------------------------
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": ADMISSION_ENABLED,
+            "inflight": self.inflight,
+            "max_inflight": self.max_inflight,
+            "queue_depth": self.depth,
+            "queue_depth_by_priority": {
+                name: sum(len(q) for q in self._queues[p].values()) for p, name in enumerate(PRIORITY_NAMES)
+            },
+            "max_queue_depth": self.max_depth,
+            "admitted": dict(zip(PRIORITY_NAMES, self.admitted)),
+            "queued": dict(zip(PRIORITY_NAMES, self.queued)),
+            "shed": {reason: dict(zip(PRIORITY_NAMES, counts)) for reason, counts in self.shed.items()},
+            "avg_wait_ms": round(self.wait_total / self.wait_count * 1000, 1) if self.wait_count else 0.0,
+            "wait_budget_s": round(self._wait_budget(), 3),
+        }
+
+    def render(self, prefix: str = "kiosk_admission") -> str:
+        """Prometheus 텍스트 (대기열 깊이 / 진행 중 / shed 카운터). 대기 시간 히스토그램은 kiosk_llm_stage_seconds."""
+        out = [
+            f"# HELP {prefix}_inflight LLM turns currently admitted",
+            f"# TYPE {prefix}_inflight gauge",
+            f"{prefix}_inflight {self.inflight}",
+            f"# HELP {prefix}_queue_depth Requests waiting for admission",
+            f"# TYPE {prefix}_queue_depth gauge",
+        ]
+        for p, name in enumerate(PRIORITY_NAMES):
+            out.append(f'{prefix}_queue_depth{{priority="{name}"}} {sum(len(q) for q in self._queues[p].values())}')
+        out.append(f"# HELP {prefix}_shed_total Requests answered with a shed response instead of the LLM")
+        out.append(f"# TYPE {prefix}_shed_total counter")
+        for reason, counts in self.shed.items():
+            for p, name in enumerate(PRIORITY_NAMES):
+                out.append(f'{prefix}_shed_total{{reason="{reason}",priority="{name}"}} {counts[p]}')
+        return "\n".join(out) + "\n"
+
+
+admission_controller = AdmissionController()
@@ -0,0 +1,217 @@
+# app/batch.py
+"""
+녹화된 턴(JSONL, 한 줄에 AnalyzeRequest 하나)을 한꺼번에 재생하는 배치 실행기.
+/analyze/batch 엔드포인트와 CLI가 같은 run_batch를 사용한다.
+
+CLI 예시:
+    python -m app.batch turns.jsonl -o results.jsonl --concurrency 16 --rate 8 --order completion
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import logging
+from typing import Any, AsyncIterable, AsyncIterator, Dict, Iterable, Optional, Union
+
+from pydantic import ValidationError
+
+from .admission import PRIORITY_BATCH
+from .llm_client import call_llm_with_status
+from .menu_catalog import MenuVersionMismatch, apply_catalog_menu
+from .serialization import parse_analyze_request
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONCURRENCY = 8
+# /analyze/batch에서 받을 수 있는 concurrency 상한 (요청 하나가 LLM 호출을 무한정 열지 못하게)
+MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "32"))
+
+
+class RateLimiter:
+    """초당 rate개까지만 통과시키는 단순 간격 기반 limiter (rate<=0이면 제한 없음)."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            if self._next > now:
+                await asyncio.sleep(self._next - now)
+                now = self._next
+            self._next = now + self.interval
+
+
+async def _aiter_lines(lines: Union[Iterable[str], AsyncIterable[str]]) -> AsyncIterator[str]:
+    if hasattr(lines, "__aiter__"):
+        async for line in lines:
+            yield line
+    else:
+        for line in lines:
+            yield line
+
+
+async def _run_one(index: int, line: str, use_cache: bool) -> Dict[str, Any]:
+    """한 줄 처리. 결과에는 항상 index / latency_ms / response / error가 들어간다."""
+    started = time.perf_counter()
+    result: Dict[str, Any] = {"index": index, "response": None, "error": None}
+    try:
+        req = parse_analyze_request(line)
+        apply_catalog_menu(req)
+        if req.scene is None:
+            raise ValueError("scene is required in batch mode")
+        # 배치 재생은 살아 있는 키오스크 턴보다 admission 우선순위가 낮다
+        response, is_fallback = await call_llm_with_status(req, use_cache=use_cache, priority=PRIORITY_BATCH)
+        result["response"] = response.model_dump()
+        if is_fallback:
+            result["error"] = "fallback"
+    except ValidationError as e:
+        result["error"] = f"invalid_request: {e.errors()[:3]}"
+    except ValueError as e:  # JSON 디코딩 실패 (fast 모드의 orjson)
+        result["error"] = f"invalid_request: {e}"
+    except MenuVersionMismatch as e:
+        result["error"] = f"menu_version_mismatch: current={e.current}"
+    except Exception as e:
+        logger.exception(f"[BATCH] item {index} failed")
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["latency_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    return result
+
+
+async def run_batch(
+    lines: Union[Iterable[str], AsyncIterable[str]],
+    concurrency: int = DEFAULT_CONCURRENCY,
+    rate: float = 0.0,
+    ordered: bool = True,
+    use_cache: bool = False,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    JSONL 줄들을 동시에 concurrency개까지, 초당 rate개 이하로 실행하고 결과를 흘려보낸다.
+    - ordered=True: 입력 순서대로 (앞 항목이 끝날 때까지 뒤 결과는 버퍼링, 최대 concurrency*4개)
+    - ordered=False: 끝나는 순서대로
+    빈 줄은 건너뛰되 index는 입력 줄 번호(0부터)를 그대로 쓴다.
+    """
+    concurrency = max(1, concurrency)
+    limiter = RateLimiter(rate)
+    slots = asyncio.Semaphore(concurrency)
+    max_buffered = concurrency * 4
+    pending: Dict[int, "asyncio.Task[Dict[str, Any]]"] = {}
+    order = []  # 제출 순서 (ordered 모드에서 다음에 내보낼 항목)
+
+    def _start(index: int, line: str) -> None:
+        task = asyncio.create_task(_run_one(index, line, use_cache))
+        task.add_done_callback(lambda _: slots.release())
+        pending[index] = task
+        order.append(index)
+
+    def _ready():
+        if ordered:
+            while order and pending[order[0]].done():
+                yield pending.pop(order.pop(0)).result()
+        else:
+            for index in [i for i, t in pending.items() if t.done()]:
+                order.remove(index)
+                yield pending.pop(index).result()
+
+    try:
+        index = -1
+        async for line in _aiter_lines(lines):
+            index += 1
+            if not line.strip():
+                continue
+
+            await slots.acquire()
+            if ordered and len(pending) >= max_buffered:
+                # 맨 앞 항목이 늦어 버퍼가 가득 차면 그것부터 기다린다
+                await asyncio.wait({pending[order[0]]})
+            await limiter.wait()
+            _start(index, line)
+
+            for item in _ready():
+                yield item
+
+        while pending:
+            if ordered:
+                await asyncio.wait({pending[order[0]]})
+            else:
+                await asyncio.wait(set(pending.values()), return_when=asyncio.FIRST_COMPLETED)
+            for item in _ready():
+                yield item
+    finally:
+        for task in pending.values():
+            task.cancel()
+
+
+# ======================================
+# CLI
+# ======================================
+
+def _percentile(values, p: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    k = min(len(values) - 1, max(0, int(round(p / 100 * (len(values) - 1)))))
+    return values[k]
+
+
+async def _main_async(args) -> int:
+    src = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    dst = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+
+    latencies = []
+    errors = 0
+    started = time.perf_counter()
+    try:
+        async for item in run_batch(
+            src,
+            concurrency=args.concurrency,
+            rate=args.rate,
+            ordered=args.order == "input",
+            use_cache=args.use_cache,
+        ):
+            latencies.append(item["latency_ms"])
+            errors += item["error"] is not None
+            dst.write(json.dumps(item, ensure_ascii=False) + "\n")
+    finally:
+        if src is not sys.stdin:
+            src.close()
+        if dst is not sys.stdout:
+            dst.close()
+
+    elapsed = time.perf_counter() - started
+    summary = {
+        "items": len(latencies),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 2),
+        "throughput_per_s": round(len(latencies) / elapsed, 2) if elapsed else None,
+        "latency_ms_p50": _percentile(latencies, 50),
+        "latency_ms_p95": _percentile(latencies, 95),
+        "latency_ms_p99": _percentile(latencies, 99),
+    }
+    print(json.dumps(summary, ensure_ascii=False), file=sys.stderr)
+    return 1 if errors and args.fail_on_error else 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="AnalyzeRequest JSONL 배치 재생")
+    parser.add_argument("input", help="입력 JSONL 경로 ('-'는 stdin)")
+    parser.add_argument("-o", "--output", default="-", help="결과 JSONL 경로 (기본 stdout)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--rate", type=float, default=0.0, help="초당 최대 시작 건수 (0=제한 없음)")
+    parser.add_argument("--order", choices=["input", "completion"], default="input")
+    parser.add_argument("--use-cache", action="store_true", help="응답 캐시 사용 (기본: 항상 LLM 호출)")
+    parser.add_argument("--fail-on-error", action="store_true", help="에러 항목이 있으면 종료 코드 1")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    return asyncio.run(_main_async(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
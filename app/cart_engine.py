@@ -0,0 +1,220 @@
+# app/cart_engine.py
+"""
+장바구니 상태 엔진.
+
+지금까지는 actions만 돌려주고 Spring이 그것을 반영한 뒤 다음 턴에 장바구니 전체를 다시 보내 줬다.
+이제는 _normalize_actions를 거친 ADD_ITEM / REMOVE_ITEM / CUSTOMIZE를 서버가 직접 장바구니에 반영하고,
+AnalyzeResponse에 actions와 함께 결과 장바구니(cart)와 합계 금액(totalPrice)을 돌려준다.
+
+- menuId → MenuItem 맵은 카탈로그 버전(또는 인라인 메뉴 내용)마다 한 번만 만든다
+  → 이름/가격 조회와 장바구니 요약이 O(장바구니)
+- 장바구니 줄은 menuId당 하나 (같은 menuId가 여러 줄로 오면 합친다)
+- 수량은 1~CART_MAX_QTY로 자르고, 실제로 반영된 만큼만 액션 qty에 남긴다
+- 같은 메뉴에 CUSTOMIZE가 여러 번 오면 재료별로 합친다 (나중 요청이 우선: "양파 빼" 뒤 "양파 넣어" → add)
+- 반영할 수 없는 액션(장바구니에 없는 메뉴 제거/커스터마이즈 등)은 NONE으로 바꾼다
+"""
+import os
+import logging
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from .menu_catalog import get_catalog, menu_fingerprint
+from .models import AnalyzeRequest, AnalyzeResponse, Cart, CartItem, Customization, KioskAction, MenuItem
+from .prompt_cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# --------------------------------------------------
+# 설정
+# - CART_ENGINE_ENABLED: false면 응답에 cart/totalPrice를 싣지 않음 (예전처럼 Spring이 반영)
+# - CART_MAX_QTY: 메뉴 한 줄의 최대 수량 (LLM이 "100개"를 내도 여기서 자름)
+# --------------------------------------------------
+CART_ENGINE_ENABLED = os.getenv("CART_ENGINE_ENABLED", "true").lower() == "true"
+CART_MAX_QTY = int(os.getenv("CART_MAX_QTY", "20"))
+
+
+def _none_action() -> KioskAction:
+    return KioskAction(type="NONE", menuId=None, qty=1, customize=None)
+
+
+def clamp_qty(raw, default: int = 1) -> int:
+    """LLM이 준 qty를 1~CART_MAX_QTY 정수로 (숫자가 아니면 default)."""
+    try:
+        qty = int(raw)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(qty, CART_MAX_QTY))
+
+
+# ======================================
+# menuId 인덱스
+# ======================================
+
+_index_cache = LRUCache(32)
+
+
+def cart_index(menu: Sequence[MenuItem]) -> Mapping[str, MenuItem]:
+    """
+    menuId → MenuItem.
+    카탈로그 메뉴면 화면(menuIds)과 상관없이 카탈로그 전체 맵을 쓴다
+    (장바구니에는 지금 화면에 없는 메뉴도 들어 있으므로).
+    """
+    key = menu_fingerprint(menu)
+    if isinstance(key, str):
+        return get_catalog().by_id
+    index = _index_cache.get(key)
+    if index is None:
+        index = {m.menuId: m for m in menu}
+        _index_cache.put(key, index)
+    return index
+
+
+# ======================================
+# 장바구니 반영
+# ======================================
+
+def _clean(names: Iterable[str]) -> List[str]:
+    return [n.strip() for n in names if isinstance(n, str) and n.strip()]
+
+
+def merge_customization(base: Optional[Customization], extra: Optional[Customization]) -> Optional[Customization]:
+    """두 커스터마이즈를 합친다. 같은 재료가 add/remove에 모두 있으면 extra(나중 요청) 쪽을 따른다."""
+    if extra is None:
+        return base
+    add = _clean(base.add) if base else []
+    remove = _clean(base.remove) if base else []
+    for name in _clean(extra.add):
+        if name in remove:
+            remove.remove(name)
+        if name not in add:
+            add.append(name)
+    for name in _clean(extra.remove):
+        if name in add:
+            add.remove(name)
+        if name not in remove:
+            remove.append(name)
+    if not add and not remove:
+        return None
+    return Customization(add=add, remove=remove)
+
+
+class _Line:
+    __slots__ = ("qty", "customize")
+
+    def __init__(self, qty: int, customize: Optional[Customization]):
+        self.qty = qty
+        self.customize = customize
+
+
+def apply_actions(
+    cart: Cart, actions: Sequence[KioskAction], index: Mapping[str, MenuItem]
+) -> Tuple[List[KioskAction], Cart]:
+    """
+    actions를 순서대로 cart에 반영한다.
+    반환: (실제로 반영된 내용으로 고친 actions, 결과 Cart)
+    """
+    lines: Dict[str, _Line] = {}
+    for ci in cart.items:
+        line = lines.get(ci.menuId)
+        if line is None:
+            lines[ci.menuId] = _Line(min(ci.qty, CART_MAX_QTY), ci.customize)
+        else:
+            line.qty = min(line.qty + ci.qty, CART_MAX_QTY)
+            line.customize = merge_customization(line.customize, ci.customize)
+
+    applied: List[KioskAction] = []
+    for a in actions:
+        if a.type == "NONE" or a.menuId is None:
+            applied.append(a)
+            continue
+
+        menu_id = a.menuId
+        line = lines.get(menu_id)
+
+        if a.type == "ADD_ITEM":
+            if menu_id not in index:
+                logger.warning(f"[CART] Unknown menuId in ADD_ITEM: {menu_id}")
+                applied.append(_none_action())
+                continue
+            current = line.qty if line else 0
+            added = min(clamp_qty(a.qty), CART_MAX_QTY - current)
+            if added <= 0:
+                applied.append(_none_action())
+                continue
+            if line is None:
+                line = lines[menu_id] = _Line(0, None)
+            line.qty += added
+            line.customize = merge_customization(line.customize, a.customize)
+            applied.append(a.model_copy(update={"qty": added}))
+
+        elif a.type == "REMOVE_ITEM":
+            if line is None:
+                applied.append(_none_action())
+                continue
+            removed = min(clamp_qty(a.qty), line.qty)
+            line.qty -= removed
+            if line.qty <= 0:
+                del lines[menu_id]
+            applied.append(a.model_copy(update={"qty": removed}))
+
+        elif a.type == "CUSTOMIZE":
+            if line is None:
+                # 단품 버거 menuId로 커스터마이즈가 왔는데 장바구니에는 그 버거의 세트가 있는 경우
+                menu_id = next(
+                    (mid for mid in lines if getattr(index.get(mid), "base_menu_id", None) == a.menuId),
+                    None,
+                )
+                line = lines.get(menu_id) if menu_id else None
+            if line is None or a.customize is None:
+                applied.append(_none_action())
+                continue
+            line.customize = merge_customization(line.customize, a.customize)
+            applied.append(a.model_copy(update={"menuId": menu_id}))
+
+    result = Cart(items=[
+        CartItem(menuId=menu_id, qty=line.qty, customize=line.customize)
+        for menu_id, line in lines.items()
+    ])
+    return applied, result
+
+
+def cart_total(cart: Cart, index: Mapping[str, MenuItem]) -> int:
+    """장바구니 합계 금액 (메뉴 정보가 없는 줄은 0원으로 계산)."""
+    total = 0
+    for ci in cart.items:
+        item = index.get(ci.menuId)
+        if item is not None:
+            total += item.price * ci.qty
+    return total
+
+
+def apply_to_response(req: AnalyzeRequest, response: AnalyzeResponse) -> AnalyzeResponse:
+    """
+    응답 actions를 이번 턴 장바구니에 반영해 cart/totalPrice를 채운 복사본.
+    (fast-path/캐시 응답 객체를 건드리지 않도록 항상 복사)
+    """
+    if not CART_ENGINE_ENABLED:
+        return response
+    index = cart_index(req.menu)
+    actions, cart = apply_actions(req.cart, response.actions, index)
+    return response.model_copy(
+        update={"actions": actions, "cart": cart, "totalPrice": cart_total(cart, index)}
+    )
+
+
+def describe_cart(req: AnalyzeRequest) -> List[str]:
+    """장바구니 줄별 설명 ("불고기버거(B003) x 2 (빼기: 양파)")."""
+    index = cart_index(req.menu)
+    lines = []
+    for ci in req.cart.items:
+        item = index.get(ci.menuId)
+        text = f"{item.name if item else ci.menuId}({ci.menuId}) x {ci.qty}"
+        if ci.customize is not None:
+            options = []
+            if ci.customize.add:
+                options.append("추가: " + ", ".join(ci.customize.add))
+            if ci.customize.remove:
+                options.append("빼기: " + ", ".join(ci.customize.remove))
+            if options:
+                text += " (" + " / ".join(options) + ")"
+        lines.append(text)
+    return lines
@@ -0,0 +1,185 @@
+# app/dialogue_state.py
+"""
+이전 대화를 원문 그대로 최근 N개씩 싣는 대신, 턴마다 갱신하는 작은 구조화 상태로 압축한다.
+
+- 확정된 주문 변경 / 답을 기다리는 질문 / 선호 / 알레르기를 DialogueState에 모은다
+  (이번 턴의 정규화된 actions와 발화에서 규칙으로 뽑으므로 LLM 호출이 더 들지 않음)
+- 프롬프트에는 이 상태 블록 + 최근 원문 DIALOGUE_RAW_TURNS개만 실으므로
+  대화가 길어져도 히스토리 섹션 크기가 거의 그대로이고, 앞에서 말한 "피클 빼 주세요"도 잊지 않는다
+- sessionId를 쓰면 세션에 상태를 저장해 두고 한 턴씩 갱신(save_turn),
+  세션 없이 history만 보내면 원문 창 밖의 오래된 발화에서 바로 뽑는다 (이 경우 actions는 알 수 없어 발화 기준 사실만)
+"""
+import os
+import re
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+from .menu_filter import dietary_facts
+from .models import AnalyzeRequest, DialogueState, HistoryTurn, KioskAction, MenuItem
+from .token_budget import fit_history, truncate_to_tokens
+from .tokens import estimate_tokens
+
+# --------------------------------------------------
+# 설정
+# - DIALOGUE_STATE_ENABLED: false면 예전처럼 최근 MAX_HISTORY_TURNS개 원문만 보냄
+# - DIALOGUE_RAW_TURNS: 상태 블록과 함께 원문으로 보낼 최근 발화 수 (user/assistant 각각 1개로 셈)
+# - DIALOGUE_MAX_FACTS: confirmed/preferences 목록별 최대 항목 수 (넘으면 오래된 것부터 버림)
+# --------------------------------------------------
+DIALOGUE_STATE_ENABLED = os.getenv("DIALOGUE_STATE_ENABLED", "true").lower() == "true"
+DIALOGUE_RAW_TURNS = int(os.getenv("DIALOGUE_RAW_TURNS", "2"))
+DIALOGUE_MAX_FACTS = int(os.getenv("DIALOGUE_MAX_FACTS", "4"))
+
+# 질문으로 보는 문장 끝 ("?"가 빠진 STT/TTS 문장도 잡도록)
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?。])\s+")
+_QUESTION_ENDINGS = ("까요", "나요", "세요?", "실래요", "겠어요", "을까", "할까")
+
+
+def _push(items: List[str], value: str, dedup: bool = True) -> None:
+    """dedup이면 중복을 맨 뒤로 옮기고, 넘치면 오래된 것부터 버린다."""
+    if dedup and value in items:
+        items.remove(value)
+    items.append(value)
+    del items[:-DIALOGUE_MAX_FACTS]
+
+
+def _question_in(text: str) -> Optional[str]:
+    """assistant 문장 중 마지막 질문 (없으면 None)."""
+    for sentence in reversed(_SENTENCE_SPLIT.split(text.strip())):
+        s = sentence.strip()
+        if s and (s.endswith("?") or s.rstrip(".!").endswith(_QUESTION_ENDINGS)):
+            return s
+    return None
+
+
+def _options(customize) -> str:
+    if customize is None:
+        return ""
+    parts = []
+    if customize.add:
+        parts.append("추가: " + ", ".join(customize.add))
+    if customize.remove:
+        parts.append("빼기: " + ", ".join(customize.remove))
+    return " (" + " / ".join(parts) + ")" if parts else ""
+
+
+def _note_user_text(state: DialogueState, text: str) -> None:
+    allergens, prefs = dietary_facts(text)
+    for a in allergens:
+        _push(state.allergies, a)
+    for p in prefs:
+        _push(state.preferences, p)
+
+
+def _note_actions(state: DialogueState, actions: Sequence[KioskAction], index: Mapping[str, MenuItem]) -> bool:
+    """actions를 confirmed/preferences에 반영. 장바구니를 바꾼 action이 있었으면 True."""
+    changed = False
+    for a in actions:
+        if a.type == "NONE" or not a.menuId:
+            continue
+        changed = True
+        item = index.get(a.menuId)
+        name = item.name if item else a.menuId
+        options = _options(a.customize)
+        if a.type == "ADD_ITEM":
+            _push(state.confirmed, f"{name} {a.qty or 1}개 담음{options}", dedup=False)
+        elif a.type == "REMOVE_ITEM":
+            _push(state.confirmed, f"{name} {a.qty or 1}개 뺌", dedup=False)
+        elif a.type == "CUSTOMIZE":
+            _push(state.confirmed, f"{name} 변경{options}", dedup=False)
+        if a.customize is not None:
+            # 같은 재료를 다음 메뉴에서도 빼 달라는 경우가 많으므로 선호로도 남긴다
+            for name_ in a.customize.remove:
+                _push(state.preferences, f"빼기: {name_}")
+            for name_ in a.customize.add:
+                _push(state.preferences, f"추가: {name_}")
+    return changed
+
+
+# ======================================
+# 갱신
+# ======================================
+
+def update_dialogue_state(
+    state: Optional[DialogueState],
+    user_text: str,
+    assistant_text: str,
+    actions: Sequence[KioskAction],
+    index: Mapping[str, MenuItem],
+) -> DialogueState:
+    """한 턴(사용자 발화 + 정규화된 actions + 응답 문장)을 반영한 새 상태."""
+    state = state.model_copy(deep=True) if state is not None else DialogueState()
+    _note_user_text(state, user_text)
+    changed = _note_actions(state, actions, index)
+    question = _question_in(assistant_text)
+    if question is not None:
+        state.pending = question
+    elif changed:
+        # 장바구니가 바뀌었으면 직전 질문에는 답한 것으로 본다
+        state.pending = None
+    state.turns += 1
+    return state
+
+
+def state_from_history(history: Sequence[HistoryTurn]) -> DialogueState:
+    """
+    세션 없이 history만 있을 때: 사용자 발화 원문에서 뽑을 수 있는 사실(알레르기/선호)만 모은다.
+    (actions를 모르니 답을 받았는지 알 수 없어 pending은 채우지 않음, 최근 질문은 원문 창에 있음)
+    """
+    state = DialogueState()
+    for h in history:
+        if h.role == "user":
+            _note_user_text(state, h.content)
+            state.turns += 1
+    return state
+
+
+def request_dialogue_state(req: AnalyzeRequest) -> DialogueState:
+    """이번 요청에 쓸 상태 (세션 값이 있으면 그것, 없으면 원문 창 밖의 history에서)."""
+    if req.dialogueState is not None:
+        return req.dialogueState
+    older = req.history[:-DIALOGUE_RAW_TURNS] if DIALOGUE_RAW_TURNS > 0 else req.history
+    return state_from_history(older)
+
+
+# ======================================
+# 프롬프트
+# ======================================
+
+def render_dialogue_state(state: DialogueState) -> str:
+    """프롬프트용 상태 블록 (비어 있으면 "")."""
+    lines = []
+    if state.confirmed:
+        lines.append("확정된 주문 변경: " + "; ".join(state.confirmed))
+    if state.allergies:
+        lines.append("알레르기: " + ", ".join(state.allergies) + " (든 메뉴는 권하지 말 것)")
+    if state.preferences:
+        lines.append("선호: " + ", ".join(state.preferences))
+    if state.pending:
+        lines.append("답을 기다리는 질문: " + state.pending)
+    if not lines:
+        return ""
+    return "[이전 대화 요약]\n" + "\n".join(lines)
+
+
+def compact_history(req: AnalyzeRequest, max_tokens: int) -> Tuple[List[Dict[str, str]], int]:
+    """
+    build_messages용 히스토리: 상태 블록(system) + 최근 원문 DIALOGUE_RAW_TURNS개.
+    상태 블록은 예산의 절반까지만 쓰고, 원문은 남은 예산 안에서 담는다.
+    반환: (messages에 넣을 dict 리스트, 사용한 토큰 수)
+    """
+    messages: List[Dict[str, str]] = []
+    used = 0
+    block = render_dialogue_state(request_dialogue_state(req))
+    if block:
+        block = truncate_to_tokens(block, max_tokens // 2)
+        used = estimate_tokens(block)
+        messages.append({"role": "system", "content": block})
+    raw, raw_tokens = fit_history(req.history, DIALOGUE_RAW_TURNS, max_tokens - used)
+    messages.extend(raw)
+    return messages, used + raw_tokens
+
+
+def dialogue_fingerprint(req: AnalyzeRequest) -> str:
+    """응답 캐시 키용 (상태 블록이 다르면 다른 답이 나올 수 있으므로)."""
+    if not DIALOGUE_STATE_ENABLED:
+        return ""
+    return render_dialogue_state(request_dialogue_state(req))
@@ -0,0 +1,359 @@
+# app/fast_router.py
+import os
+import re
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from .cart_engine import cart_index
+from .menu_catalog import menu_fingerprint
+from .menu_retrieval import lexical_matches
+from .models import AnalyzeRequest, AnalyzeResponse, KioskAction, MenuItem
+from .prompt_cache import LRUCache
+from .text_norm import compact, normalize_utterance
+
+logger = logging.getLogger(__name__)
+
+# --------------------------------------------------
+# 설정
+# - FAST_PATH_ENABLED: false면 라우터를 건너뛰고 항상 LLM 호출 (kill switch)
+# - FAST_PATH_MIN_CONFIDENCE: 이 값 이상일 때만 LLM 없이 바로 응답
+# --------------------------------------------------
+FAST_PATH_ENABLED = os.getenv("FAST_PATH_ENABLED", "true").lower() == "true"
+FAST_PATH_MIN_CONFIDENCE = float(os.getenv("FAST_PATH_MIN_CONFIDENCE", "0.85"))
+
+# 전체 발화가 정확히 일치할 때 / 핵심 구절만 포함할 때의 확신도
+EXACT_CONFIDENCE = 0.95
+CONTAINS_CONFIDENCE = 0.85
+
+# 질문/탐색 의도가 섞이면 규칙으로 답하지 않는다
+_QUESTION_MARKERS = ("?", "뭐", "어떤", "어떻게", "무슨", "추천", "있어", "있나", "얼마", "알레르기", "칼로리")
+
+
+def _norm_set(phrases) -> frozenset:
+    return frozenset(normalize_utterance(p) for p in phrases)
+
+
+# 결제/주문 완료 의사 (CONFIRM)
+_PAY_EXACT = _norm_set([
+    "결제할게요", "네 결제할게요", "결제해 주세요", "결제", "이대로 주세요", "그대로 주세요",
+    "이대로 할게요", "주문 완료", "주문 완료할게요", "다 됐어요", "다 됐어", "이대로 결제해 주세요",
+    "네 이대로 주세요", "네 그대로 주세요", "네 주문할게요",
+])
+_PAY_CONTAINS = ("결제할", "결제해", "주문완료")
+# 결제 구절이 있어도 장바구니를 고치려는 발화 ("주문완료 전에 하나 더 넣어줘")는 LLM에 맡긴다
+_EDIT_WORDS = ("넣어", "담아", "추가", "더", "빼", "바꿔", "변경", "말고", "잠깐", "취소", "대신")
+
+# 짧은 긍정 대답 (직전 assistant가 결제 여부를 물었을 때만 결제로 본다)
+_AFFIRM_EXACT = _norm_set(["네", "예", "응", "좋아요", "맞아요", "네 맞아요", "네 좋아요", "그래요"])
+_PAY_QUESTION_MARKERS = ("주문 도와드릴까요", "결제", "이대로 주문")
+
+# 커스터마이즈 없이 진행 (CUSTOMIZE_BURGER)
+_KEEP_EXACT = _norm_set([
+    "그대로 주세요", "그대로요", "기본으로 주세요", "야채는 기본으로", "그냥 주세요",
+    "괜찮아요", "없어요", "뺄 거 없어요", "그대로", "기본으로",
+])
+
+# 사이드/음료 거절 (SELECT_SIDE / SELECT_DRINK)
+_NO_SIDE_EXACT = _norm_set([
+    "사이드는 필요 없어요", "사이드 필요 없어요", "사이드는 괜찮아요", "사이드 안 먹을게요",
+    "필요 없어요", "괜찮아요", "없어요", "안 할게요", "됐어요",
+])
+_NO_DRINK_EXACT = _norm_set([
+    "음료는 필요 없어요", "음료 필요 없어요", "음료는 괜찮아요", "음료 안 마실게요",
+    "필요 없어요", "괜찮아요", "없어요", "안 할게요", "됐어요",
+])
+_DECLINE_CONTAINS = ("필요없", "안먹", "안마실")
+_DECLINE_EXACT = _NO_SIDE_EXACT | _NO_DRINK_EXACT
+
+# scene별로 바로 담을 수 있는 카테고리 / 담은 뒤 다음 scene
+_ADD_SCENES: Dict[str, Tuple[Tuple[str, ...], str]] = {
+    "GREETING": (("BURGER", "SET"), "CUSTOMIZE_BURGER"),
+    "SELECT_BURGER": (("BURGER", "SET"), "CUSTOMIZE_BURGER"),
+    "SELECT_SIDE": (("SIDE", "DESSERT"), "SELECT_DRINK"),
+    "SELECT_DRINK": (("DRINK", "DESSERT"), "CONFIRM"),
+}
+_ADD_FOLLOWUPS = {
+    "CUSTOMIZE_BURGER": "야채나 소스를 빼거나 추가하실까요?",
+    "SELECT_DRINK": "음료는 어떻게 하실까요?",
+    "CONFIRM": "주문 내용을 한 번 더 확인해드릴까요?",
+}
+
+# "콜라 두 잔", "감자튀김 2개" 같은 수량 표현
+_QTY_WORDS = {
+    "한": 1, "하나": 1, "두": 2, "둘": 2, "세": 3, "셋": 3, "네": 4, "넷": 4, "다섯": 5,
+}
+_QTY_PATTERN = re.compile(r"(\d+|하나|둘|셋|넷|다섯|한|두|세|네)(개|잔|세트|조각)?$")
+
+# 사이즈 표현 → CSV size 값
+_SIZE_SUFFIXES = {
+    "REGULAR": ("r", "레귤러", "보통", "작은거"),
+    "LARGE": ("l", "라지", "큰거", "큰사이즈", "라지로"),
+}
+_SIZE_MARK = re.compile(r"\s*\((R|L)\)\s*$")
+
+
+# ======================================
+# 메뉴 이름 인덱스 (정확 일치 / 별칭)
+# ======================================
+
+def _build_alias_index(menu: List[MenuItem]) -> Dict[str, MenuItem]:
+    """
+    정규화된 메뉴명/별칭 → MenuItem.
+    - "콜라 (R)" / "콜라 (L)": "콜라"는 R, "콜라라지"/"콜라l"은 L
+    - name_en도 별칭으로 등록
+    - 여러 메뉴가 같은 별칭을 가지면 모호하므로 제거
+    """
+    index: Dict[str, MenuItem] = {}
+    ambiguous = set()
+
+    def add(alias: str, item: MenuItem):
+        if not alias:
+            return
+        existing = index.get(alias)
+        if existing is not None and existing.menuId != item.menuId:
+            ambiguous.add(alias)
+            return
+        index[alias] = item
+
+    for m in menu:
+        for name in (m.name, m.name_en):
+            if not name:
+                continue
+            add(compact(name), m)
+            match = _SIZE_MARK.search(name)
+            if not match:
+                continue
+            base = compact(_SIZE_MARK.sub("", name))
+            size = "REGULAR" if match.group(1) == "R" else "LARGE"
+            if size == "REGULAR":
+                add(base, m)
+            for suffix in _SIZE_SUFFIXES[size]:
+                add(base + suffix, m)
+
+    for alias in ambiguous:
+        index.pop(alias, None)
+    return index
+
+
+_alias_cache = LRUCache(32)
+
+
+def _alias_index(menu: List[MenuItem]) -> Dict[str, MenuItem]:
+    key = menu_fingerprint(menu)
+    index = _alias_cache.get(key)
+    if index is None:
+        index = _build_alias_index(menu)
+        _alias_cache.put(key, index)
+    return index
+
+
+def _split_qty(norm: str) -> Tuple[str, int]:
+    match = _QTY_PATTERN.search(norm)
+    if not match or match.start() == 0:
+        return norm, 1
+    word = match.group(1)
+    # "세", "네" 같은 한 글자 수사는 단위(개/잔)가 붙었을 때만 수량으로 본다
+    if word in ("한", "두", "세", "네") and not match.group(2):
+        return norm, 1
+    qty = int(word) if word.isdigit() else _QTY_WORDS[word]
+    return norm[: match.start()], qty
+
+
+# ======================================
+# 응답 템플릿
+# ======================================
+
+def _response(req: AnalyzeRequest, text: str, next_scene: str,
+              actions: Optional[List[KioskAction]] = None,
+              should_finish: bool = False) -> AnalyzeResponse:
+    return AnalyzeResponse(
+        assistant_text=text,
+        actions=actions or [KioskAction(type="NONE", menuId=None, qty=1, customize=None)],
+        should_finish=should_finish,
+        next_scene=next_scene,
+    )
+
+
+def _cart_summary(req: AnalyzeRequest) -> str:
+    index = cart_index(req.menu)
+    parts = [
+        f"{index[ci.menuId].name if ci.menuId in index else ci.menuId} {ci.qty}개"
+        for ci in req.cart.items
+    ]
+    return ", ".join(parts)
+
+
+def _last_assistant_text(req: AnalyzeRequest) -> str:
+    for h in reversed(req.history):
+        if h.role == "assistant":
+            return h.content
+    return ""
+
+
+# ======================================
+# scene별 규칙
+# ======================================
+
+def _match(norm: str, exact: frozenset, contains: Tuple[str, ...] = ()) -> float:
+    if norm in exact:
+        return EXACT_CONFIDENCE
+    if contains and any(c in norm for c in contains):
+        return CONTAINS_CONFIDENCE
+    return 0.0
+
+
+def is_payment_intent(req: AnalyzeRequest) -> bool:
+    """결제/주문 완료 의사가 보이는 발화인지 (fast-path 확신도와 상관없이, admission 우선순위용)."""
+    norm = normalize_utterance(req.text)
+    return bool(_match(norm, _PAY_EXACT, _PAY_CONTAINS)) or "결제" in norm
+
+
+def _rule_confirm(req: AnalyzeRequest, norm: str):
+    confidence = _match(norm, _PAY_EXACT, _PAY_CONTAINS)
+    # 포함 매칭은 메뉴명이나 수정 표현이 섞이지 않았을 때만 ("결제해 주세요 아 잠깐 콜라도")
+    if confidence and norm not in _PAY_EXACT and (
+        any(w in norm for w in _EDIT_WORDS) or lexical_matches(req.text, req.menu, k=1)
+    ):
+        return None
+    if not confidence and norm in _AFFIRM_EXACT:
+        last = _last_assistant_text(req)
+        if any(marker in last for marker in _PAY_QUESTION_MARKERS):
+            confidence = EXACT_CONFIDENCE
+    if not confidence:
+        return None
+
+    if not req.cart.items:
+        text = "지금 장바구니가 비어 있어서 결제를 진행할 수 없어요. 먼저 주문하실 메뉴를 골라 주세요."
+        return confidence, "confirm_empty_cart", _response(req, text, "SELECT_BURGER")
+
+    text = f"현재 장바구니에는 {_cart_summary(req)}가 담겨 있어요. 결제 화면으로 안내해 드릴게요."
+    return confidence, "confirm_pay", _response(req, text, "CONFIRM", should_finish=True)
+
+
+def _rule_keep_as_is(req: AnalyzeRequest, norm: str):
+    confidence = _match(norm, _KEEP_EXACT)
+    if not confidence:
+        return None
+    text = "네, 기본 그대로 준비해 드릴게요. 이제 사이드 메뉴를 골라볼까요?"
+    return confidence, "customize_keep", _response(req, text, "SELECT_SIDE")
+
+
+def _rule_decline(req: AnalyzeRequest, norm: str):
+    # "콜라는 필요 없고 사이다 주세요"처럼 메뉴명이 섞인 거절은 LLM에 맡긴다
+    if norm not in _DECLINE_EXACT and lexical_matches(req.text, req.menu, k=1):
+        return None
+    if req.scene == "SELECT_SIDE":
+        confidence = _match(norm, _NO_SIDE_EXACT, _DECLINE_CONTAINS)
+        if confidence:
+            text = "네, 사이드는 빼드릴게요. 음료는 어떻게 하실까요?"
+            return confidence, "side_decline", _response(req, text, "SELECT_DRINK")
+    if req.scene == "SELECT_DRINK":
+        confidence = _match(norm, _NO_DRINK_EXACT, _DECLINE_CONTAINS)
+        if confidence:
+            text = "네, 음료는 빼드릴게요. 주문 내용을 한 번 더 확인해드릴까요?"
+            return confidence, "drink_decline", _response(req, text, "CONFIRM")
+    return None
+
+
+def _rule_add_item(req: AnalyzeRequest, norm: str):
+    if req.scene not in _ADD_SCENES:
+        return None
+    categories, next_scene = _ADD_SCENES[req.scene]
+
+    index = _alias_index(req.menu)
+    item, qty = index.get(norm), 1
+    if item is None:
+        name_part, qty = _split_qty(norm)
+        item = index.get(name_part)
+    if item is None or item.category not in categories:
+        return None
+
+    text = f"{item.name} {qty}개 담아드렸어요. {_ADD_FOLLOWUPS[next_scene]}"
+    action = KioskAction(type="ADD_ITEM", menuId=item.menuId, qty=qty, customize=None)
+    return EXACT_CONFIDENCE, "add_exact_name", _response(req, text, next_scene, [action])
+
+
+_SCENE_RULES = {
+    "GREETING": (_rule_add_item,),
+    "SELECT_BURGER": (_rule_add_item,),
+    "CUSTOMIZE_BURGER": (_rule_keep_as_is,),
+    "SELECT_SIDE": (_rule_decline, _rule_add_item),
+    "SELECT_DRINK": (_rule_decline, _rule_add_item),
+    "CONFIRM": (_rule_confirm,),
+}
+
+
+# ======================================
+# 통계
+# ======================================
+
+class FastPathStats:
+    """fast-path 적중률 카운터."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.total = 0
+        self.hits = 0
+        self.low_confidence = 0
+        self.by_rule: Dict[str, int] = {}
+
+    def record(self, rule: Optional[str], hit: bool) -> None:
+        with self._lock:
+            self.total += 1
+            if hit:
+                self.hits += 1
+                self.by_rule[rule] = self.by_rule.get(rule, 0) + 1
+            elif rule is not None:
+                self.low_confidence += 1
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "enabled": FAST_PATH_ENABLED,
+                "total": self.total,
+                "hits": self.hits,
+                "low_confidence": self.low_confidence,
+                "hit_rate": round(self.hits / self.total, 3) if self.total else 0.0,
+                "by_rule": dict(self.by_rule),
+            }
+
+
+fast_path_stats = FastPathStats()
+
+
+# ======================================
+# 외부 진입점
+# ======================================
+
+def route(req: AnalyzeRequest) -> Optional[AnalyzeResponse]:
+    """
+    LLM 호출 전에 규칙으로 처리 가능한 발화인지 본다.
+    확신도가 FAST_PATH_MIN_CONFIDENCE 이상이면 완성된 AnalyzeResponse,
+    아니면 None (→ LLM으로 넘김).
+    """
+    if not FAST_PATH_ENABLED:
+        return None
+
+    rules = _SCENE_RULES.get(req.scene)
+    if not rules or any(marker in req.text for marker in _QUESTION_MARKERS):
+        fast_path_stats.record(None, False)
+        return None
+
+    norm = normalize_utterance(req.text)
+    for rule in rules:
+        result = rule(req, norm)
+        if result is None:
+            continue
+        confidence, name, response = result
+        if confidence >= FAST_PATH_MIN_CONFIDENCE:
+            fast_path_stats.record(name, True)
+            logger.info(
+                f"[AI-FAST] scene={req.scene}, rule={name}, confidence={confidence}, text={req.text}"
+            )
+            return response
+        fast_path_stats.record(name, False)
+        return None
+
+    fast_path_stats.record(None, False)
+    return None
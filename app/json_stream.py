@@ -0,0 +1,122 @@
+# app/json_stream.py
+import json
+
+# 파서 상태
+_SCAN = 0          # 최상위 객체에서 "assistant_text" 키를 찾는 중
+_AFTER_KEY = 1     # 키 문자열이 끝났고 ':'를 기다리는 중
+_VALUE_START = 2   # ':' 뒤에서 값의 여는 따옴표를 기다리는 중
+_IN_VALUE = 3      # assistant_text 문자열 값 안
+_DONE = 4          # 값이 끝남 (이후 입력은 무시)
+
+
+class AssistantTextStreamParser:
+    """
+    스트리밍으로 들어오는 JSON 조각에서 최상위 "assistant_text" 문자열 값만
+    도착하는 즉시 디코딩해서 돌려주는 증분 파서.
+
+        parser = AssistantTextStreamParser(); delta = parser.feed(chunk)
+
+    나머지 필드(actions 등)는 전체 응답이 끝난 뒤 json.loads로 따로 파싱한다.
+    """
+
+    def __init__(self, key: str = "assistant_text"):
+        self.key = key
+        self.state = _SCAN
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self._string_buf = []   # SCAN 중 depth 1 문자열(키 후보) 내용
+        self._pending_key = None
+        self._escape_buf = ""   # IN_VALUE 중 아직 완성되지 않은 이스케이프 시퀀스
+        self._high_surrogate = ""
+
+    @property
+    def done(self) -> bool:
+        return self.state == _DONE
+
+    def feed(self, chunk: str) -> str:
+        out = []
+        for ch in chunk:
+            if self.state == _DONE:
+                break
+            if self.state == _IN_VALUE:
+                self._feed_value(ch, out)
+            else:
+                self._feed_scan(ch)
+        return "".join(out)
+
+    # ---------------------------------
+    # 키 탐색
+    # ---------------------------------
+    def _feed_scan(self, ch: str) -> None:
+        if self.in_string:
+            if self.escape:
+                self.escape = False
+                if self.depth == 1:
+                    self._string_buf.append(ch)
+            elif ch == "\\":
+                self.escape = True
+            elif ch == '"':
+                self.in_string = False
+                if self.depth == 1:
+                    self._pending_key = "".join(self._string_buf)
+                    self.state = _AFTER_KEY
+            elif self.depth == 1:
+                self._string_buf.append(ch)
+            return
+
+        if self.state == _AFTER_KEY:
+            if ch.isspace():
+                return
+            if ch == ":" and self._pending_key == self.key:
+                self.state = _VALUE_START
+                return
+            self.state = _SCAN
+            self._pending_key = None
+
+        if self.state == _VALUE_START:
+            if ch.isspace():
+                return
+            if ch == '"':
+                self.state = _IN_VALUE
+                return
+            # 문자열이 아닌 값 (null 등) → 스트리밍할 것이 없음
+            self.state = _DONE
+            return
+
+        if ch == '"':
+            self.in_string = True
+            self._string_buf = []
+        elif ch in "{[":
+            self.depth += 1
+        elif ch in "}]":
+            self.depth -= 1
+
+    # ---------------------------------
+    # 값 디코딩
+    # ---------------------------------
+    def _feed_value(self, ch: str, out) -> None:
+        if self._escape_buf:
+            self._escape_buf += ch
+            if self._escape_buf[1] == "u" and len(self._escape_buf) < 6:
+                return
+            self._emit(json.loads('"' + self._escape_buf + '"'), out)
+            self._escape_buf = ""
+            return
+
+        if ch == "\\":
+            self._escape_buf = ch
+        elif ch == '"':
+            self.state = _DONE
+        else:
+            self._emit(ch, out)
+
+    def _emit(self, text: str, out) -> None:
+        # 😀 같은 서로게이트 쌍은 두 조각이 모두 도착한 뒤 합쳐서 내보낸다
+        if len(text) == 1 and "\ud800" <= text <= "\udbff":
+            self._high_surrogate = text
+            return
+        if self._high_surrogate:
+            text = (self._high_surrogate + text).encode("utf-16", "surrogatepass").decode("utf-16")
+            self._high_surrogate = ""
+        out.append(text)
@@ -1,11 +1,16 @@
 # app/llm_client.py
 import os
 import json
+import time
+import asyncio
+import hashlib
 import logging
-from typing import List, Set
+from dataclasses import replace
+from typing import Any, AsyncIterator, Callable, List, Optional, Sequence, Set, Tuple
 
-from dotenv import load_dotenv
-from openai import OpenAI, OpenAIError
+import httpx
+from openai import AsyncOpenAI, OpenAIError
+from pydantic import ValidationError
 
 from .models import (
     AnalyzeRequest,
@@ -13,6 +18,58 @@ from .models import (
     MenuItem,
     KioskAction,
 )
+from .admission import admission_controller, shed_response
+from .cart_engine import apply_to_response, cart_index, cart_total, clamp_qty, describe_cart
+from .dialogue_state import DIALOGUE_STATE_ENABLED, compact_history, dialogue_fingerprint
+from .fast_router import route as fast_route
+from .json_stream import AssistantTextStreamParser
+from .menu_catalog import menu_fingerprint
+from .menu_filter import filter_candidates, route as filter_route
+from .menu_fuzzy import repair_menu_id
+from .model_tiering import (
+    ESCALATE_DROPPED_ACTIONS,
+    ESCALATE_ERROR,
+    ESCALATE_INVALID_JSON,
+    TIER_SMALL,
+    ModelTier,
+    choose_tier,
+    model_tiers,
+    tiering_stats,
+)
+from .menu_retrieval import lexical_matches, pruning_stats, select_candidates_with_focus
+from .metrics import (
+    COUNTER_FALLBACK,
+    COUNTER_INVALID_MENU_ID,
+    COUNTER_JSON_DECODE_FAIL,
+    COUNTER_MENU_ID_REPAIRED,
+    COUNTER_OUTPUT_TOKENS,
+    COUNTER_TIER_ESCALATION,
+    STAGE_ADMISSION,
+    STAGE_BUILD,
+    STAGE_CONSTRUCT,
+    STAGE_DECODE,
+    STAGE_NORMALIZE,
+    STAGE_TTFT,
+    STAGE_UPSTREAM,
+    StageSeries,
+    llm_metrics,
+)
+from .prompt_cache import menu_block_cache
+from .recommender import recommend
+from .resilience import CircuitOpenError, DeadlineExceeded, call_with_resilience, default_policy
+from .serialization import materialize_menu
+from .settings import Settings, get_settings
+from .response_cache import RESPONSE_CACHE_ENABLED, RESPONSE_CACHE_TTL, get_response_cache
+from .text_norm import normalize_utterance
+from .token_budget import (
+    MENU_DETAIL_LEVELS,
+    PROMPT_BUDGET_HISTORY,
+    PROMPT_BUDGET_MENU,
+    PROMPT_BUDGET_UTTERANCE,
+    fit_history,
+    truncate_to_tokens,
+)
+from .tokens import estimate_tokens
 
 # --------------------------------------------------
 # 로거 설정 (상위에서 basicConfig 해두면 stdout로 찍힘)
@@ -20,22 +77,60 @@ from .models import (
 logger = logging.getLogger(__name__)
 
 # --------------------------------------------------
-# .env 로딩 (OPENAI_API_KEY, OPENAI_MODEL 등)
+# 업스트림(OpenAI) 클라이언트
+# import 시점에는 만들지 않고 첫 호출(또는 워밍업) 때 settings로 만든다.
+# 테스트/도구에서는 set_llm_client()로 주입할 수 있다.
 # --------------------------------------------------
-load_dotenv(override=True)
+_client: Optional[AsyncOpenAI] = None
+
+# 진행 중인 업스트림 호출 수 제한 (첫 사용 시 생성)
+_llm_semaphore: Optional[asyncio.Semaphore] = None
+
+
+def create_llm_client(settings: Settings) -> AsyncOpenAI:
+    """커넥션 풀을 공유하는 비동기 클라이언트 생성."""
+    return AsyncOpenAI(
+        api_key=settings.require_api_key(),
+        base_url=settings.openai_base_url,
+        http_client=httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.max_connections,
+                max_keepalive_connections=settings.max_keepalive_connections,
+                keepalive_expiry=settings.keepalive_expiry,
+            ),
+            timeout=httpx.Timeout(settings.llm_timeout, connect=5.0),
+        ),
+        # 재시도는 resilience 계층이 턴 마감 시간 안에서 직접 한다 (SDK 자체 재시도는 끔)
+        max_retries=0,
+    )
+
 
-api_key = os.getenv("OPENAI_API_KEY")
-if not api_key:
-    raise RuntimeError("OPENAI_API_KEY가 설정되지 않았습니다. .env 파일을 확인해주세요.")
+def get_llm_client() -> AsyncOpenAI:
+    global _client
+    if _client is None:
+        _client = create_llm_client(get_settings())
+    return _client
 
-client = OpenAI(api_key=api_key)
 
-# 기본 사용할 모델 (필요시 .env에서 OPENAI_MODEL=gpt-4.1-mini 등으로 교체 가능)
-DEFAULT_MODEL = os.getenv("OPENAI_MODEL", "gpt-4.1-mini")
+def set_llm_client(client: Optional[AsyncOpenAI]) -> None:
+    """클라이언트 주입 (None이면 다음 호출 때 settings로 다시 만든다)."""
+    global _client
+    _client = client
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    global _llm_semaphore
+    if _llm_semaphore is None:
+        _llm_semaphore = asyncio.Semaphore(get_settings().llm_max_concurrency)
+    return _llm_semaphore
+
 
 # 한 세션에서 LLM에 넘길 최대 히스토리 턴 수
 MAX_HISTORY_TURNS = 6
 
+# scene별 후보 가지치기 후 프롬프트에 실을 최대 메뉴 수 (안전 상한)
+MENU_PROMPT_LIMIT = int(os.getenv("MENU_PROMPT_LIMIT", "60"))
+
 
 SYSTEM_PROMPT = """
 너는 한국 패스트푸드점 '슬로우버거' 키오스크의 AI 주문 도우미다.
@@ -50,7 +145,7 @@ SYSTEM_PROMPT = """
 
 중요 규칙:
 - 반드시 JSON만 출력한다. 설명 문장, 마크다운, 코드블럭 없이 순수 JSON만.
-- JSON 스키마는 다음과 같아야 한다.
+- JSON 스키마는 다음과 같아야 한다. 키 순서도 그대로 지키고, assistant_text를 항상 가장 먼저 출력한다.
 
 {
   "assistant_text": "string",
@@ -277,46 +372,103 @@ scene에 따라 next_scene과 assistant_text를 다음과 같이 설계하라:
 """
 
 
+# LLM_OUTPUT_FORMAT=compact일 때 SYSTEM_PROMPT 뒤에 붙는 출력 형식 (생성 토큰 절약용)
+# 메뉴 목록 각 줄 앞에 "#번호"를 붙여 주고, 모델은 menuId 대신 그 번호를 쓴다.
+COMPACT_OUTPUT_PROMPT = """
+[출력 형식: 축약]
+위 JSON 스키마 대신 아래 축약 형식으로 출력한다. 의미와 규칙은 위와 같고 키 이름과 값 표기만 다르다.
+
+{"t":"고객에게 들려줄 문장","a":[{"o":"A","i":3,"q":2,"+":["케첩"],"-":["피클"]}],"f":1,"n":"SELECT_SIDE"}
+
+- t: assistant_text. 항상 가장 먼저 출력한다.
+- a: actions. 장바구니 변화가 없으면 a를 통째로 생략한다 (NONE 액션을 쓰지 않는다).
+  - o: A=ADD_ITEM, R=REMOVE_ITEM, C=CUSTOMIZE
+  - i: [주문 가능 메뉴 목록]에서 그 메뉴 줄 앞의 #번호 (정수). menuId 문자열을 쓰지 않는다.
+  - q: 수량. 1이면 생략한다.
+  - +, -: customize.add / customize.remove. 비어 있으면 생략한다.
+- f: 주문을 끝낼 때(should_finish=true)만 1. 아니면 생략한다.
+- n: next_scene. 현재 scene과 같으면 생략한다.
+"""
+
+# 축약 형식 키/코드 → 원래 형식
+_COMPACT_ACTION_TYPES = {"A": "ADD_ITEM", "R": "REMOVE_ITEM", "C": "CUSTOMIZE", "N": "NONE"}
+
+
 # ======================================
 # 내부 Helper 함수들
 # ======================================
 
+# 매 턴 동일한 system 메시지는 한 번만 만들어 재사용
+_SYSTEM_MESSAGE = {"role": "system", "content": SYSTEM_PROMPT}
+_COMPACT_SYSTEM_MESSAGE = {"role": "system", "content": SYSTEM_PROMPT + COMPACT_OUTPUT_PROMPT}
+
+
+def compact_output() -> bool:
+    """LLM 출력을 축약 형식으로 받는지 (LLM_OUTPUT_FORMAT=compact)."""
+    return get_settings().llm_output_format == "compact"
+
+_EMPTY_CART_TEXT = "현재 장바구니는 비어 있습니다."
+
+
 def _format_cart(req: AnalyzeRequest) -> str:
     """LLM에게 보여줄 장바구니 요약 문자열."""
     if not req.cart.items:
-        return "현재 장바구니는 비어 있습니다."
-    lines = []
-    for ci in req.cart.items:
-        # menuId로 name 찾기
-        name = next((m.name for m in req.menu if m.menuId == ci.menuId), ci.menuId)
-        lines.append(f"- {name}({ci.menuId}) x {ci.qty}")
+        return _EMPTY_CART_TEXT
+    lines = [f"- {line}" for line in describe_cart(req)]
+    lines.append(f"합계: {cart_total(req.cart, cart_index(req.menu))}원")
     return "\n".join(lines)
 
 
-def _format_menu(menu: List[MenuItem], limit: int = 40) -> str:
+def _format_menu(
+    menu: List[MenuItem], limit: int = 40, level: int = 0, n_focus: int = 0, numbered: bool = False
+) -> str:
     """
     LLM에게 보여줄 간단한 메뉴 요약.
     너무 길어지지 않도록 최대 limit개까지만 보여줌.
+    level > 0이면 토큰 예산에 맞춰 덜 중요한 정보부터 생략 (token_budget.MENU_DETAIL_LEVELS 참고).
+    앞의 n_focus개(장바구니/발화 매칭)는 level 1, 3에서도 자세히 남긴다.
+    numbered면 줄 앞에 1부터 시작하는 "#번호"를 붙인다 (축약 출력 형식에서 menuId 대신 사용).
+    메뉴 내용이 같으면 렌더링 결과를 LRU 캐시에서 재사용한다.
     """
+    key = (menu_fingerprint(menu), limit, level, n_focus, numbered)
+    cached = menu_block_cache.get(key)
+    if cached is not None:
+        return cached
+
+    rendered = _render_menu(menu, limit, level, n_focus, numbered)
+    menu_block_cache.put(key, rendered)
+    return rendered
+
+
+def _render_menu(
+    menu: List[MenuItem], limit: int, level: int = 0, n_focus: int = 0, numbered: bool = False
+) -> str:
+    """_format_menu의 실제 렌더링 (캐시 미스 시에만 호출)."""
     lines = []
-    for m in menu[:limit]:
+    for idx, m in enumerate(menu[:limit]):
+        focus = idx < n_focus
+        with_summary = level == 0 or (level == 1 and focus)
+        with_details = level < 3 or focus
+
         parts = [f"[{m.menuId}] {m.name} / {m.category} / {m.price}원"]
+        if numbered:
+            parts[0] = f"#{idx + 1} " + parts[0]
 
         # 칼로리 간단 표기
         if m.kcal is not None:
             parts.append(f"{m.kcal}kcal")
 
-        if m.ingredients_ko:
+        if with_details and m.ingredients_ko:
             parts.append(f"재료: {m.ingredients_ko}")
 
-        if m.customizable_ko:
+        if with_details and m.customizable_ko:
             parts.append(f"조절 가능: {m.customizable_ko}")
 
-        if m.allergens_ko:
+        if with_details and m.allergens_ko:
             parts.append(f"알레르기: {m.allergens_ko}")
 
         # 필요하면 한 줄 영양 요약
-        if m.nutrition_summary_ko:
+        if with_summary and m.nutrition_summary_ko:
             parts.append(f"영양요약: {m.nutrition_summary_ko}")
 
         if m.tags:
@@ -330,19 +482,104 @@ def _format_menu(menu: List[MenuItem], limit: int = 40) -> str:
     return "\n".join(lines)
 
 
-def build_messages(req: AnalyzeRequest):
+def _fit_menu(menu: List[MenuItem], n_focus: int, numbered: bool = False) -> Tuple[str, int, int, int]:
+    """
+    메뉴 블록이 PROMPT_BUDGET_MENU 안에 들어갈 때까지 축약 단계를 올린다.
+    반환: (메뉴 블록, 사용한 level, 토큰 수, 실린 메뉴 행 수)
+    """
+    limit = min(len(menu), MENU_PROMPT_LIMIT)
+    for level in MENU_DETAIL_LEVELS[:-1]:
+        menu_str = _format_menu(menu, limit, level, n_focus, numbered)
+        tokens = estimate_tokens(menu_str, cache=True)
+        if tokens <= PROMPT_BUDGET_MENU:
+            return menu_str, level, tokens, limit
+
+    # 마지막 단계: 보조 메뉴 행을 뒤에서부터 잘라낸다 (핵심 후보는 유지)
+    level = MENU_DETAIL_LEVELS[-1]
+    lo, hi = min(n_focus, limit), limit
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if estimate_tokens(_format_menu(menu, mid, level - 1, n_focus, numbered), cache=True) <= PROMPT_BUDGET_MENU:
+            lo = mid
+        else:
+            hi = mid - 1
+    menu_str = _format_menu(menu, lo, level - 1, n_focus, numbered)
+    return menu_str, level, estimate_tokens(menu_str, cache=True), lo
+
+
+def _with_cart_items(req: AnalyzeRequest, focus: List[MenuItem]) -> Tuple[List[MenuItem], int]:
+    """focus 메뉴 뒤에 장바구니 메뉴를 붙인다 (앞 n_focus개만 상세 정보 유지)."""
+    focus_ids = {m.menuId for m in focus}
+    cart_ids = {ci.menuId for ci in req.cart.items}
+    return focus + [m for m in req.menu if m.menuId in cart_ids and m.menuId not in focus_ids], len(focus)
+
+
+def build_messages(req: AnalyzeRequest, menu_index: Optional[List[str]] = None):
     """
     OpenAI ChatCompletion에 넘길 messages 구성.
-    - system: 역할/규칙
-    - (선택) history: 이전 user/assistant 발화
+    - system: 역할/규칙 (축약 출력 형식이면 COMPACT_OUTPUT_PROMPT 포함)
+    - (선택) history: 이전 대화 요약(DialogueState) + 최근 user/assistant 발화
+      (DIALOGUE_STATE_ENABLED=false면 최근 MAX_HISTORY_TURNS개 원문만)
     - user: 이번 턴 정보(text/scene/cart/menu)
+    menu_index를 넘기면 프롬프트 메뉴 목록에 실린 순서대로 menuId를 채운다 (축약 출력의 #번호 해석용).
     """
+    compact = compact_output()
     cart_str = _format_cart(req)
-    menu_str = _format_menu(req.menu)
+
+    # 알레르기/식단/가격 조건 질문이면 인덱스로 찾은 메뉴만,
+    # "가볍게"/"든든하게" 같은 추천 의도면 점수 상위 메뉴만 싣고 (+ 장바구니 메뉴),
+    # 아니면 scene/장바구니/발화 기준으로 후보 메뉴만 추려서 프롬프트에 싣는다
+    menu_note = ""
+    filtered = filter_candidates(req)
+    recommended = recommend(req) if filtered is None else None
+    if filtered is not None:
+        query, matches = filtered
+        # 질문에 메뉴명이 나오면 조건에 안 맞아도 실어 둔다 ("우유 빼고 더블 치즈버거 있어요?")
+        matched = {m.menuId for m in matches}
+        focus = matches + [m for m in lexical_matches(req.text, req.menu) if m.menuId not in matched]
+        candidates, n_focus = _with_cart_items(req, focus)
+        menu_note = f"""
+[조건 검색 결과]
+조건: {query.describe()}
+조건에 맞는 menuId: {", ".join(m.menuId for m in matches)}
+(조건에 맞는 메뉴는 이것이 전부다. 다른 메뉴를 조건에 맞는다고 말하지 마라.
+사용자가 특정 메뉴를 주문하면 평소처럼 그 메뉴로 action을 만든다.)
+"""
+    elif recommended is not None:
+        intent, picks = recommended
+        # 발화에 메뉴명이 일부라도 나오면 그 메뉴도 실어 둔다 (사용자가 고른 메뉴가 프롬프트에서 빠지지 않게)
+        picked = {m.menuId for m in picks}
+        focus = picks + [m for m in lexical_matches(req.text, req.menu) if m.menuId not in picked]
+        candidates, n_focus = _with_cart_items(req, focus)
+        menu_note = f"""
+[추천 후보]
+추천 기준: {intent.label}
+추천할 menuId (순서대로 더 잘 맞음): {", ".join(m.menuId for m in picks)}
+(추천할 때는 이 후보 안에서 골라 자연스럽게 추천 멘트를 만들어라.
+사용자가 특정 메뉴를 주문하면 평소처럼 그 메뉴로 action을 만든다.)
+"""
+    else:
+        candidates, n_focus = select_candidates_with_focus(req)
+    pruned = candidates is not req.menu
+    # 인라인 메뉴(지연 검증)면 프롬프트에 실리는 항목만 여기서 검증
+    candidates, n_focus = materialize_menu(candidates, n_focus)
+    menu_str, menu_level, menu_tokens, menu_rows = _fit_menu(candidates, n_focus, numbered=compact)
+    if menu_index is not None:
+        menu_index[:] = [m.menuId for m in candidates[:menu_rows]]
+    if pruned:
+        tokens_before = estimate_tokens(_format_menu(req.menu), cache=True)
+        pruning_stats.record(tokens_before, menu_tokens)
+        logger.info(
+            f"[AI-PROMPT] scene={req.scene}, menu_rows={len(req.menu)}->{len(candidates)}, "
+            f"menu_tokens={tokens_before}->{menu_tokens}"
+        )
+
+    # 너무 긴 발화는 앞/뒤만 남기고 가운데를 생략
+    text = truncate_to_tokens(req.text, PROMPT_BUDGET_UTTERANCE)
 
     user_prompt = f"""
 [사용자 발화]
-{req.text}
+{text}
 
 [현재 화면(scene)]
 {req.scene}
@@ -352,39 +589,47 @@ def build_messages(req: AnalyzeRequest):
 
 [주문 가능 메뉴 목록]
 {menu_str}
-
+{menu_note}
 위 정보를 보고 JSON만 출력해라.
 """
 
-    messages = [
-        {"role": "system", "content": SYSTEM_PROMPT},
-    ]
-
-    # 🔹 직전 히스토리 (최신 N턴만 사용)
-    if req.history:
-        history_slice = req.history[-MAX_HISTORY_TURNS:]
-        for h in history_slice:
-            if h.role not in ("user", "assistant"):
-                continue
-            messages.append(
-                {
-                    "role": h.role,
-                    "content": h.content,
-                }
-            )
+    system_message = _COMPACT_SYSTEM_MESSAGE if compact else _SYSTEM_MESSAGE
+    messages = [system_message]
+
+    # 🔹 직전 히스토리
+    # 대화 요약 블록 + 최근 원문 1~2개 (대화가 길어져도 크기가 거의 일정),
+    # 끄면 최신 N턴 중 토큰 예산 안에 드는 것만 (오래된 턴부터 버림)
+    if DIALOGUE_STATE_ENABLED:
+        history_messages, history_tokens = compact_history(req, PROMPT_BUDGET_HISTORY)
+    else:
+        history_messages, history_tokens = fit_history(
+            req.history, MAX_HISTORY_TURNS, PROMPT_BUDGET_HISTORY
+        )
+    messages.extend(history_messages)
 
     # 🔹 이번 턴 user
     messages.append({"role": "user", "content": user_prompt})
 
+    system_tokens = estimate_tokens(system_message["content"], cache=True)
+    user_tokens = estimate_tokens(user_prompt)
+    logger.info(
+        f"[AI-BUDGET] scene={req.scene}, prompt_tokens~={system_tokens + history_tokens + user_tokens} "
+        f"(system={system_tokens}, history={history_tokens}/{len(history_messages)}turns, "
+        f"user={user_tokens}, menu={menu_tokens}@level{menu_level})"
+    )
+
     return messages
 
 
+_FALLBACK_TEXT = "죄송합니다, 잠시 오류가 발생했어요. 다시 한 번만 말씀해 주시겠어요?"
+
+
 def _build_safe_fallback_response(req: AnalyzeRequest) -> AnalyzeResponse:
     """
     LLM 호출 실패 / 파싱 실패 등 예외 상황에서 사용할 안전한 기본 응답.
     """
     return AnalyzeResponse(
-        assistant_text="죄송합니다, 잠시 오류가 발생했어요. 다시 한 번만 말씀해 주시겠어요?",
+        assistant_text=_FALLBACK_TEXT,
         actions=[
             KioskAction(type="NONE", menuId=None, qty=1, customize=None)
         ],
@@ -393,12 +638,22 @@ def _build_safe_fallback_response(req: AnalyzeRequest) -> AnalyzeResponse:
     )
 
 
-def _normalize_actions(raw_actions, valid_menu_ids: Set[str], current_scene: str):
+def _normalize_actions(
+    raw_actions,
+    valid_menu_ids: Set[str],
+    current_scene: str,
+    series: Optional[StageSeries] = None,
+    repair: Optional[Callable[[str], Optional[Tuple[str, float]]]] = None,
+    dropped: Optional[List[Any]] = None,
+):
     """
     LLM이 반환한 actions 리스트를 검증/보정한다.
     - type이 이상하면 NONE으로
-    - menuId가 유효하지 않은데 ADD/REMOVE/CUSTOMIZE면 NONE으로 다운그레이드
+    - menuId가 유효하지 않은데 ADD/REMOVE/CUSTOMIZE면 repair(menuId)로 가까운 메뉴를 찾아 고치고
+      (신뢰도 미달이거나 repair가 없으면) NONE으로 다운그레이드 (series가 있으면 각각 카운트)
     - menuId 숫자 vs 문자열 이슈를 방지하기 위해 무조건 문자열로 변환 후 비교
+    - qty는 1~CART_MAX_QTY 정수로 자름 (숫자가 아니면 1)
+    dropped가 있으면 NONE으로 떨어뜨린 원래 action을 담는다 (모델 티어 escalation 판단용).
     """
     default_action = {"type": "NONE", "menuId": None, "qty": 1, "customize": None}
 
@@ -411,27 +666,44 @@ def _normalize_actions(raw_actions, valid_menu_ids: Set[str], current_scene: str
 
     for a in raw_actions:
         if not isinstance(a, dict):
+            if dropped is not None:
+                dropped.append(a)
             fixed_actions.append(default_action)
             continue
 
         t = a.get("type")
         if t not in valid_types:
+            if dropped is not None:
+                dropped.append(a)
             t = "NONE"
 
         # 🔹 핵심: menuId를 무조건 문자열로 변환
         raw_menu_id = a.get("menuId")
         menu_id = str(raw_menu_id) if raw_menu_id is not None else None
 
-        qty = a.get("qty", 1)
+        qty = clamp_qty(a.get("qty", 1))
         customize = a.get("customize")
 
-        # menuId가 필요한 타입인데 유효한 ID가 아니면 NONE으로 다운그레이드
-        if t in {"ADD_ITEM", "REMOVE_ITEM", "CUSTOMIZE"}:
-            if menu_id not in valid_menu_ids:
+        # menuId가 필요한 타입인데 유효한 ID가 아니면 가까운 메뉴로 고치거나, 못 고치면 NONE으로 다운그레이드
+        if t in {"ADD_ITEM", "REMOVE_ITEM", "CUSTOMIZE"} and menu_id not in valid_menu_ids:
+            repaired = repair(menu_id) if repair is not None and menu_id else None
+            if repaired is not None:
+                logger.info(
+                    f"[AI-ACTION] Repaired menuId: raw={raw_menu_id} -> {repaired[0]} "
+                    f"(confidence={repaired[1]:.2f}, scene={current_scene})"
+                )
+                if series is not None:
+                    series.inc(COUNTER_MENU_ID_REPAIRED)
+                menu_id = repaired[0]
+            else:
                 logger.warning(
                     f"[AI-ACTION] Invalid menuId filtered: raw={raw_menu_id}, "
                     f"menu_id(str)={menu_id}, valid_menu_ids={list(valid_menu_ids)[:5]}..."
                 )
+                if series is not None:
+                    series.inc(COUNTER_INVALID_MENU_ID)
+                if dropped is not None:
+                    dropped.append(a)
                 fixed_actions.append(default_action)
                 continue
 
@@ -447,63 +719,498 @@ def _normalize_actions(raw_actions, valid_menu_ids: Set[str], current_scene: str
     return fixed_actions
 
 
+def _expand_compact(data: dict, menu_index: Sequence[str], current_scene: str) -> dict:
+    """
+    축약 출력(COMPACT_OUTPUT_PROMPT)을 원래 JSON 형식으로 펼친다.
+    - 생략된 값은 기본값으로 (a 없음 → NONE 하나, q → 1, f → false, n → 현재 scene)
+    - i는 프롬프트 메뉴 목록의 #번호 → menuId. 목록 범위를 벗어나면 "#번호" 그대로 두어
+      _normalize_actions에서 유효하지 않은 menuId로 다운그레이드되게 한다
+    - 모델이 번호 대신 menuId 문자열을 쓴 경우는 그대로 넘긴다 (검증은 _normalize_actions)
+    """
+    actions = []
+    raw_actions = data.get("a")
+    for a in raw_actions if isinstance(raw_actions, list) else ():
+        if not isinstance(a, dict):
+            actions.append(a)
+            continue
+        op = a.get("o")
+        ref = a.get("i")
+        if type(ref) is int:
+            menu_id = menu_index[ref - 1] if 1 <= ref <= len(menu_index) else f"#{ref}"
+        else:
+            menu_id = ref
+        add, remove = a.get("+"), a.get("-")
+        actions.append({
+            "type": _COMPACT_ACTION_TYPES.get(op, op),
+            "menuId": menu_id,
+            "qty": a.get("q", 1),
+            "customize": {"add": add or [], "remove": remove or []} if add or remove else None,
+        })
+
+    expanded = {"actions": actions, "should_finish": data.get("f", False), "next_scene": data.get("n", current_scene)}
+    if "t" in data:
+        expanded["assistant_text"] = data["t"]
+    return expanded
+
+
+def response_cache_key(req: AnalyzeRequest) -> str:
+    """
+    응답 캐시 키.
+    scene + 정규화된 발화 + 장바구니 서명 + 메뉴 버전 + 최근 히스토리 지문 + 대화 요약을 묶어 해시한다.
+    (프로세스가 달라도 같은 값이 나오도록 blake2b 사용)
+    """
+    cart_sig = ",".join(
+        f"{ci.menuId}x{ci.qty}"
+        + (f"+{'/'.join(ci.customize.add)}-{'/'.join(ci.customize.remove)}" if ci.customize else "")
+        for ci in sorted(req.cart.items, key=lambda c: c.menuId)
+    )
+    menu_key = menu_fingerprint(req.menu)
+    if not isinstance(menu_key, str):
+        menu_key = hashlib.blake2b(repr(menu_key).encode("utf-8"), digest_size=16).hexdigest()
+    history_fp = "|".join(
+        f"{h.role[0]}:{normalize_utterance(h.content)}" for h in req.history[-2:]
+    )
+
+    h = hashlib.blake2b(digest_size=16)
+    for part in (req.scene, normalize_utterance(req.text), cart_sig, menu_key, history_fp, dialogue_fingerprint(req)):
+        h.update(part.encode("utf-8"))
+        h.update(b"\x1f")
+    return h.hexdigest()
+
+
+def _parse_completion(
+    req: AnalyzeRequest,
+    content: str,
+    series: Optional[StageSeries] = None,
+    menu_index: Optional[Sequence[str]] = None,
+    dropped: Optional[List[Any]] = None,
+) -> Optional[AnalyzeResponse]:
+    """
+    LLM이 돌려준 JSON 문자열을 AnalyzeResponse로 변환.
+    축약 출력 형식이면 menu_index(build_messages가 채운 #번호 → menuId)로 먼저 펼친다.
+    파싱에 실패하거나 JSON은 맞지만 스키마에 안 맞으면 None (호출 측에서 escalation / fallback 응답 사용).
+    디코딩 / actions 보정 / 모델 생성 시간은 series에 기록한다.
+    dropped는 _normalize_actions에 그대로 넘긴다.
+    """
+    if series is None:
+        series = llm_metrics.series(req.scene, get_settings().openai_model)
+
+    # JSON 파싱
+    started = time.perf_counter()
+    try:
+        data = json.loads(content)
+    except (json.JSONDecodeError, TypeError):
+        series.inc(COUNTER_JSON_DECODE_FAIL)
+        logger.error("[AI-ERROR] JSON 디코딩 실패, fallback 응답 사용")
+        return None
+    finally:
+        series.observe(STAGE_DECODE, time.perf_counter() - started)
+    if not isinstance(data, dict):
+        series.inc(COUNTER_JSON_DECODE_FAIL)
+        logger.error("[AI-ERROR] JSON 최상위가 객체가 아님, fallback 응답 사용")
+        return None
+    # 축약 형식을 요청했어도 모델이 원래 형식으로 답했으면 그대로 처리
+    if compact_output() and "assistant_text" not in data:
+        data = _expand_compact(data, menu_index or (), req.scene)
+
+    # 필수 필드 기본값 보정
+    data.setdefault(
+        "assistant_text",
+        "죄송합니다. 다시 한 번만 말씀해 주시겠어요?",
+    )
+    data.setdefault("should_finish", False)
+    data.setdefault("next_scene", req.scene)
+
+    # actions 검증/보정
+    raw_actions = data.get("actions")
+    started = time.perf_counter()
+    # 지금 화면에 없는 메뉴라도 장바구니에 있으면 제거/커스터마이즈 대상이 될 수 있다
+    valid_menu_ids = {m.menuId for m in req.menu}
+    valid_menu_ids.update(ci.menuId for ci in req.cart.items)
+    data["actions"] = _normalize_actions(
+        raw_actions, valid_menu_ids, req.scene, series,
+        repair=lambda raw: repair_menu_id(raw, req.menu, valid_menu_ids),
+        dropped=dropped,
+    )
+    series.observe(STAGE_NORMALIZE, time.perf_counter() - started)
+
+    logger.info(
+        f"[AI-RES] scene={req.scene}, assistant_text={data.get('assistant_text')}"
+    )
+
+    # Pydantic 모델로 최종 검증 ("assistant_text": null, "+": "케첩" 같은 타입 오류는 디코딩 실패와 같이 취급)
+    started = time.perf_counter()
+    try:
+        return AnalyzeResponse(**data)
+    except ValidationError as e:
+        series.inc(COUNTER_JSON_DECODE_FAIL)
+        logger.error(f"[AI-ERROR] 응답 스키마 검증 실패, fallback 응답 사용: {e.error_count()} errors")
+        return None
+    finally:
+        series.observe(STAGE_CONSTRUCT, time.perf_counter() - started)
+
+
+def _previous_turn_fell_back(req: AnalyzeRequest) -> bool:
+    """직전 assistant 발화가 오류 안내(fallback)였는지."""
+    for h in reversed(req.history):
+        if h.role == "assistant":
+            return h.content == _FALLBACK_TEXT
+    return False
+
+
+async def _call_tier(
+    req: AnalyzeRequest,
+    messages,
+    tier: ModelTier,
+    policy=None,
+    hedge: bool = True,
+) -> Tuple[bool, Optional[str]]:
+    """
+    tier 모델을 마감/헤지/재시도 규칙에 따라 불러 (성공 여부, 원문 content)를 돌려준다.
+    호출 중 어떤 실패든 (False, None).
+    """
+    # max_tokens는 티어에 지정된 경우만 보낸다 (티어를 안 쓰면 예전과 같은 요청)
+    extra = {"max_tokens": tier.max_tokens} if tier.max_tokens else {}
+
+    async def attempt(model: str, timeout: float) -> Optional[str]:
+        async with _get_semaphore():
+            started = time.perf_counter()
+            completion = await get_llm_client().chat.completions.create(
+                model=model,
+                response_format={"type": "json_object"},
+                messages=messages,
+                temperature=0.3,
+                timeout=min(tier.timeout, timeout),  # 초 단위, 남은 턴 시간을 넘지 않게
+                **extra,
+            )
+            model_series = llm_metrics.series(req.scene, model)
+            model_series.observe(STAGE_UPSTREAM, time.perf_counter() - started)
+        content = completion.choices[0].message.content
+        usage = getattr(completion, "usage", None)
+        model_series.inc(
+            COUNTER_OUTPUT_TOKENS,
+            usage.completion_tokens if usage is not None else estimate_tokens(content or ""),
+        )
+        return content
+
+    try:
+        # 마감 시간 / 헤지 요청 / 재시도 / 서킷 브레이커
+        content = await call_with_resilience(attempt, tier.model, policy, hedge)
+        logger.debug(f"[AI-RAW] {content}")
+    except CircuitOpenError:
+        logger.warning(f"[AI-ERROR] Circuit open, fallback 응답 사용 (scene={req.scene})")
+        return False, None
+    except DeadlineExceeded as e:
+        logger.error(f"[AI-ERROR] {e}")
+        return False, None
+    except OpenAIError as e:
+        logger.error(f"[AI-ERROR] OpenAIError: {e}")
+        return False, None
+    except Exception as e:
+        logger.error(f"[AI-ERROR] Unexpected error: {e}")
+        return False, None
+    return True, content
+
+
+def _pick_tier(req: AnalyzeRequest, small: Optional[ModelTier], large: ModelTier) -> ModelTier:
+    """이번 턴에 쓸 티어 (작은 티어가 없으면 항상 large, 있으면 choose_tier 결과를 통계에 남김)."""
+    if small is None:
+        return large
+    name, reason = choose_tier(req, _previous_turn_fell_back(req))
+    tiering_stats.routed(name, reason)
+    return small if name == TIER_SMALL else large
+
+
+async def _request_llm(req: AnalyzeRequest, tier: Optional[ModelTier] = None) -> Optional[AnalyzeResponse]:
+    """
+    OpenAI를 호출해 응답을 만든다.
+    호출/파싱 중 어떤 실패든 None을 돌려준다 (fallback 여부를 호출 측에서 알 수 있게).
+
+    작은 모델 티어(LLM_SMALL_MODEL)가 있으면 choose_tier로 이번 턴의 티어를 고르고 (tier를 주면 그 티어),
+    작은 모델이 실패 / JSON 깨짐 / action을 NONE으로 떨어뜨리면 남은 턴 시간 안에서 큰 모델로 다시 부른다.
+    /analyze, 미리 분석(speculation), 스트리밍의 작은 티어 턴이 모두 이 경로를 쓴다.
+    """
+    settings = get_settings()
+    small, large = model_tiers(settings)
+    if tier is None:
+        tier = _pick_tier(req, small, large)
+
+    turn_started = time.perf_counter()
+    series = llm_metrics.series(req.scene, tier.model)
+    menu_index: List[str] = []
+    messages = build_messages(req, menu_index)
+    series.observe(STAGE_BUILD, time.perf_counter() - turn_started)
+    logger.info(f"[AI-REQ] scene={req.scene}, text={req.text}")
+
+    if tier is large:
+        ok, content = await _call_tier(req, messages, large)
+        result = _parse_completion(req, content, series, menu_index) if ok else None
+        if small is not None:
+            tiering_stats.finished(large.name, (time.perf_counter() - turn_started) * 1000)
+        return result
+
+    # 작은 모델: 헤지/재시도 없이 한 번만 (실패하면 재시도 대신 큰 모델로 올림)
+    policy = replace(default_policy, deadline=min(default_policy.deadline, small.timeout), max_retries=0)
+    ok, content = await _call_tier(req, messages, small, policy, hedge=False)
+    partial: Optional[AnalyzeResponse] = None
+    reason = ESCALATE_ERROR
+    if ok:
+        dropped: List[Any] = []
+        partial = _parse_completion(req, content, series, menu_index, dropped)
+        if partial is not None and not dropped:
+            tiering_stats.finished(small.name, (time.perf_counter() - turn_started) * 1000)
+            return partial
+        reason = ESCALATE_DROPPED_ACTIONS if partial is not None else ESCALATE_INVALID_JSON
+
+    series.inc(COUNTER_TIER_ESCALATION)
+    tiering_stats.escalated(reason)
+    logger.warning(f"[AI-TIER] {small.model} -> {large.model} ({reason}, scene={req.scene})")
+    remaining = default_policy.deadline - (time.perf_counter() - turn_started)
+    result = None
+    if remaining > 0:
+        ok, content = await _call_tier(req, messages, large, replace(default_policy, deadline=remaining))
+        if ok:
+            result = _parse_completion(req, content, llm_metrics.series(req.scene, large.model), menu_index)
+    tiering_stats.finished("escalated", (time.perf_counter() - turn_started) * 1000)
+    # 큰 모델도 실패하면 action 일부가 떨어진 작은 모델 답이라도 쓴다 (오류 안내보다 낫다)
+    return result if result is not None else partial
+
+
 # ======================================
 # 외부에 노출되는 주요 함수
 # ======================================
 
-def call_llm(req: AnalyzeRequest) -> AnalyzeResponse:
+async def call_llm(req: AnalyzeRequest) -> AnalyzeResponse:
     """
     /analyze 엔드포인트에서 사용하는 핵심 LLM 호출 함수.
+    - 규칙 기반 fast-path (확신할 때만 LLM 생략)
+    - 응답 캐시 조회 (같은 상태에서 같은 발화)
     - 프롬프트 생성
     - OpenAI 호출
     - JSON 파싱
     - actions 검증/보정
-    - 예외/에러 시 안전한 fallback 응답
+    - 예외/에러 시 안전한 fallback 응답 (fallback은 캐시하지 않음)
+    - actions를 장바구니에 반영한 결과 cart/totalPrice 채우기 (cart_engine)
     """
+    response, _ = await call_llm_with_status(req)
+    return response
 
-    messages = build_messages(req)
-    logger.info(f"[AI-REQ] scene={req.scene}, text={req.text}")
 
-    try:
-        completion = client.chat.completions.create(
-            model=DEFAULT_MODEL,
+async def call_llm_with_status(
+    req: AnalyzeRequest, use_cache: bool = True, priority: Optional[int] = None
+) -> Tuple[AnalyzeResponse, bool]:
+    """
+    call_llm과 같지만 (응답, fallback 여부)를 함께 돌려준다.
+    admission에서 shed된 안내 응답도 LLM 답이 아니므로 fallback으로 본다 (미리 분석 결과로 재사용하지 않도록).
+    use_cache=False면 응답 캐시를 읽지도 쓰지도 않는다 (프롬프트 회귀 테스트용).
+    priority는 admission 우선순위 (None이면 요청 내용으로 정함, 배치 재생은 PRIORITY_BATCH).
+    """
+
+    # 단순 발화는 규칙 기반 fast-path로 바로 응답 (LLM 호출 생략)
+    fast = fast_route(req) or filter_route(req)
+    if fast is not None:
+        return apply_to_response(req, fast), False
+
+    cache = get_response_cache()
+    cache_key = response_cache_key(req) if use_cache and RESPONSE_CACHE_ENABLED else None
+    if cache_key is not None:
+        cached = await cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"[AI-CACHE] hit scene={req.scene}, text={req.text}")
+            return apply_to_response(req, AnalyzeResponse.model_validate(cached)), False
+
+    # 진행 중인 LLM 턴이 많으면 우선순위 대기열에서 기다리고, 마감 안에 못 들어가면 짧은 안내로 응답
+    series = llm_metrics.series(req.scene, get_settings().openai_model)
+    started = time.perf_counter()
+    async with admission_controller.slot(req, priority) as admitted:
+        series.observe(STAGE_ADMISSION, time.perf_counter() - started)
+        if not admitted:
+            return apply_to_response(req, shed_response(req)), True
+        result = await _request_llm(req)
+    if result is None:
+        series.inc(COUNTER_FALLBACK)
+        return apply_to_response(req, _build_safe_fallback_response(req)), True
+
+    if cache_key is not None:
+        await cache.set(cache_key, result.model_dump(), RESPONSE_CACHE_TTL)
+    return apply_to_response(req, result), False
+
+
+async def stream_llm(req: AnalyzeRequest) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    /analyze/stream 용 스트리밍 버전.
+    ("delta", {"text": ...}) 이벤트를 assistant_text가 생성되는 대로 내보내고,
+    마지막에 ("final", AnalyzeResponse) 하나를 내보낸다.
+    final의 assistant_text가 최종본이다 (실패 시 fallback 문장으로 바뀔 수 있음).
+    모델 티어는 /analyze와 같이 고른다: 큰 티어는 토큰 단위로 흘리고,
+    작은 티어는 escalation까지 끝낸 답을 delta 한 번으로 보낸다.
+    """
+    fast = fast_route(req) or filter_route(req)
+    if fast is not None:
+        yield "delta", {"text": fast.assistant_text}
+        yield "final", apply_to_response(req, fast)
+        return
+
+    cache = get_response_cache()
+    cache_key = response_cache_key(req) if RESPONSE_CACHE_ENABLED else None
+    if cache_key is not None:
+        cached = await cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"[AI-CACHE] hit scene={req.scene}, text={req.text}")
+            yield "delta", {"text": cached["assistant_text"]}
+            yield "final", apply_to_response(req, AnalyzeResponse.model_validate(cached))
+            return
+
+    settings = get_settings()
+    series = llm_metrics.series(req.scene, settings.openai_model)
+    started = time.perf_counter()
+    async with admission_controller.slot(req) as admitted:
+        series.observe(STAGE_ADMISSION, time.perf_counter() - started)
+        if not admitted:
+            shed = shed_response(req)
+            yield "delta", {"text": shed.assistant_text}
+            yield "final", apply_to_response(req, shed)
+            return
+        # 작은 티어 턴은 짧고 빨라 토큰 단위로 흘릴 이득이 적고, 이미 흘린 delta는 escalation으로 되돌릴 수 없으므로
+        # /analyze와 같은 경로(escalation 포함)로 받아 delta 한 번 + final로 내보낸다
+        small, large = model_tiers(settings)
+        tier = _pick_tier(req, small, large)
+        if tier is not large:
+            result = await _request_llm(req, tier)
+            if result is None:
+                series.inc(COUNTER_FALLBACK)
+                result = _build_safe_fallback_response(req)
+            elif cache_key is not None:
+                await cache.set(cache_key, result.model_dump(), RESPONSE_CACHE_TTL)
+            yield "delta", {"text": result.assistant_text}
+            yield "final", apply_to_response(req, result)
+            return
+        # 스트림이 끝날 때까지 자리를 잡고 있는다
+        turn_started = time.perf_counter()
+        async for event in _stream_admitted(req, large, series, cache, cache_key):
+            yield event
+        if small is not None:
+            tiering_stats.finished(large.name, (time.perf_counter() - turn_started) * 1000)
+
+
+async def _stream_admitted(
+    req: AnalyzeRequest, tier: ModelTier, series: StageSeries, cache, cache_key: Optional[str]
+) -> AsyncIterator[Tuple[str, Any]]:
+    started = time.perf_counter()
+    menu_index: List[str] = []
+    messages = build_messages(req, menu_index)
+    series.observe(STAGE_BUILD, time.perf_counter() - started)
+    logger.info(f"[AI-REQ] scene={req.scene}, text={req.text}, stream=True")
+
+    parser = AssistantTextStreamParser("t" if compact_output() else "assistant_text")
+    parts: List[str] = []
+    result: Optional[AnalyzeResponse] = None
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + default_policy.deadline
+
+    async def open_stream(model: str, timeout: float):
+        return await get_llm_client().chat.completions.create(
+            model=model,
             response_format={"type": "json_object"},
             messages=messages,
             temperature=0.3,
-            timeout=10,  # 초 단위, 필요시 조정
+            timeout=min(tier.timeout, timeout),
+            stream=True,
+            **({"max_tokens": tier.max_tokens} if tier.max_tokens else {}),
         )
-        content = completion.choices[0].message.content
+
+    try:
+        async with _get_semaphore():
+            started = time.perf_counter()
+            first_token = True
+            # 스트림 여는 단계까지만 재시도/서킷 브레이커 적용 (이미 내보낸 delta는 되돌릴 수 없으므로 헤지 없음)
+            stream = await call_with_resilience(open_stream, tier.model, hedge=False)
+            try:
+                async for chunk in stream:
+                    if loop.time() > deadline:
+                        raise DeadlineExceeded("stream did not finish within the turn deadline")
+                    if not chunk.choices:
+                        continue
+                    piece = chunk.choices[0].delta.content
+                    if not piece:
+                        continue
+                    if first_token:
+                        series.observe(STAGE_TTFT, time.perf_counter() - started)
+                        first_token = False
+                    parts.append(piece)
+                    delta = parser.feed(piece)
+                    if delta:
+                        yield "delta", {"text": delta}
+            finally:
+                await stream.close()
+            series.observe(STAGE_UPSTREAM, time.perf_counter() - started)
+        content = "".join(parts)
         logger.debug(f"[AI-RAW] {content}")
+        # 스트리밍 응답에는 usage가 없으므로 추정치
+        series.inc(COUNTER_OUTPUT_TOKENS, estimate_tokens(content))
+        result = _parse_completion(req, content, series, menu_index)
+    except CircuitOpenError:
+        logger.warning(f"[AI-ERROR] Circuit open, fallback 응답 사용 (scene={req.scene})")
+    except DeadlineExceeded as e:
+        logger.error(f"[AI-ERROR] {e}")
     except OpenAIError as e:
         logger.error(f"[AI-ERROR] OpenAIError: {e}")
-        return _build_safe_fallback_response(req)
     except Exception as e:
         logger.error(f"[AI-ERROR] Unexpected error: {e}")
-        return _build_safe_fallback_response(req)
 
-    # JSON 파싱
-    try:
-        data = json.loads(content)
-    except json.JSONDecodeError:
-        logger.error("[AI-ERROR] JSON 디코딩 실패, fallback 응답 사용")
-        return _build_safe_fallback_response(req)
+    if result is None:
+        series.inc(COUNTER_FALLBACK)
+        yield "final", apply_to_response(req, _build_safe_fallback_response(req))
+        return
 
-    # 필수 필드 기본값 보정
-    data.setdefault(
-        "assistant_text",
-        "죄송합니다. 다시 한 번만 말씀해 주시겠어요?",
-    )
-    data.setdefault("should_finish", False)
-    data.setdefault("next_scene", req.scene)
+    if cache_key is not None:
+        await cache.set(cache_key, result.model_dump(), RESPONSE_CACHE_TTL)
+    yield "final", apply_to_response(req, result)
 
-    # actions 검증/보정
-    raw_actions = data.get("actions")
-    valid_menu_ids = {m.menuId for m in req.menu}
-    data["actions"] = _normalize_actions(raw_actions, valid_menu_ids, req.scene)
 
-    logger.info(
-        f"[AI-RES] scene={req.scene}, assistant_text={data.get('assistant_text')}"
-    )
+# ======================================
+# 워밍업
+# ======================================
 
-    # Pydantic 모델로 최종 검증
-    return AnalyzeResponse(**data)
+def warm_prompt_fragments(menu: List[MenuItem], scenes) -> int:
+    """
+    scene별 기본 메뉴 블록(후보 가지치기 + 예산 축약)과 system 프롬프트 토큰 수를 미리 계산해
+    첫 요청이 렌더링 비용을 내지 않게 한다. 반환: 미리 만든 scene 수
+    """
+    compact = compact_output()
+    system_message = _COMPACT_SYSTEM_MESSAGE if compact else _SYSTEM_MESSAGE
+    estimate_tokens(system_message["content"], cache=True)
+    estimate_tokens(_format_menu(menu), cache=True)
+    for scene in scenes:
+        # 요청과 같은 메뉴 객체(CatalogMenu / 카탈로그 행)를 그대로 쓰도록 검증 없이 넣는다
+        req = AnalyzeRequest(text="", scene=scene)
+        req.menu = menu
+        candidates, n_focus = select_candidates_with_focus(req)
+        _fit_menu(candidates, n_focus, numbered=compact)
+    return len(scenes)
+
+
+async def warm_connections(n: int, timeout: float = 5.0) -> int:
+    """
+    업스트림 커넥션 n개를 미리 열어 keep-alive 풀에 넣어 둔다 (GET /models 동시 호출).
+    반환: 성공한 호출 수 (실패해도 서비스는 fallback으로 동작하므로 예외를 던지지 않음)
+    """
+    client = get_llm_client()
+    if n <= 0:
+        return 0
+    results = await asyncio.gather(
+        *(client.models.list(timeout=timeout) for _ in range(n)), return_exceptions=True
+    )
+    failed = [r for r in results if isinstance(r, BaseException)]
+    if failed:
+        logger.warning(f"[AI-WARMUP] {len(failed)}/{n} upstream warm-up calls failed: {failed[0]!r}")
+    return n - len(failed)
+
+
+async def aclose_client() -> None:
+    """앱 종료 시 공유 클라이언트의 커넥션 풀을 정리한다 (만들어진 적이 없으면 아무것도 안 함)."""
+    global _client, _llm_semaphore
+    if _client is not None:
+        await _client.close()
+    _client = None
+    _llm_semaphore = None
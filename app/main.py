@@ -1,43 +1,291 @@
 # app/main.py
-import os
+import asyncio
+from contextlib import asynccontextmanager, suppress
+from typing import Literal, Optional
 
-from fastapi import FastAPI
+from fastapi import APIRouter, FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 
-from dotenv import load_dotenv
-
+from .admission import admission_controller
+from .batch import DEFAULT_CONCURRENCY, MAX_CONCURRENCY, run_batch
 from .models import AnalyzeRequest, AnalyzeResponse
-from .llm_client import call_llm
+from .llm_client import call_llm, stream_llm, aclose_client, set_llm_client
+from .menu_catalog import MenuVersionMismatch, apply_catalog_menu, get_catalog
+from .fast_router import fast_path_stats
+from .menu_filter import menu_filter_stats
+from .menu_fuzzy import menu_repair_stats
+from .model_tiering import tiering_stats
+from .menu_retrieval import pruning_stats
+from .metrics import llm_metrics
+from .prompt_cache import prompt_cache_stats
+from .recommender import recommend_stats
+from .resilience import resilience_stats_snapshot
+from .serialization import decode_analyze_request, dumps_str, encode_response, strict_mode
+from .response_cache import get_response_cache
+from .session_store import get_session_store, load_session, save_turn
+from .settings import Settings, load_env, set_settings
+from .speculation import replay, speculator
+from .warmup import Readiness, warm_up
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 워밍업(카탈로그 / 프롬프트 조각 / 업스트림 커넥션)은 백그라운드에서:
+    # /health는 바로 응답하고, /ready는 워밍업이 끝나야 200
+    warmup_task = asyncio.create_task(warm_up(app.state.readiness))
+    yield
+    warmup_task.cancel()
+    with suppress(asyncio.CancelledError):
+        await warmup_task
+    # 종료 시 OpenAI 커넥션 풀 정리
+    await aclose_client()
+
+
+router = APIRouter()
+
+
+def create_app(settings: Optional[Settings] = None) -> FastAPI:
+    """
+    앱 팩토리.
+    - settings를 주면 그 값으로 LLM 클라이언트를 만든다 (테스트/도구에서 주입)
+    - 주지 않으면 첫 LLM 호출(또는 워밍업) 때 .env + 환경 변수에서 읽는다
+    실행: uvicorn app.main:create_app --factory  (uvicorn app.main:app 도 그대로 동작)
+    """
+    load_env()
+    if settings is not None:
+        set_settings(settings)
+        set_llm_client(None)
+
+    app = FastAPI(
+        title="Slow Kiosk AI Service",
+        version="0.2.0",
+        description="키오스크 주문 LLM 백엔드 (Python + FastAPI, 재료/커스터마이즈 지원)",
+        lifespan=lifespan,
+    )
+    app.state.readiness = Readiness()
+
+    # CORS (로컬 프론트/백 테스트용, 필요에 따라 도메인 제한)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],   # 실제 운영 시 특정 도메인만 허용하는 게 안전
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    app.include_router(router)
+    _add_request_schemas(app)
+    return app
+
+
+# /analyze 계열은 바디를 직접 디코딩하므로 (app.serialization) 문서용 요청 스키마를 따로 붙인다
+_ANALYZE_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {"application/json": {"schema": {"$ref": "#/components/schemas/AnalyzeRequest"}}},
+    }
+}
 
-# .env 읽기 (OPENAI_API_KEY, OPENAI_MODEL 등)
-load_dotenv()
 
-app = FastAPI(
-    title="Slow Kiosk AI Service",
-    version="0.2.0",
-    description="키오스크 주문 LLM 백엔드 (Python + FastAPI, 재료/커스터마이즈 지원)",
-)
+def _add_request_schemas(app: FastAPI) -> None:
+    base_openapi = app.openapi
 
-# CORS (로컬 프론트/백 테스트용, 필요에 따라 도메인 제한)
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],   # 실제 운영 시 특정 도메인만 허용하는 게 안전
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+    def openapi():
+        if app.openapi_schema is None:
+            schema = base_openapi()
+            request_schema = AnalyzeRequest.model_json_schema(ref_template="#/components/schemas/{model}")
+            components = schema.setdefault("components", {}).setdefault("schemas", {})
+            for name, definition in request_schema.pop("$defs", {}).items():
+                components.setdefault(name, definition)
+            components["AnalyzeRequest"] = request_schema
+        return app.openapi_schema
 
+    app.openapi = openapi
 
-@app.get("/health")
+
+def __getattr__(name: str):
+    # `uvicorn app.main:app` 호환: 모듈 import만으로는 앱을 만들지 않고 처음 접근할 때 만든다
+    if name == "app":
+        app = globals()["app"] = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+@router.get("/health")
 def health():
     return {"status": "ok"}
 
 
-@app.post("/analyze", response_model=AnalyzeResponse)
-def analyze(req: AnalyzeRequest):
+@router.get("/ready")
+def ready(request: Request):
+    """워밍업이 끝났는지 (로드밸런서/오토스케일러 readiness probe용). 끝나기 전에는 503."""
+    readiness: Readiness = request.app.state.readiness
+    return JSONResponse(readiness.snapshot(), status_code=200 if readiness.ready else 503)
+
+
+@router.get("/menu/version")
+def menu_version():
+    """Spring이 menuVersion으로 보낼 현재 카탈로그 버전."""
+    catalog = get_catalog()
+    return {"menuVersion": catalog.version, "count": len(catalog)}
+
+
+@router.get("/stats")
+def stats():
+    """내부 캐시 적중률 등 운영 지표."""
+    return {
+        "prompt_cache": prompt_cache_stats(),
+        "menu_pruning": pruning_stats.stats(),
+        "fast_path": fast_path_stats.stats(),
+        "menu_filter": menu_filter_stats.stats(),
+        "menu_repair": menu_repair_stats.stats(),
+        "recommend": recommend_stats.stats(),
+        "response_cache": get_response_cache().stats(),
+        "sessions": get_session_store().stats(),
+        "speculation": speculator.stats(),
+        "admission": admission_controller.stats(),
+        "model_tiering": tiering_stats.stats(),
+        "resilience": resilience_stats_snapshot(),
+    }
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """단계별 LLM 지연 히스토그램 / fallback 등 카운터 / admission 대기열 (Prometheus 텍스트 포맷)."""
+    body = llm_metrics.render() + admission_controller.render()
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+async def _prepare_request(req: AnalyzeRequest):
+    """
+    LLM 호출 전 요청 보정.
+    - sessionId가 있으면 서버 세션에서 scene/cart/history 채움
+    - menu를 안 보냈으면 서버 카탈로그(menuVersion/menuIds)로 채움
+    반환: 세션 상태 (세션 요청이 아니면 None)
+    """
+    session = await load_session(req)
+    if req.scene is None:
+        raise HTTPException(status_code=422, detail="scene is required without sessionId")
+    try:
+        apply_catalog_menu(req)
+    except MenuVersionMismatch as e:
+        raise HTTPException(
+            status_code=409,
+            detail={"message": "menuVersion mismatch", "menuVersion": e.current},
+        )
+    return session
+
+
+@router.post("/analyze", response_model=AnalyzeResponse, openapi_extra=_ANALYZE_BODY)
+async def analyze(request: Request):
     """
     React(STT 처리 완료 텍스트) -> Spring -> Python 으로 들어오는 메인 엔드포인트.
+    이벤트 루프에서 바로 처리되므로 LLM 응답을 기다리는 동안 스레드를 점유하지 않는다.
+    Body: AnalyzeRequest (STRICT_SERIALIZATION=false면 orjson 디코딩 + 인라인 메뉴 지연 검증)
     """
+    req = decode_analyze_request(await request.body())
+    session = await _prepare_request(req)
+
     # 여기서 req.text, req.scene, req.cart, req.menu를 LLM에 넘겨 분석
-    result = call_llm(req)
-    return result
+    # (중간 STT 결과로 같은 발화를 미리 분석해 둔 것이 있으면 그 결과)
+    result = await speculator.take(req)
+    if result is None:
+        result = await call_llm(req)
+
+    if session is not None:
+        # 캐시/fast-path 응답 객체를 건드리지 않도록 복사본에 revision 기록
+        result = result.model_copy(
+            update={"sessionRevision": await save_turn(req, session, result)}
+        )
+    if strict_mode():
+        return result
+    # 이미 검증된 응답이므로 response_model 재검증 없이 바로 인코딩
+    return Response(encode_response(result), media_type="application/json")
+
+
+@router.post("/analyze/stream", openapi_extra=_ANALYZE_BODY)
+async def analyze_stream(request: Request):
+    """
+    /analyze의 SSE 스트리밍 버전. TTS를 더 빨리 시작하기 위한 용도.
+    - event: delta → data: {"text": "..."} (assistant_text 조각, 생성되는 대로)
+    - event: final → data: AnalyzeResponse (검증된 actions/should_finish/next_scene 포함)
+    """
+    req = decode_analyze_request(await request.body())
+    session = await _prepare_request(req)
+    speculated = await speculator.take(req)
+    events = replay(speculated) if speculated is not None else stream_llm(req)
+
+    async def event_source():
+        async for event, payload in events:
+            if event == "final":
+                if session is not None:
+                    payload = payload.model_copy(
+                        update={"sessionRevision": await save_turn(req, session, payload)}
+                    )
+                payload = payload.model_dump()
+            data = dumps_str(payload)
+            yield f"event: {event}\ndata: {data}\n\n"
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post("/analyze/interim", status_code=202, openapi_extra=_ANALYZE_BODY)
+async def analyze_interim(request: Request):
+    """
+    중간(interim) STT 결과. Spring이 최종 /analyze 전에 같은 sessionId로 여러 번 보낸다.
+    발화가 SPECULATION_STABLE_MS 동안 그대로면 미리 분석을 시작하고, 바뀌면 취소 후 다시 건다.
+    최종 /analyze(/analyze/stream)의 발화/상태가 같으면 그 결과를 바로 쓴다.
+    Body: AnalyzeRequest (sessionId 필수)
+    Response: {"status": "scheduled" | "unchanged" | "ignored" | "disabled"}
+    """
+    req = decode_analyze_request(await request.body())
+    if not req.sessionId:
+        raise HTTPException(status_code=422, detail="sessionId is required for interim transcripts")
+    await _prepare_request(req)
+    return {"status": speculator.offer(req)}
+
+
+@router.post("/analyze/batch")
+async def analyze_batch(
+    request: Request,
+    concurrency: int = Query(DEFAULT_CONCURRENCY, ge=1, le=MAX_CONCURRENCY),
+    rate: float = Query(0.0, ge=0.0),
+    order: Literal["input", "completion"] = "input",
+    use_cache: bool = False,
+):
+    """
+    오프라인 재생/부하 평가용 배치 엔드포인트.
+    Body: JSONL (한 줄에 AnalyzeRequest 하나)
+    Response: JSONL (한 줄에 {"index", "latency_ms", "response", "error"})
+    - concurrency: 동시에 처리할 최대 건수 (1~BATCH_MAX_CONCURRENCY, admission 우선순위는 가장 낮음)
+    - rate: 초당 최대 시작 건수 (0이면 제한 없음)
+    - order: input(입력 순서) / completion(끝나는 순서)
+    - use_cache: 응답 캐시 사용 여부 (기본 false → 항상 LLM 호출)
+    """
+
+    # StreamingResponse가 연결 끊김 감지를 위해 receive()를 읽으므로 바디는 먼저 다 받아 둔다
+    body = await request.body()
+    lines = body.decode("utf-8-sig").splitlines()
+
+    async def results():
+        async for item in run_batch(
+            lines,
+            concurrency=concurrency,
+            rate=rate,
+            ordered=order == "input",
+            use_cache=use_cache,
+        ):
+            yield dumps_str(item) + "\n"
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+
+@router.delete("/sessions/{session_id}")
+async def end_session(session_id: str):
+    """주문 완료/취소 시 세션 정리."""
+    await get_session_store().delete(session_id)
+    return {"status": "ok"}
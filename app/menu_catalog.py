@@ -0,0 +1,267 @@
+# app/menu_catalog.py
+import os
+import csv
+import hashlib
+import logging
+import time
+import threading
+from pathlib import Path
+from types import MappingProxyType
+from typing import Dict, Hashable, List, Mapping, Optional, Sequence, Tuple
+
+from .models import AnalyzeRequest, MenuItem
+from .prompt_cache import clear_prompt_cache
+
+logger = logging.getLogger(__name__)
+
+# --------------------------------------------------
+# 메뉴 마스터 CSV 경로 (MENU_CSV_PATH로 교체 가능)
+# --------------------------------------------------
+DEFAULT_MENU_CSV_PATH = (
+    Path(__file__).resolve().parent.parent / "hamberger_menu_master_ingredients_allege_add.csv"
+)
+MENU_CSV_PATH = Path(os.getenv("MENU_CSV_PATH", str(DEFAULT_MENU_CSV_PATH)))
+
+# --------------------------------------------------
+# 컴파일된 카탈로그 파일 (app.menu_pack, 워커 간 mmap 공유)
+# - MENU_CATALOG_PATH: 지정하면 CSV 대신 이 파일을 mmap (비우면 CSV)
+# - MENU_CATALOG_CHECK_INTERVAL: 파일이 바뀌었는지(os.replace로 교체) 확인하는 간격(초)
+# --------------------------------------------------
+MENU_CATALOG_PATH = os.getenv("MENU_CATALOG_PATH") or None
+MENU_CATALOG_CHECK_INTERVAL = float(os.getenv("MENU_CATALOG_CHECK_INTERVAL", "5"))
+
+# CSV 컬럼 → MenuItem 필드 이름이 다른 것들
+_RENAMED_COLUMNS = {
+    "menu_id": "menuId",
+    "name_ko": "name",
+    "price_krw": "price",
+}
+_INT_FIELDS = {"price", "display_order"}
+_FLOAT_FIELDS = {
+    "kcal", "protein_g", "fat_g", "saturated_fat_g", "carbs_g", "sugars_g", "sodium_mg",
+}
+
+
+class MenuVersionMismatch(Exception):
+    """요청의 menuVersion이 서버 카탈로그 버전과 다를 때."""
+
+    def __init__(self, requested: str, current: str):
+        super().__init__(f"menuVersion mismatch: requested={requested}, current={current}")
+        self.requested = requested
+        self.current = current
+
+
+class CatalogMenu(list):
+    """select(None)이 돌려주는 전체 메뉴 리스트. menu_fingerprint 결과를 미리 붙여 둔다."""
+    _fingerprint = None
+
+
+class MenuCatalog:
+    """
+    CSV에서 읽어온 메뉴 전체를 들고 있는 읽기 전용 카탈로그.
+    - version: CSV 내용 해시 (내용이 같으면 항상 같은 값)
+    - items: CSV 순서 그대로의 MenuItem 튜플
+    - by_id: menuId → MenuItem
+    """
+
+    def __init__(self, items: Sequence[MenuItem], version: str):
+        self._items: Tuple[MenuItem, ...] = tuple(items)
+        self._by_id: Mapping[str, MenuItem] = MappingProxyType(
+            {m.menuId: m for m in self._items}
+        )
+        self._version = version
+
+    @property
+    def version(self) -> str:
+        return self._version
+
+    @property
+    def items(self) -> Tuple[MenuItem, ...]:
+        return self._items
+
+    @property
+    def by_id(self) -> Mapping[str, MenuItem]:
+        return self._by_id
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, menu_id: str) -> Optional[MenuItem]:
+        return self._by_id.get(menu_id)
+
+    def owns(self, m) -> bool:
+        """m이 이 카탈로그의 메뉴 객체인지 (menu_fingerprint용)."""
+        return self._by_id.get(m.menuId) is m
+
+    def select(self, menu_ids: Optional[Sequence[str]] = None) -> List[MenuItem]:
+        """
+        menu_ids에 해당하는 메뉴만 골라서 반환 (요청 순서 유지).
+        menu_ids가 None이면 전체 메뉴 (fingerprint를 미리 붙여 둔 CatalogMenu, 행마다 다시 확인하지 않음).
+        """
+        if menu_ids is None:
+            menu = CatalogMenu(self.items)
+            menu._fingerprint = self.version + ":*"
+            return menu
+
+        selected = []
+        for menu_id in menu_ids:
+            item = self.get(menu_id)
+            if item is None:
+                logger.warning(f"[MENU] Unknown menuId in menuIds: {menu_id}")
+                continue
+            selected.append(item)
+        return selected
+
+
+# ======================================
+# CSV 로딩
+# ======================================
+
+def _parse_value(field: str, raw: str):
+    raw = raw.strip()
+    if raw == "":
+        return None
+    if raw in ("True", "False"):
+        return raw == "True"
+    if field in _INT_FIELDS:
+        return int(float(raw))
+    if field in _FLOAT_FIELDS:
+        return float(raw)
+    return raw
+
+
+def _row_to_menu_item(row: Dict[str, str]) -> MenuItem:
+    data = {}
+    for column, raw in row.items():
+        field = _RENAMED_COLUMNS.get(column, column)
+        if field not in MenuItem.model_fields:
+            continue
+        if field == "tags":
+            data["tags"] = [t.strip() for t in raw.split(",") if t.strip()]
+            continue
+        value = _parse_value(field, raw)
+        if value is not None:
+            data[field] = value
+    return MenuItem(**data)
+
+
+def load_catalog(path: Path = MENU_CSV_PATH) -> MenuCatalog:
+    """메뉴 마스터 CSV를 읽어 MenuCatalog를 만든다."""
+    raw = Path(path).read_bytes()
+    version = hashlib.sha256(raw).hexdigest()[:16]
+
+    # utf-8-sig: 엑셀에서 저장한 BOM 제거
+    text = raw.decode("utf-8-sig")
+    reader = csv.DictReader(text.splitlines())
+    items = [_row_to_menu_item(row) for row in reader]
+
+    logger.info(f"[MENU] Catalog loaded: path={path}, items={len(items)}, version={version}")
+    return MenuCatalog(items, version)
+
+
+_catalog: Optional[MenuCatalog] = None
+_catalog_lock = threading.Lock()
+_next_check = 0.0
+
+
+def _load_default() -> MenuCatalog:
+    if MENU_CATALOG_PATH:
+        from .menu_pack import load_compiled_catalog
+
+        catalog = load_compiled_catalog(Path(MENU_CATALOG_PATH))
+        logger.info(
+            f"[MENU] Compiled catalog mapped: path={MENU_CATALOG_PATH}, items={len(catalog)}, version={catalog.version}"
+        )
+        return catalog
+    return load_catalog()
+
+
+def _compiled_file_changed(catalog: MenuCatalog) -> bool:
+    """컴파일된 카탈로그 파일이 교체됐는지 (MENU_CATALOG_CHECK_INTERVAL마다 stat 한 번)."""
+    global _next_check
+    now = time.monotonic()
+    if now < _next_check:
+        return False
+    _next_check = now + MENU_CATALOG_CHECK_INTERVAL
+    try:
+        st = os.stat(MENU_CATALOG_PATH)
+    except OSError:
+        return False  # 교체 중이거나 지워졌으면 지금 카탈로그를 계속 사용
+    return (st.st_ino, st.st_mtime_ns, st.st_size) != getattr(catalog, "file_id", None)
+
+
+def get_catalog() -> MenuCatalog:
+    """
+    프로세스 공용 카탈로그 (최초 호출 시 로딩: MENU_CATALOG_PATH가 있으면 컴파일된 파일을 mmap, 없으면 CSV).
+    컴파일된 파일이 교체되면 다음 확인 때 새 파일로 바꾼다.
+    """
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = _load_default()
+    elif MENU_CATALOG_PATH and _compiled_file_changed(_catalog):
+        try:
+            return reload_catalog()
+        except (OSError, ValueError) as e:
+            logger.error(f"[MENU] Compiled catalog reload failed, keeping version={_catalog.version}: {e}")
+    return _catalog
+
+
+def reload_catalog(path: Optional[Path] = None) -> MenuCatalog:
+    """카탈로그를 다시 읽어 교체한다 (path가 없으면 MENU_CATALOG_PATH 또는 MENU_CSV_PATH)."""
+    global _catalog
+    catalog = load_catalog(path) if path is not None else _load_default()
+    with _catalog_lock:
+        _catalog = catalog
+    # 이전 카탈로그 기준으로 렌더링된 프롬프트 조각은 더 이상 유효하지 않음
+    clear_prompt_cache()
+    logger.info(f"[MENU] Catalog replaced: version={catalog.version}")
+    return catalog
+
+
+def menu_fingerprint(menu: Sequence[MenuItem]) -> Hashable:
+    """
+    메뉴 리스트 내용을 대표하는 캐시 키.
+    - 카탈로그 객체만으로 구성된 경우: "카탈로그 버전:menuId 순서" 문자열 (직렬화 없이 계산)
+    - 요청으로 직접 넘어온 메뉴: 프롬프트에 쓰이는 필드 값 튜플
+      (JSON 직렬화 후 해시하는 것보다 훨씬 싸고, 값 비교라 충돌도 없음)
+    """
+    # 한 요청 안에서 같은 리스트로 여러 번 불리므로, 결과를 붙여 둘 수 있는 리스트(LazyMenu)면 재사용
+    cached = getattr(menu, "_fingerprint", None)
+    if cached is not None:
+        return cached
+
+    catalog = _catalog
+    if catalog is not None and all(catalog.owns(m) for m in menu):
+        return catalog.version + ":" + ",".join(m.menuId for m in menu)
+
+    fingerprint = tuple(
+        (
+            m.menuId, m.name, m.category, m.price, m.kcal,
+            m.ingredients_ko, m.customizable_ko, m.allergens_ko,
+            m.nutrition_summary_ko, tuple(m.tags),
+        )
+        for m in menu
+    )
+    if hasattr(menu, "_fingerprint"):
+        menu._fingerprint = fingerprint
+    return fingerprint
+
+
+def apply_catalog_menu(req: AnalyzeRequest) -> AnalyzeRequest:
+    """
+    요청에 menu 배열이 없으면 서버 카탈로그에서 채워 넣는다.
+    - menu를 직접 보낸 경우: 그대로 사용 (fallback 경로)
+    - menuVersion이 현재 카탈로그와 다르면 MenuVersionMismatch
+    - menuIds가 있으면 해당 메뉴만, 없으면 전체 카탈로그
+    """
+    if req.menu:
+        return req
+
+    catalog = get_catalog()
+    if req.menuVersion is not None and req.menuVersion != catalog.version:
+        raise MenuVersionMismatch(req.menuVersion, catalog.version)
+
+    req.menu = catalog.select(req.menuIds)
+    return req
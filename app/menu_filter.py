@@ -0,0 +1,396 @@
+# app/menu_filter.py
+"""
+알레르기/식단/카테고리/가격 조건 검색 (LLM 없이).
+
+"우유 안 들어간 버거 뭐 있어?", "안 매운 6000원 이하 버거" 같은 발화를 FilterQuery로 바꾸고,
+메뉴별 bool 컬럼(allergen_*, is_*)과 category / price를 미리 비트셋으로 만들어 둔
+MenuFlagIndex에서 AND 연산만으로 답을 찾는다 (메뉴 90개 기준 수 μs).
+
+- route(req): 답이 확실하면(매칭 0개, 또는 질문인데 매칭이 MENU_FILTER_DIRECT_MAX개 이하) 바로 응답
+- filter_candidates(req): 그 외에는 매칭된 메뉴만 프롬프트 메뉴 목록으로 넘기도록 (llm_client.build_messages)
+"""
+import os
+import re
+import logging
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .menu_catalog import menu_fingerprint
+from .models import AnalyzeRequest, AnalyzeResponse, KioskAction, MenuItem
+from .prompt_cache import LRUCache
+from .text_norm import compact
+
+logger = logging.getLogger(__name__)
+
+# --------------------------------------------------
+# 설정
+# - MENU_FILTER_ENABLED: false면 조건 검색을 건너뜀
+# - MENU_FILTER_DIRECT_MAX: 질문에 대한 매칭이 이 개수 이하면 LLM 없이 바로 목록으로 답함
+# --------------------------------------------------
+MENU_FILTER_ENABLED = os.getenv("MENU_FILTER_ENABLED", "true").lower() == "true"
+MENU_FILTER_DIRECT_MAX = int(os.getenv("MENU_FILTER_DIRECT_MAX", "4"))
+
+# 비트셋으로 만들 bool 컬럼 (MenuItem 필드 이름)
+FLAG_FIELDS: Tuple[str, ...] = tuple(
+    name for name, field in MenuItem.model_fields.items()
+    if name.startswith(("is_", "allergen_")) and field.annotation in (bool, Optional[bool])
+)
+_FLAG_ID: Dict[str, int] = {name: i for i, name in enumerate(FLAG_FIELDS)}
+
+
+# ======================================
+# 인덱스
+# ======================================
+
+class MenuFlagIndex:
+    """
+    메뉴 리스트 하나에 대한 비트셋 인덱스 (i번째 비트 = menu[i]).
+    - flag_true[f]: 해당 플래그가 True인 메뉴
+    - flag_known[f]: 값이 있는(None이 아닌) 메뉴
+    - category[c]: 카테고리별 메뉴
+    - 가격: 싼 순서 k개까지의 누적 마스크 → price <= X 는 이진 탐색 한 번
+    """
+
+    __slots__ = ("items", "all_mask", "flag_true", "flag_known", "category", "_prices", "_price_prefix")
+
+    def __init__(self, menu: Sequence[MenuItem]):
+        self.items: Tuple[MenuItem, ...] = tuple(menu)
+        n = len(self.items)
+        self.all_mask = (1 << n) - 1
+        self.flag_true: List[int] = [0] * len(FLAG_FIELDS)
+        self.flag_known: List[int] = [0] * len(FLAG_FIELDS)
+        self.category: Dict[str, int] = {}
+
+        for i, m in enumerate(self.items):
+            bit = 1 << i
+            for f, name in enumerate(FLAG_FIELDS):
+                value = getattr(m, name)
+                if value is None:
+                    continue
+                self.flag_known[f] |= bit
+                if value:
+                    self.flag_true[f] |= bit
+            self.category[m.category] = self.category.get(m.category, 0) | bit
+
+        order = sorted(range(n), key=lambda i: self.items[i].price)
+        self._prices = array("l", (self.items[i].price for i in order))
+        self._price_prefix: List[int] = [0] * (n + 1)
+        for k, i in enumerate(order):
+            self._price_prefix[k + 1] = self._price_prefix[k] | (1 << i)
+
+    def price_at_most(self, price: int) -> int:
+        return self._price_prefix[bisect_right(self._prices, price)]
+
+    def price_below(self, price: int) -> int:
+        return self._price_prefix[bisect_left(self._prices, price)]
+
+    def query(self, q: "FilterQuery") -> int:
+        mask = self.all_mask
+        for name in q.exclude_allergens:
+            # 알레르기 정보가 없는 메뉴는 안전하게 제외
+            f = _FLAG_ID[name]
+            mask &= self.flag_known[f] & ~self.flag_true[f]
+        for name in q.require:
+            mask &= self.flag_true[_FLAG_ID[name]]
+        for name in q.forbid:
+            mask &= ~self.flag_true[_FLAG_ID[name]]
+        if q.categories:
+            category_mask = 0
+            for c in q.categories:
+                category_mask |= self.category.get(c, 0)
+            mask &= category_mask
+        if q.max_price is not None:
+            mask &= self.price_at_most(q.max_price)
+        if q.min_price is not None:
+            mask &= ~self.price_below(q.min_price)
+        return mask
+
+    def items_for(self, mask: int) -> List[MenuItem]:
+        """마스크에 해당하는 메뉴 (원래 메뉴 순서)."""
+        result = []
+        while mask:
+            low = mask & -mask
+            result.append(self.items[low.bit_length() - 1])
+            mask ^= low
+        return result
+
+
+_index_cache = LRUCache(32)
+
+
+def flag_index(menu: Sequence[MenuItem]) -> MenuFlagIndex:
+    key = menu_fingerprint(menu)
+    index = _index_cache.get(key)
+    if index is None:
+        index = MenuFlagIndex(menu)
+        _index_cache.put(key, index)
+    return index
+
+
+# ======================================
+# 발화 → 조건
+# ======================================
+
+@dataclass(frozen=True)
+class FilterQuery:
+    exclude_allergens: Tuple[str, ...] = ()
+    require: Tuple[str, ...] = ()
+    forbid: Tuple[str, ...] = ()
+    categories: Tuple[str, ...] = ()
+    max_price: Optional[int] = None
+    min_price: Optional[int] = None
+
+    def has_constraints(self) -> bool:
+        # 카테고리만으로는 조건 검색으로 보지 않는다 ("버거 뭐 있어?"는 LLM/메뉴 안내 몫)
+        return bool(
+            self.exclude_allergens or self.require or self.forbid
+            or self.max_price is not None or self.min_price is not None
+        )
+
+    def describe(self) -> str:
+        parts = [f"{_ALLERGEN_LABELS[a]} 없음" for a in self.exclude_allergens]
+        parts += [_REQUIRE_LABELS[f] for f in self.require]
+        parts += [_FORBID_LABELS[f] for f in self.forbid]
+        if self.min_price is not None:
+            parts.append(f"{self.min_price:,}원 이상")
+        if self.max_price is not None:
+            parts.append(f"{self.max_price:,}원 이하")
+        return "·".join(parts)
+
+
+# 알레르기: "<재료>(조사)? + 부정/알레르기 표현"일 때만 제외 조건으로 본다 (각 항목은 정규식)
+_ALLERGEN_WORDS = {
+    "allergen_milk": ("우유", "유제품", "유당"),
+    "allergen_wheat": ("밀가루", "글루텐", "밀"),
+    "allergen_egg": ("계란", "달걀", "난류"),
+    "allergen_soy": ("대두", "(?<!땅)콩"),
+    "allergen_peanut": ("땅콩",),
+    "allergen_nut": ("견과류", "견과", "호두", "아몬드"),
+    "allergen_fish": ("생선", "어류"),
+    "allergen_shellfish": ("갑각류", "조개류", "조개"),
+    "allergen_pork": ("돼지고기", "돼지"),
+    "allergen_beef": ("소고기", "쇠고기"),
+    "allergen_shrimp": ("새우",),
+}
+_ALLERGEN_LABELS = {
+    "allergen_milk": "우유", "allergen_wheat": "밀", "allergen_egg": "계란", "allergen_soy": "대두",
+    "allergen_peanut": "땅콩", "allergen_nut": "견과류", "allergen_fish": "생선",
+    "allergen_shellfish": "갑각류", "allergen_pork": "돼지고기", "allergen_beef": "소고기",
+    "allergen_shrimp": "새우",
+}
+_NEGATION = r"(?:가|이|는|은|도|를|을|랑)?(?:안들|안넣|없|빼고|뺀|제외|알레르기|알러지|못먹|프리)"
+_ALLERGEN_PATTERNS = [
+    (field, re.compile("(?:" + "|".join(words) + ")" + _NEGATION))
+    for field, words in _ALLERGEN_WORDS.items()
+]
+
+# 식단/속성: (패턴, 필드)
+_FORBID_PATTERNS = [
+    (re.compile(r"안맵|안매운|안매워|맵지않|덜매운|매운거말고|매운건빼|매운거빼"), "is_spicy"),
+    (re.compile(r"디카페인|카페인(?:이|은)?(?:없|안들|빼)|논카페인"), "is_caffeine"),
+    (re.compile(r"탄산(?:이|은)?(?:없|안들|빼)|탄산말고|안탄산"), "is_carbonated"),
+]
+_REQUIRE_PATTERNS = [
+    (re.compile(r"매운|매콤|스파이시"), "is_spicy"),
+    (re.compile(r"비건"), "is_vegan"),
+    (re.compile(r"채식|베지테리언"), "is_vegetarian"),
+    (re.compile(r"제로|무설탕|설탕(?:이|은)?(?:없|안들)|슈가프리|무가당"), "is_sugar_free"),
+    (re.compile(r"탄산음료"), "is_carbonated"),
+    (re.compile(r"한정"), "is_limited"),
+]
+_REQUIRE_LABELS = {
+    "is_spicy": "매운 맛", "is_vegan": "비건", "is_vegetarian": "채식", "is_sugar_free": "무설탕",
+    "is_carbonated": "탄산", "is_limited": "한정 메뉴",
+}
+_FORBID_LABELS = {"is_spicy": "안 매움", "is_caffeine": "카페인 없음", "is_carbonated": "탄산 없음"}
+
+_CATEGORY_PATTERNS = [
+    (re.compile(r"세트"), "SET"),
+    (re.compile(r"버거"), "BURGER"),
+    (re.compile(r"사이드"), "SIDE"),
+    (re.compile(r"음료|마실|드링크"), "DRINK"),
+    (re.compile(r"디저트|후식"), "DESSERT"),
+]
+_CATEGORY_LABELS = {"SET": "세트", "BURGER": "버거", "SIDE": "사이드", "DRINK": "음료", "DESSERT": "디저트"}
+
+_PRICE_PATTERN = re.compile(
+    r"(\d[\d,]*(?:\.\d+)?)(천|만)?원?(이하|미만|아래|이내|안쪽|밑|까지|보다싼|보다저렴|이상|넘는|보다비싼)"
+)
+_MANWON_PATTERN = re.compile(r"(?<![\d천])만원(이하|미만|아래|이내|안쪽|밑|까지|보다싼|보다저렴)")
+
+# 조건 검색으로 볼 발화: 질문이거나, 메뉴를 고르는 말이 같이 있어야 함 ("우유 빼 주세요"는 제외)
+_QUESTION_MARKERS = ("?", "뭐", "뭘", "무엇", "있어", "있나", "있을까", "어떤", "어느", "추천", "알려", "보여", "종류")
+_MENU_WORDS = ("메뉴", "버거", "세트", "음료", "사이드", "디저트", "거로", "걸로", "거있", "것")
+
+
+def _parse_price(norm: str) -> Tuple[Optional[int], Optional[int]]:
+    max_price = min_price = None
+    for number, unit, relation in _PRICE_PATTERN.findall(norm):
+        value = float(number.replace(",", ""))
+        value *= {"천": 1000, "만": 10000}.get(unit, 1)
+        value = int(value)
+        if value < 500:  # "2개 이하" 같은 수량 표현은 무시
+            continue
+        if relation in ("이상", "넘는", "보다비싼"):
+            min_price = value
+        elif relation == "미만" or relation.startswith("보다"):
+            max_price = value - 1
+        else:
+            max_price = value
+    match = _MANWON_PATTERN.search(norm)
+    if match and max_price is None:
+        max_price = 9999 if match.group(1) == "미만" or match.group(1).startswith("보다") else 10000
+    return max_price, min_price
+
+
+@lru_cache(maxsize=1024)
+def parse_filter_query(text: str) -> Optional[FilterQuery]:
+    """발화에서 조건을 뽑는다. 조건 검색 발화가 아니면 None."""
+    norm = compact(text)
+    if not any(m in norm for m in _QUESTION_MARKERS + _MENU_WORDS):
+        return None
+
+    exclude = tuple(field for field, pattern in _ALLERGEN_PATTERNS if pattern.search(norm))
+    forbid = tuple(field for pattern, field in _FORBID_PATTERNS if pattern.search(norm))
+    require = tuple(
+        field for pattern, field in _REQUIRE_PATTERNS
+        if field not in forbid and pattern.search(norm)
+    )
+    categories = tuple(c for pattern, c in _CATEGORY_PATTERNS if pattern.search(norm))
+    if "SET" in categories:
+        categories = ("SET",)  # "버거 세트"는 세트만
+    max_price, min_price = _parse_price(norm)
+
+    query = FilterQuery(exclude, require, forbid, categories, max_price, min_price)
+    return query if query.has_constraints() else None
+
+
+# 대화 상태에 남길 식단 선호 (한정/탄산음료 같은 검색 조건은 선호로 보지 않음)
+_PREFERENCE_FIELDS = ("is_spicy", "is_vegan", "is_vegetarian", "is_sugar_free")
+
+
+@lru_cache(maxsize=1024)
+def dietary_facts(text: str) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    """
+    질문이 아니어도 발화에 드러난 (알레르기 재료, 식단 선호) 라벨.
+    "저 우유 알레르기 있어요" → (("우유",), ()), "안 매운 걸로요" → ((), ("안 매움",))
+    """
+    norm = compact(text)
+    allergens = tuple(_ALLERGEN_LABELS[field] for field, pattern in _ALLERGEN_PATTERNS if pattern.search(norm))
+    forbid = [field for pattern, field in _FORBID_PATTERNS if pattern.search(norm)]
+    prefs = [_FORBID_LABELS[f] for f in forbid]
+    prefs += [
+        _REQUIRE_LABELS[field] for pattern, field in _REQUIRE_PATTERNS
+        if field in _PREFERENCE_FIELDS and field not in forbid and pattern.search(norm)
+    ]
+    return allergens, tuple(prefs)
+
+
+def _is_question(text: str) -> bool:
+    norm = compact(text)
+    return any(m in norm for m in _QUESTION_MARKERS)
+
+
+# ======================================
+# 통계
+# ======================================
+
+class MenuFilterStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.queries = 0
+        self.direct = 0
+        self.no_match = 0
+        self.injected = 0
+
+    def record(self, kind: str) -> None:
+        with self._lock:
+            self.queries += 1
+            if kind == "direct":
+                self.direct += 1
+            elif kind == "no_match":
+                self.no_match += 1
+            else:
+                self.injected += 1
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "enabled": MENU_FILTER_ENABLED,
+                "queries": self.queries,
+                "direct": self.direct,
+                "no_match": self.no_match,
+                "injected": self.injected,
+            }
+
+
+menu_filter_stats = MenuFilterStats()
+
+
+# ======================================
+# 외부 진입점
+# ======================================
+
+def filter_menu(req: AnalyzeRequest) -> Optional[Tuple[FilterQuery, List[MenuItem]]]:
+    """조건 검색 발화면 (조건, 매칭된 메뉴), 아니면 None."""
+    if not MENU_FILTER_ENABLED or req.scene == "CUSTOMIZE_BURGER" or not req.menu:
+        return None
+    query = parse_filter_query(req.text)
+    if query is None:
+        return None
+    index = flag_index(req.menu)
+    return query, index.items_for(index.query(query))
+
+
+def _answer_text(query: FilterQuery, matches: List[MenuItem]) -> str:
+    target = "·".join(_CATEGORY_LABELS.get(c, c) for c in query.categories) or "메뉴"
+    if not matches:
+        return f"죄송해요, {query.describe()} 조건에 맞는 {target}는 지금 없어요. 조건을 바꿔서 찾아드릴까요?"
+    names = ", ".join(f"{m.name}({m.price:,}원)" for m in matches)
+    return f"{query.describe()} 조건에 맞는 {target}는 {names}예요. 어떤 걸로 드릴까요?"
+
+
+def route(req: AnalyzeRequest) -> Optional[AnalyzeResponse]:
+    """
+    인덱스만으로 답할 수 있으면 완성된 AnalyzeResponse, 아니면 None.
+    - 질문이고 매칭 0개: 없다고 바로 답함 (LLM이 없는 메뉴를 지어내지 않게)
+    - 질문이고 매칭이 MENU_FILTER_DIRECT_MAX개 이하: 목록으로 바로 답함
+    질문이 아니면 ("계란 빼고 에그 불고기 버거 주세요") 주문/커스터마이즈이므로 LLM에 맡긴다.
+    """
+    found = filter_menu(req)
+    if found is None:
+        return None
+    query, matches = found
+    if not _is_question(req.text) or len(matches) > MENU_FILTER_DIRECT_MAX:
+        return None
+
+    menu_filter_stats.record("direct" if matches else "no_match")
+    logger.info(
+        f"[AI-FILTER] direct scene={req.scene}, query={query.describe()}, "
+        f"matches={[m.menuId for m in matches]}, text={req.text}"
+    )
+    return AnalyzeResponse(
+        assistant_text=_answer_text(query, matches),
+        actions=[KioskAction(type="NONE", menuId=None, qty=1, customize=None)],
+        should_finish=False,
+        next_scene=req.scene,
+    )
+
+
+def filter_candidates(req: AnalyzeRequest) -> Optional[Tuple[FilterQuery, List[MenuItem]]]:
+    """
+    build_messages용: 조건 검색 질문이면 (조건, 매칭된 메뉴)를 돌려주고 통계를 남긴다.
+    질문이 아니면 None ("우유 빼고 더블 치즈버거 주세요"는 주문이므로 평소처럼 후보를 고른다).
+    매칭이 0개여도 None (질문이면 route()가 이미 답했다).
+    """
+    if not _is_question(req.text):
+        return None
+    found = filter_menu(req)
+    if found is None or not found[1]:
+        return None
+    menu_filter_stats.record("injected")
+    return found
@@ -0,0 +1,238 @@
+# app/menu_fuzzy.py
+"""
+유효하지 않은 menuId를 가까운 메뉴로 되살리기 (_normalize_actions에서 NONE으로 떨어뜨리기 전에).
+
+LLM이 내는 잘못된 menuId는 대부분
+- STT 잡음이 섞인 이름 ("불고기 크래식" vs "불고기 클래식")
+- 모델이 지어낸/오타 난 ID ("B0O2", "b002")
+- ID 자리에 이름을 넣음 ("불고기 클래식 버거", "Bulgogi Classic Burger", "[B002] 불고기 클래식 버거")
+이다. 그대로 NONE으로 바꾸면 사용자는 엉뚱한 답을 듣고 다시 말해야 하므로(LLM 한 번 더)
+메뉴 이름(name / name_en)과 menuId를 자모로 풀어 바이그램 역색인을 미리 만들어 두고,
+- 겹치는 바이그램이 많은 후보 몇 개만 골라
+- 자모 단위 편집 거리(MENU_REPAIR_MAX_DISTANCE 이내)로 신뢰도(1 - 거리 / 길이)를 계산해
+- 이번 턴에 유효한 menuId 중 신뢰도가 MENU_REPAIR_MIN_CONFIDENCE 이상이고 2등과 비기지 않을 때만 고친다.
+
+인덱스는 카탈로그 버전(인라인 메뉴면 메뉴 내용)마다 한 번만 만든다.
+"""
+import os
+import re
+import logging
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from .cart_engine import cart_index
+from .menu_catalog import menu_fingerprint
+from .models import MenuItem
+from .prompt_cache import LRUCache
+from .text_norm import compact
+
+logger = logging.getLogger(__name__)
+
+# --------------------------------------------------
+# 설정
+# - MENU_REPAIR_ENABLED: false면 예전처럼 유효하지 않은 menuId는 바로 NONE
+# - MENU_REPAIR_MIN_CONFIDENCE: 이 신뢰도(0~1) 미만이면 고치지 않고 NONE
+# - MENU_REPAIR_MAX_DISTANCE: 자모 편집 거리 상한 (넘으면 후보에서 제외)
+# --------------------------------------------------
+MENU_REPAIR_ENABLED = os.getenv("MENU_REPAIR_ENABLED", "true").lower() == "true"
+MENU_REPAIR_MIN_CONFIDENCE = float(os.getenv("MENU_REPAIR_MIN_CONFIDENCE", "0.8"))
+MENU_REPAIR_MAX_DISTANCE = int(os.getenv("MENU_REPAIR_MAX_DISTANCE", "3"))
+
+# 편집 거리를 계산할 후보 수 (바이그램 겹침 상위)
+_MAX_CANDIDATES = 16
+
+# 한글 음절 → 초성/중성/종성
+_HANGUL_BASE = 0xAC00
+_HANGUL_LAST = 0xD7A3
+_LEADS = "ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ"
+_VOWELS = "ㅏㅐㅑㅒㅓㅔㅕㅖㅗㅘㅙㅚㅛㅜㅝㅞㅟㅠㅡㅢㅣ"
+_TAILS = ("", "ㄱ", "ㄲ", "ㄳ", "ㄴ", "ㄵ", "ㄶ", "ㄷ", "ㄹ", "ㄺ", "ㄻ", "ㄼ", "ㄽ", "ㄾ", "ㄿ", "ㅀ",
+          "ㅁ", "ㅂ", "ㅄ", "ㅅ", "ㅆ", "ㅇ", "ㅈ", "ㅊ", "ㅋ", "ㅌ", "ㅍ", "ㅎ")
+
+# ID에서 헷갈리기 쉬운 글자 ("B0O2", "BOO2" → "b002")
+_ID_CONFUSABLES = str.maketrans("oil", "011")
+
+# 프롬프트 메뉴 줄을 그대로 베낀 경우 ("[B002] 불고기 클래식 버거")
+_BRACKET_ID = re.compile(r"\[([^\]]+)\]")
+
+
+def to_jamo(text: str) -> str:
+    """소문자화 + 공백/문장부호 제거 후 한글 음절을 자모로 푼다 ("클래식" → "ㅋㅡㄹㄹㅐㅅㅣㄱ")."""
+    out = []
+    for ch in compact(text):
+        code = ord(ch)
+        if _HANGUL_BASE <= code <= _HANGUL_LAST:
+            code -= _HANGUL_BASE
+            out.append(_LEADS[code // 588])
+            out.append(_VOWELS[(code % 588) // 28])
+            out.append(_TAILS[code % 28])
+        else:
+            out.append(ch)
+    return "".join(out)
+
+
+def _id_key(menu_id: str) -> str:
+    return compact(menu_id).translate(_ID_CONFUSABLES)
+
+
+def _bigrams(s: str) -> Set[str]:
+    padded = f"^{s}$"
+    return {padded[i:i + 2] for i in range(len(padded) - 1)}
+
+
+def bounded_distance(a: str, b: str, limit: int) -> int:
+    """편집 거리. limit을 넘는 것이 확실해지면 limit + 1을 돌려주고 멈춘다."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i] + [0] * len(b)
+        row_min = i
+        for j, cb in enumerate(b, 1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb))
+            row_min = min(row_min, cur[j])
+        if row_min > limit:
+            return limit + 1
+        prev = cur
+    return min(prev[-1], limit + 1)
+
+
+class MenuNameIndex:
+    """메뉴 하나당 이름(name, name_en)과 menuId를 자모 문자열로 들고, 바이그램 → 항목 역색인."""
+
+    __slots__ = ("keys", "menu_ids", "postings", "by_compact_id")
+
+    def __init__(self, menu: Iterable[MenuItem]):
+        self.keys: List[str] = []        # 항목별 자모 문자열
+        self.menu_ids: List[str] = []    # 항목별 menuId
+        self.postings: Dict[str, List[int]] = {}
+        self.by_compact_id: Dict[str, str] = {}  # 대소문자/구분자/헷갈리는 글자만 다른 ID ("b-0O2" → "B002")
+        for m in menu:
+            self.by_compact_id.setdefault(_id_key(m.menuId), m.menuId)
+            for form in (m.name, m.name_en, m.menuId):
+                key = to_jamo(form) if form else ""
+                if not key:
+                    continue
+                entry = len(self.keys)
+                self.keys.append(key)
+                self.menu_ids.append(m.menuId)
+                for gram in _bigrams(key):
+                    self.postings.setdefault(gram, []).append(entry)
+
+    def lookup(self, raw: str, allowed: Set[str]) -> List[Tuple[str, float]]:
+        """
+        raw와 가까운 menuId 목록 [(menuId, 신뢰도)] (신뢰도 높은 순, menuId당 하나, allowed 안에서만).
+        """
+        key = to_jamo(raw)
+        if not key:
+            return []
+        overlap: Counter = Counter()
+        for gram in _bigrams(key):
+            for entry in self.postings.get(gram, ()):
+                if self.menu_ids[entry] in allowed:
+                    overlap[entry] += 1
+
+        best: Dict[str, float] = {}
+        for entry, _ in overlap.most_common(_MAX_CANDIDATES):
+            target = self.keys[entry]
+            limit = min(MENU_REPAIR_MAX_DISTANCE, max(len(key), len(target)) - 1)
+            dist = bounded_distance(key, target, limit)
+            if dist > limit:
+                continue
+            confidence = 1.0 - dist / max(len(key), len(target))
+            menu_id = self.menu_ids[entry]
+            if confidence > best.get(menu_id, -1.0):
+                best[menu_id] = confidence
+        return sorted(best.items(), key=lambda kv: kv[1], reverse=True)
+
+
+_index_cache = LRUCache(32)
+
+
+def menu_name_index(menu: Sequence[MenuItem]) -> MenuNameIndex:
+    """
+    req.menu 기준 인덱스. 카탈로그 메뉴면 화면(menuIds)과 상관없이 카탈로그 전체로 하나만 만든다
+    (장바구니에 있는 다른 화면 메뉴도 대상이므로, 후보는 lookup의 allowed로 거른다).
+    """
+    key = menu_fingerprint(menu)
+    if isinstance(key, str):
+        key = key.split(":", 1)[0]
+    index = _index_cache.get(key)
+    if index is None:
+        index = MenuNameIndex(cart_index(menu).values())
+        _index_cache.put(key, index)
+    return index
+
+
+# ======================================
+# 통계
+# ======================================
+
+class MenuRepairStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.attempts = 0
+        self.repaired = 0
+        self.rejected = 0
+        self.confidence_sum = 0.0
+
+    def record(self, confidence: Optional[float]) -> None:
+        with self._lock:
+            self.attempts += 1
+            if confidence is None:
+                self.rejected += 1
+            else:
+                self.repaired += 1
+                self.confidence_sum += confidence
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "enabled": MENU_REPAIR_ENABLED,
+                "attempts": self.attempts,
+                "repaired": self.repaired,
+                "rejected": self.rejected,
+                "repair_rate": round(self.repaired / self.attempts, 3) if self.attempts else 0.0,
+                "avg_confidence": round(self.confidence_sum / self.repaired, 3) if self.repaired else 0.0,
+            }
+
+
+menu_repair_stats = MenuRepairStats()
+
+
+# ======================================
+# 외부 진입점
+# ======================================
+
+def repair_menu_id(
+    raw: str, menu: Sequence[MenuItem], valid_menu_ids: Set[str]
+) -> Optional[Tuple[str, float]]:
+    """
+    유효하지 않은 menuId 문자열을 이번 턴에 유효한 menuId로 되살린다.
+    반환: (menuId, 신뢰도), 고칠 수 없으면(신뢰도 미달 / 동점 후보 / 꺼짐) None.
+    """
+    if not MENU_REPAIR_ENABLED or not raw or raw.startswith("#") or not valid_menu_ids:
+        return None
+
+    for inner in _BRACKET_ID.findall(raw):
+        if inner.strip() in valid_menu_ids:
+            menu_repair_stats.record(1.0)
+            return inner.strip(), 1.0
+
+    index = menu_name_index(menu)
+    exact = index.by_compact_id.get(_id_key(raw))
+    if exact is not None and exact in valid_menu_ids:
+        menu_repair_stats.record(1.0)
+        return exact, 1.0
+
+    ranked = index.lookup(_BRACKET_ID.sub(" ", raw), valid_menu_ids)
+    if not ranked:
+        menu_repair_stats.record(None)
+        return None
+    menu_id, confidence = ranked[0]
+    if confidence < MENU_REPAIR_MIN_CONFIDENCE or (len(ranked) > 1 and ranked[1][1] >= confidence):
+        menu_repair_stats.record(None)
+        return None
+    menu_repair_stats.record(confidence)
+    return menu_id, confidence
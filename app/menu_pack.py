@@ -0,0 +1,373 @@
+# app/menu_pack.py
+"""
+컴파일된 메뉴 카탈로그 파일 (워커 프로세스 간 공유용).
+
+uvicorn 워커마다 CSV를 파싱하지 않도록, 배포/메뉴 갱신 때 한 번
+    python -m app.menu_pack -o menu_catalog.bin
+으로 CSV를 바이너리 파일로 컴파일해 두고, 워커는 MENU_CATALOG_PATH로 이 파일을 읽기 전용 mmap한다.
+같은 파일을 mmap한 워커들은 OS 페이지 캐시의 같은 페이지를 보므로 컬럼 데이터/문자열 테이블/인덱스는
+노드당 한 벌만 메모리에 올라간다. 워커는 행마다 MenuItem 대신 MappedMenuRow((카탈로그, 행 번호)만 든 뷰)를 쓰고,
+속성을 읽을 때 컬럼에서 값을 꺼낸다. 요청마다 전체 메뉴를 훑는 필드(menuId/name/name_en/category/price)는
+처음 읽을 때 행에 붙여 두고, 문자열은 문자열 id별로 한 번만 디코딩해 둔다
+(워커 힙에는 행 뷰 + 그 다섯 필드 + 중복 없는 문자열만 남음).
+
+파일 형식 (little-endian):
+    magic(8) | format(u32) | directory 길이(u32) | directory(JSON, UTF-8) | 패딩 | 데이터 섹션
+- directory: 카탈로그 버전, 행 수, 섹션별 (offset, length), 컬럼별 타입
+- 문자열 테이블: 모든 문자열 값(태그 포함)을 중복 없이 한 번씩 (u32 offset 배열 + UTF-8 blob)
+- 컬럼: MenuItem 필드마다 행 수만큼
+    int → i64 (None = INT64_MIN), float → f64 (None = NaN), bool → i8 (None = -1),
+    str → 문자열 id u32 (None = 0xFFFFFFFF), tags → 행별 시작 위치 u32(n+1) + 문자열 id u32
+- 인덱스: menuId 순으로 정렬한 행 번호 u32 (이진 탐색)
+
+메뉴 갱신은 같은 디렉터리의 임시 파일에 쓰고 os.replace로 바꿔치기한다 (원자적).
+워커는 MENU_CATALOG_CHECK_INTERVAL초마다 파일이 바뀌었는지 보고 새 파일을 다시 mmap한다
+(진행 중인 요청은 이전 카탈로그 객체 / mmap을 계속 쓴다).
+"""
+import os
+import json
+import mmap
+import math
+import struct
+import argparse
+import threading
+from array import array
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional, Tuple
+
+from .menu_catalog import MENU_CSV_PATH, MenuCatalog, load_catalog
+from .models import MenuItem
+
+MAGIC = b"KMCAT\x00\x00\x00"
+FORMAT_VERSION = 1
+_HEADER = struct.Struct("<8sII")
+
+_NULL_INT = -(2 ** 63)
+_NULL_STR = 0xFFFFFFFF
+
+
+def _field_kind(annotation) -> str:
+    if annotation in (int, Optional[int]):
+        return "int"
+    if annotation in (float, Optional[float]):
+        return "float"
+    if annotation in (bool, Optional[bool]):
+        return "bool"
+    if annotation in (str, Optional[str]):
+        return "str"
+    if annotation == List[str]:
+        return "tags"
+    raise TypeError(f"unsupported MenuItem field type: {annotation}")
+
+
+# MenuItem 필드 → 컬럼 타입 (필드 선언 순서)
+FIELD_KINDS: Dict[str, str] = {
+    name: _field_kind(field.annotation) for name, field in MenuItem.model_fields.items()
+}
+
+
+# ======================================
+# 컴파일 (CSV → 바이너리)
+# ======================================
+
+class _Strings:
+    """문자열 테이블 (같은 문자열은 한 번만)."""
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.values: List[str] = []
+
+    def intern(self, value: Optional[str]) -> int:
+        if value is None:
+            return _NULL_STR
+        sid = self.ids.get(value)
+        if sid is None:
+            sid = self.ids[value] = len(self.values)
+            self.values.append(value)
+        return sid
+
+
+def _pack_column(kind: str, values: List[Any], strings: _Strings) -> Tuple[bytes, ...]:
+    if kind == "int":
+        return (array("q", (_NULL_INT if v is None else v for v in values)).tobytes(),)
+    if kind == "float":
+        return (array("d", (math.nan if v is None else v for v in values)).tobytes(),)
+    if kind == "bool":
+        return (array("b", (-1 if v is None else int(v) for v in values)).tobytes(),)
+    if kind == "str":
+        return (array("I", (strings.intern(v) for v in values)).tobytes(),)
+    # tags: 행별 시작 위치 + 이어 붙인 문자열 id
+    starts = array("I", [0])
+    ids = array("I")
+    for tags in values:
+        ids.extend(strings.intern(t) for t in tags)
+        starts.append(len(ids))
+    return starts.tobytes(), ids.tobytes()
+
+
+def encode_catalog(catalog: MenuCatalog) -> bytes:
+    """MenuCatalog → 컴파일된 카탈로그 bytes."""
+    items = catalog.items
+    strings = _Strings()
+    sections: List[bytes] = []
+    directory: Dict[str, Any] = {"version": catalog.version, "count": len(items), "columns": {}}
+
+    def add(data: bytes) -> List[int]:
+        offset = sum(len(s) for s in sections)
+        sections.append(data)
+        pad = -len(data) % 8  # 8바이트 정렬 (memoryview.cast용)
+        if pad:
+            sections.append(b"\x00" * pad)
+        return [offset, len(data)]
+
+    for name, kind in FIELD_KINDS.items():
+        packed = _pack_column(kind, [getattr(m, name) for m in items], strings)
+        directory["columns"][name] = {"kind": kind, "sections": [add(p) for p in packed]}
+
+    order = sorted(range(len(items)), key=lambda i: items[i].menuId)
+    directory["id_index"] = add(array("I", order).tobytes())
+
+    encoded = [s.encode("utf-8") for s in strings.values]
+    offsets = array("I", [0])
+    for e in encoded:
+        offsets.append(offsets[-1] + len(e))
+    directory["string_offsets"] = add(offsets.tobytes())
+    directory["string_blob"] = add(b"".join(encoded))
+
+    dir_bytes = json.dumps(directory, ensure_ascii=False).encode("utf-8")
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, len(dir_bytes)) + dir_bytes
+    header += b"\x00" * (-len(header) % 8)
+    return header + b"".join(sections)
+
+
+def compile_catalog(csv_path: Path = MENU_CSV_PATH, out_path: Optional[Path] = None) -> Tuple[Path, str]:
+    """
+    CSV를 컴파일해 out_path에 원자적으로 쓴다 (임시 파일 → fsync → os.replace).
+    반환: (파일 경로, 카탈로그 버전)
+    """
+    out_path = Path(out_path or os.getenv("MENU_CATALOG_PATH") or "menu_catalog.bin")
+    catalog = load_catalog(Path(csv_path))
+    data = encode_catalog(catalog)
+    tmp = out_path.with_name(f".{out_path.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, out_path)
+    return out_path, catalog.version
+
+
+# ======================================
+# 읽기 (mmap)
+# ======================================
+
+# 요청마다 전체 메뉴를 훑으며 읽는 필드 (검색/fingerprint/후보 선택/장바구니 합계)
+_ROW_CACHED = ("menuId", "name", "name_en", "category", "price")
+
+
+class MappedMenuRow:
+    """
+    mmap 카탈로그의 한 행 (MenuItem과 같은 속성을 읽기 전용으로 노출).
+    속성을 읽을 때 컬럼에서 꺼낸다. 자주 읽는 필드(_ROW_CACHED)는 처음 읽을 때 슬롯에 붙여 두므로
+    다음부터는 __getattr__을 거치지 않는다. pydantic MenuItem이 꼭 필요하면 validated().
+    """
+
+    __slots__ = ("_catalog", "_row") + _ROW_CACHED
+
+    def __init__(self, catalog: "MappedMenuCatalog", row: int):
+        self._catalog = catalog
+        self._row = row
+
+    def __getattr__(self, name: str):
+        # 슬롯이 아직 비어 있거나 슬롯이 아닌 필드일 때만 불린다
+        value = self._catalog.value(self._row, name)
+        if name in _ROW_CACHED:
+            setattr(self, name, value)
+        return value
+
+    def validated(self) -> MenuItem:
+        return self._catalog.materialize(self._row)
+
+    def __repr__(self) -> str:
+        return f"MappedMenuRow({self.menuId!r}, row={self._row})"
+
+
+class _MappedById(Mapping):
+    """menuId → MenuItem (MenuCatalog.by_id 자리). 찾은 행은 MappedMenuCatalog가 기억해 둔다."""
+
+    def __init__(self, catalog: "MappedMenuCatalog"):
+        self._catalog = catalog
+
+    def __getitem__(self, menu_id: str) -> MenuItem:
+        item = self._catalog.get(menu_id)
+        if item is None:
+            raise KeyError(menu_id)
+        return item
+
+    def get(self, menu_id, default=None):
+        item = self._catalog.get(menu_id)
+        return default if item is None else item
+
+    def __contains__(self, menu_id) -> bool:
+        return self._catalog.get(menu_id) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        return (m.menuId for m in self._catalog.items)
+
+    def __len__(self) -> int:
+        return len(self._catalog)
+
+
+class MappedMenuCatalog(MenuCatalog):
+    """
+    mmap한 컴파일 카탈로그 위의 MenuCatalog.
+    행은 MappedMenuRow로 처음 쓰일 때 만들어 기억해 둔다 (같은 메뉴는 항상 같은 객체).
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            st = os.fstat(f.fileno())
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.file_id = (st.st_ino, st.st_mtime_ns, st.st_size)
+
+        magic, fmt, dir_len = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or fmt != FORMAT_VERSION:
+            self._mm.close()
+            raise ValueError(f"not a compiled menu catalog (format {FORMAT_VERSION}): {self.path}")
+        directory = json.loads(self._mm[_HEADER.size:_HEADER.size + dir_len])
+        base = _HEADER.size + dir_len
+        base += -base % 8
+        view = memoryview(self._mm)
+
+        def section(ref, fmt_char: str) -> memoryview:
+            offset, length = ref
+            return view[base + offset: base + offset + length].cast(fmt_char)
+
+        self._version = directory["version"]
+        self._count = directory["count"]
+        self._columns: List[Tuple[str, str, Tuple[memoryview, ...]]] = []
+        for name, col in directory["columns"].items():
+            kind = col["kind"]
+            fmt_chars = ("I", "I") if kind == "tags" else ({"int": "q", "float": "d", "bool": "b", "str": "I"}[kind],)
+            self._columns.append((name, kind, tuple(section(s, c) for s, c in zip(col["sections"], fmt_chars))))
+        self._by_name = {name: (kind, cols) for name, kind, cols in self._columns}
+        self._menu_ids = self._by_name["menuId"][1][0]
+        self._id_index = section(directory["id_index"], "I")
+        self._string_offsets = section(directory["string_offsets"], "I")
+        offset, length = directory["string_blob"]
+        self._string_blob = view[base + offset: base + offset + length]
+        self._strings: List[Optional[str]] = [None] * (len(self._string_offsets) - 1)
+        self._getters = {name: self._getter(kind, cols) for name, kind, cols in self._columns}
+
+        self._rows: List[Optional[MappedMenuRow]] = [None] * self._count
+        self._items: Optional[Tuple[MappedMenuRow, ...]] = None
+        self._found: Dict[str, MappedMenuRow] = {}
+        self._lock = threading.Lock()
+        self._by_id = _MappedById(self)
+
+    def string(self, sid: int) -> Optional[str]:
+        """문자열 id → str (처음 읽을 때 한 번만 디코딩, 문자열 테이블은 중복이 없어 작다)."""
+        if sid == _NULL_STR:
+            return None
+        s = self._strings[sid]
+        if s is None:
+            s = self._strings[sid] = str(
+                self._string_blob[self._string_offsets[sid]:self._string_offsets[sid + 1]], "utf-8"
+            )
+        return s
+
+    def _getter(self, kind: str, cols: Tuple[memoryview, ...]) -> Callable[[int], Any]:
+        """컬럼 하나의 행 번호 → 값 함수 (없는 값은 None, tags는 새 리스트)."""
+        string = self.string
+        if kind == "tags":
+            starts, ids = cols
+            return lambda i: [string(ids[k]) for k in range(starts[i], starts[i + 1])]
+        col = cols[0]
+        if kind == "str":
+            return lambda i: string(col[i])
+        if kind == "int":
+            return lambda i: None if col[i] == _NULL_INT else col[i]
+        if kind == "float":
+            return lambda i: None if math.isnan(col[i]) else col[i]
+        return lambda i: None if col[i] < 0 else bool(col[i])
+
+    def value(self, i: int, name: str) -> Any:
+        """i번째 행의 name 필드 값 (없는 값은 None, tags는 새 리스트)."""
+        try:
+            getter = self._getters[name]
+        except KeyError:
+            raise AttributeError(name) from None
+        return getter(i)
+
+    def materialize(self, i: int) -> MenuItem:
+        """i번째 행을 pydantic MenuItem으로 (기억해 두지 않음)."""
+        data: Dict[str, Any] = {}
+        for name, getter in self._getters.items():
+            v = getter(i)
+            if v is not None:
+                data[name] = v
+        return MenuItem.model_validate(data)
+
+    def row(self, i: int) -> MappedMenuRow:
+        item = self._rows[i]
+        if item is not None:
+            return item
+        with self._lock:
+            if self._rows[i] is None:
+                self._rows[i] = MappedMenuRow(self, i)
+            return self._rows[i]
+
+    def owns(self, m: Any) -> bool:
+        return type(m) is MappedMenuRow and m._catalog is self
+
+    def find(self, menu_id: str) -> Optional[int]:
+        """menuId → 행 번호 (id 인덱스 이진 탐색)."""
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            row = self._id_index[mid]
+            key = self.string(self._menu_ids[row])
+            if key == menu_id:
+                return row
+            if key < menu_id:
+                lo = mid + 1
+            else:
+                hi = mid
+        return None
+
+    @property
+    def items(self) -> Tuple[MappedMenuRow, ...]:
+        if self._items is None:
+            self._items = tuple(self.row(i) for i in range(self._count))
+        return self._items
+
+    def __len__(self) -> int:
+        return self._count
+
+    def get(self, menu_id: str) -> Optional[MappedMenuRow]:
+        item = self._found.get(menu_id)
+        if item is None and isinstance(menu_id, str):
+            row = self.find(menu_id)
+            if row is None:
+                return None
+            item = self._found[menu_id] = self.row(row)
+        return item
+
+
+def load_compiled_catalog(path: Path) -> MappedMenuCatalog:
+    return MappedMenuCatalog(path)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="메뉴 CSV → 컴파일된 카탈로그 파일 (워커 공유 mmap용)")
+    parser.add_argument("--csv", default=str(MENU_CSV_PATH), help="메뉴 마스터 CSV")
+    parser.add_argument("-o", "--output", default=None, help="출력 경로 (기본: MENU_CATALOG_PATH 또는 menu_catalog.bin)")
+    args = parser.parse_args(argv)
+    path, version = compile_catalog(Path(args.csv), args.output)
+    print(f"{path} version={version} bytes={path.stat().st_size}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,165 @@
+# app/menu_retrieval.py
+import os
+import threading
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from .models import AnalyzeRequest, MenuItem
+from .text_norm import compact
+
+# --------------------------------------------------
+# scene별로 프롬프트에 실을 메뉴 카테고리
+# - None: 가지치기 없이 전체 메뉴 사용
+# - (): 카테고리 기본 포함 없음 (장바구니 + 발화 매칭만)
+# --------------------------------------------------
+SCENE_CATEGORIES: Dict[str, Optional[Tuple[str, ...]]] = {
+    "GREETING": ("BURGER",),
+    "SELECT_BURGER": ("BURGER", "SET"),
+    "CUSTOMIZE_BURGER": (),
+    "SELECT_SIDE": ("SIDE", "DESSERT"),
+    "SELECT_DRINK": ("DRINK", "DESSERT"),
+    "CONFIRM": (),
+}
+
+# 발화에 카테고리 단어가 나오면 scene과 무관하게 해당 카테고리 추가
+CATEGORY_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    "버거": ("BURGER", "SET"),
+    "세트": ("SET",),
+    "사이드": ("SIDE",),
+    "감자": ("SIDE",),
+    "음료": ("DRINK",),
+    "마실": ("DRINK",),
+    "커피": ("DRINK",),
+    "디저트": ("DESSERT",),
+    "후식": ("DESSERT",),
+    "아이스크림": ("DESSERT",),
+}
+
+# 발화-메뉴명 어휘 매칭으로 추가할 최대 개수 / 최소 점수
+LEXICAL_TOP_K = int(os.getenv("MENU_LEXICAL_TOP_K", "5"))
+LEXICAL_MIN_SCORE = float(os.getenv("MENU_LEXICAL_MIN_SCORE", "0.5"))
+
+def _bigrams(text: str) -> FrozenSet[str]:
+    if len(text) < 2:
+        return frozenset((text,)) if text else frozenset()
+    return frozenset(text[i:i + 2] for i in range(len(text) - 1))
+
+
+@lru_cache(maxsize=2048)
+def _name_bigrams(name: str) -> FrozenSet[str]:
+    # 메뉴명은 턴마다 반복되므로 캐시
+    return _bigrams(compact(name))
+
+
+def lexical_matches(
+    text: str, menu: List[MenuItem], k: int = LEXICAL_TOP_K, min_score: float = LEXICAL_MIN_SCORE
+) -> List[MenuItem]:
+    """
+    발화와 메뉴명(name / name_en)의 글자 bigram 겹침 비율로 상위 k개를 고른다.
+    점수 = 메뉴명 bigram 중 발화에 등장한 비율 (min_score 미만은 제외).
+    """
+    text_grams = _bigrams(compact(text))
+    if not text_grams or k <= 0:
+        return []
+
+    scored = []
+    for idx, m in enumerate(menu):
+        best = 0.0
+        for name in (m.name, m.name_en):
+            if not name:
+                continue
+            grams = _name_bigrams(name)
+            if grams:
+                best = max(best, len(grams & text_grams) / len(grams))
+        if best >= min_score:
+            scored.append((best, idx, m))
+
+    scored.sort(key=lambda x: (-x[0], x[1]))
+    return [m for _, _, m in scored[:k]]
+
+
+def scene_categories(req: AnalyzeRequest) -> Optional[Tuple[str, ...]]:
+    """scene + 발화 속 카테고리 단어로 이번 턴에 실을 카테고리 집합."""
+    base = SCENE_CATEGORIES.get(req.scene)
+    if base is None:
+        return None
+    categories = list(base)
+    for keyword, extra in CATEGORY_KEYWORDS.items():
+        if keyword in req.text:
+            categories.extend(c for c in extra if c not in categories)
+    return tuple(categories)
+
+
+def select_candidates(req: AnalyzeRequest) -> List[MenuItem]:
+    """
+    프롬프트에 실을 후보 메뉴를 고른다. (순서: 장바구니 → 발화 매칭 → scene 카테고리)
+    - 장바구니에 있는 메뉴는 항상 포함
+    - 발화와 이름이 비슷한 메뉴 상위 k개 포함
+    - scene별 카테고리에 속한 메뉴 포함
+    알 수 없는 scene이면 전체 메뉴를 그대로 돌려준다.
+    """
+    return select_candidates_with_focus(req)[0]
+
+
+def select_candidates_with_focus(req: AnalyzeRequest) -> Tuple[List[MenuItem], int]:
+    """
+    select_candidates와 같지만, 앞에서 몇 개가 '핵심' 후보(장바구니 + 발화 매칭)인지도 돌려준다.
+    토큰 예산이 모자랄 때 핵심 후보는 끝까지 자세히 남기고 나머지부터 줄이는 데 쓴다.
+    """
+    categories = scene_categories(req)
+    if categories is None:
+        return req.menu, 0
+
+    by_id = {m.menuId: m for m in req.menu}
+    selected: Dict[str, MenuItem] = {}
+
+    for ci in req.cart.items:
+        m = by_id.get(ci.menuId)
+        if m is not None:
+            selected.setdefault(m.menuId, m)
+
+    for m in lexical_matches(req.text, req.menu):
+        selected.setdefault(m.menuId, m)
+    n_focus = len(selected)
+
+    if categories:
+        for m in req.menu:
+            if m.category in categories:
+                selected.setdefault(m.menuId, m)
+
+    return list(selected.values()), n_focus
+
+
+# ======================================
+# 가지치기 전/후 토큰 통계
+# ======================================
+
+class PruningStats:
+    """가지치기 전/후 메뉴 블록 토큰 수 누적."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.turns = 0
+        self.tokens_before = 0
+        self.tokens_after = 0
+
+    def record(self, before: int, after: int) -> None:
+        with self._lock:
+            self.turns += 1
+            self.tokens_before += before
+            self.tokens_after += after
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "turns": self.turns,
+                "menu_tokens_before": self.tokens_before,
+                "menu_tokens_after": self.tokens_after,
+                "saved_ratio": (
+                    round(1 - self.tokens_after / self.tokens_before, 3)
+                    if self.tokens_before else 0.0
+                ),
+            }
+
+
+pruning_stats = PruningStats()
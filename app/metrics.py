@@ -0,0 +1,146 @@
+# app/metrics.py
+"""
+LLM 호출 단계별 지연 히스토그램 / 카운터와 Prometheus 텍스트 포맷 출력.
+
+호출 측에서는 요청당 한 번 series(scene, model)로 시리즈를 꺼내고
+    s = llm_metrics.series(req.scene, model)
+    s.observe(STAGE_BUILD, seconds); s.inc(COUNTER_FALLBACK)
+처럼 정수 인덱스로 기록한다. 시리즈는 (scene, model)별로 처음 한 번만 만들어지고,
+이후 기록은 미리 만들어 둔 리스트의 칸을 올리는 것뿐이라 호출마다 객체를 새로 만들지 않는다.
+(이벤트 루프 스레드 하나에서 기록한다는 가정이라 락은 두지 않는다)
+"""
+from bisect import bisect_left
+from typing import Dict, List
+
+from .menu_retrieval import SCENE_CATEGORIES
+
+# 단계 (히스토그램)
+STAGE_BUILD = 0        # build_messages
+STAGE_UPSTREAM = 1     # OpenAI 응답 대기 (스트리밍이면 마지막 청크까지)
+STAGE_TTFT = 2         # 스트리밍 첫 토큰까지
+STAGE_DECODE = 3       # json.loads
+STAGE_NORMALIZE = 4    # _normalize_actions
+STAGE_CONSTRUCT = 5    # AnalyzeResponse 생성 (pydantic 검증)
+STAGE_ADMISSION = 6    # admission 대기열에서 기다린 시간 (바로 들어가면 0)
+STAGE_NAMES = ("build_messages", "upstream", "ttft", "json_decode", "normalize", "construct", "admission_wait")
+
+# 카운터
+COUNTER_FALLBACK = 0          # fallback 응답을 내보낸 횟수
+COUNTER_JSON_DECODE_FAIL = 1  # LLM 출력 JSON 디코딩 실패
+COUNTER_INVALID_MENU_ID = 2   # 유효하지 않은 menuId로 NONE 다운그레이드된 action 수
+COUNTER_OUTPUT_TOKENS = 3     # LLM이 생성한 토큰 수 합계 (usage가 없으면 추정치), 평균은 upstream count로 나눔
+COUNTER_MENU_ID_REPAIRED = 4  # 유효하지 않은 menuId를 이름/ID 유사도로 되살린 action 수 (app.menu_fuzzy)
+COUNTER_TIER_ESCALATION = 5   # 작은 모델 결과를 버리고 큰 모델로 다시 부른 턴 수 (model 라벨 = 작은 모델)
+COUNTER_NAMES = (
+    "fallback", "json_decode_failure", "invalid_menu_id", "output_tokens", "menu_id_repaired", "tier_escalation",
+)
+_COUNTER_HELP = (
+    "Fallback responses returned instead of an LLM answer",
+    "LLM outputs that could not be decoded as a JSON object",
+    "Actions downgraded to NONE because of an unknown menuId",
+    "Completion tokens generated by the LLM (estimated when usage is missing)",
+    "Actions whose unknown menuId was repaired to a close menu name or ID",
+    "Turns escalated from the small model tier to the large one",
+)
+
+# 초 단위 버킷 (프롬프트 빌드 ~0.1ms부터 업스트림 ~수십 초까지)
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+# 클라이언트가 보낸 scene 값이 라벨 수를 무한히 늘리지 않도록 모르는 값은 하나로 묶는다
+_KNOWN_SCENES = frozenset(SCENE_CATEGORIES)
+_OTHER_SCENE = "OTHER"
+
+
+class StageSeries:
+    """(scene, model) 하나에 대한 단계별 히스토그램 + 카운터."""
+
+    __slots__ = ("scene", "model", "buckets", "bucket_counts", "sums", "counts", "counters")
+
+    def __init__(self, scene: str, model: str, buckets=DEFAULT_BUCKETS):
+        self.scene = scene
+        self.model = model
+        self.buckets = buckets
+        # bucket_counts[stage][i]: i번째 버킷에 떨어진 개수 (마지막 칸은 +Inf), 누적은 출력할 때 계산
+        self.bucket_counts: List[List[int]] = [[0] * (len(buckets) + 1) for _ in STAGE_NAMES]
+        self.sums: List[float] = [0.0] * len(STAGE_NAMES)
+        self.counts: List[int] = [0] * len(STAGE_NAMES)
+        self.counters: List[int] = [0] * len(COUNTER_NAMES)
+
+    def observe(self, stage: int, seconds: float) -> None:
+        self.bucket_counts[stage][bisect_left(self.buckets, seconds)] += 1
+        self.sums[stage] += seconds
+        self.counts[stage] += 1
+
+    def inc(self, counter: int, amount: int = 1) -> None:
+        self.counters[counter] += amount
+
+
+class LLMMetrics:
+    """프로세스 공용 레지스트리 (scene → model → StageSeries)."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._series: Dict[str, Dict[str, StageSeries]] = {}
+
+    def series(self, scene: str, model: str) -> StageSeries:
+        if scene not in _KNOWN_SCENES:
+            scene = _OTHER_SCENE
+        by_model = self._series.get(scene)
+        if by_model is None:
+            by_model = self._series[scene] = {}
+        s = by_model.get(model)
+        if s is None:
+            s = by_model[model] = StageSeries(scene, model, self.buckets)
+        return s
+
+    def all_series(self) -> List[StageSeries]:
+        return [s for by_model in list(self._series.values()) for s in list(by_model.values())]
+
+    def clear(self) -> None:
+        self._series.clear()
+
+    def render(self, prefix: str = "kiosk_llm") -> str:
+        """Prometheus text exposition format (0.0.4)."""
+        series = self.all_series()
+        out: List[str] = []
+
+        name = f"{prefix}_stage_seconds"
+        out.append(f"# HELP {name} Latency of each call_llm stage in seconds")
+        out.append(f"# TYPE {name} histogram")
+        les = [_format_float(b) for b in self.buckets] + ["+Inf"]
+        for s in series:
+            for stage, stage_name in enumerate(STAGE_NAMES):
+                if not s.counts[stage]:
+                    continue
+                labels = f'stage="{stage_name}",scene="{_escape(s.scene)}",model="{_escape(s.model)}"'
+                cumulative = 0
+                for le, n in zip(les, s.bucket_counts[stage]):
+                    cumulative += n
+                    out.append(f'{name}_bucket{{{labels},le="{le}"}} {cumulative}')
+                out.append(f"{name}_sum{{{labels}}} {_format_float(s.sums[stage])}")
+                out.append(f"{name}_count{{{labels}}} {s.counts[stage]}")
+
+        for idx, counter_name in enumerate(COUNTER_NAMES):
+            name = f"{prefix}_{counter_name}_total"
+            out.append(f"# HELP {name} {_COUNTER_HELP[idx]}")
+            out.append(f"# TYPE {name} counter")
+            for s in series:
+                out.append(
+                    f'{name}{{scene="{_escape(s.scene)}",model="{_escape(s.model)}"}} {s.counters[idx]}'
+                )
+
+        return "\n".join(out) + "\n"
+
+
+def _format_float(v: float) -> str:
+    return repr(float(v))
+
+
+def _escape(v: str) -> str:
+    return v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+llm_metrics = LLMMetrics()
@@ -0,0 +1,135 @@
+# app/model_tiering.py
+"""
+턴별 모델 티어 고르기.
+
+SELECT_DRINK에서 "콜라요" 같은 단순한 선택도, 알레르기 조건을 여러 개 비교하는 질문도 같은 모델(openai_model)을 쓰면
+단순한 턴이 큰 모델의 지연을 그대로 낸다. LLM_SMALL_MODEL을 지정하면 싼 특징만 보고 턴마다 티어를 고른다.
+
+- small: 단순한 scene(TIERING_SMALL_SCENES)의 짧은 발화, 장바구니가 작고, 영양/알레르기/비교/추천 의도가 없고,
+  직전 턴이 fallback이 아니었을 때
+- large: 그 외 전부 (기본값)
+- 작은 모델이 JSON을 깨뜨리거나, actions 보정에서 action이 NONE으로 떨어지거나, 호출 자체가 실패하면
+  남은 턴 시간 안에서 큰 모델로 다시 부른다 (escalation)
+
+티어별 모델 / 타임아웃 / 최대 출력 토큰은 Settings (LLM_SMALL_* / OPENAI_MODEL / LLM_TIMEOUT / LLM_MAX_TOKENS).
+"""
+import os
+import re
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from .menu_filter import dietary_facts, parse_filter_query
+from .models import AnalyzeRequest
+from .recommender import detect_intent
+from .settings import Settings, get_settings
+from .text_norm import compact
+
+# --------------------------------------------------
+# 라우팅 설정
+# - TIERING_SMALL_SCENES: 작은 모델을 쓸 수 있는 scene (쉼표 구분)
+# - TIERING_SMALL_MAX_CHARS: 공백/문장부호를 뺀 발화가 이보다 길면 큰 모델
+# - TIERING_SMALL_MAX_CART: 장바구니 줄 수가 이보다 많으면 큰 모델 (장바구니 요약/수정이 복잡해짐)
+# --------------------------------------------------
+TIERING_SMALL_SCENES = frozenset(
+    s.strip() for s in os.getenv("TIERING_SMALL_SCENES", "GREETING,SELECT_SIDE,SELECT_DRINK").split(",") if s.strip()
+)
+TIERING_SMALL_MAX_CHARS = int(os.getenv("TIERING_SMALL_MAX_CHARS", "20"))
+TIERING_SMALL_MAX_CART = int(os.getenv("TIERING_SMALL_MAX_CART", "3"))
+
+TIER_SMALL = "small"
+TIER_LARGE = "large"
+
+# 영양 정보 / 비교 질문 (조건 검색 패턴에 안 걸리는 것)
+_HARD_WORDS = re.compile(r"칼로리|kcal|단백질|나트륨|당류|지방|탄수화물|영양|알레르기|알러지|성분|비교|차이|뭐가더|어떤게더|어느게더")
+
+# escalation 이유
+ESCALATE_INVALID_JSON = "invalid_json"
+ESCALATE_DROPPED_ACTIONS = "dropped_actions"
+ESCALATE_ERROR = "error"
+
+
+@dataclass(frozen=True)
+class ModelTier:
+    name: str
+    model: str
+    timeout: float               # 호출 1회당 타임아웃(초)
+    max_tokens: Optional[int]    # None이면 지정하지 않음
+
+
+def model_tiers(settings: Settings) -> Tuple[Optional[ModelTier], ModelTier]:
+    """(작은 티어 또는 None, 큰 티어)."""
+    large = ModelTier(TIER_LARGE, settings.openai_model, settings.llm_timeout, settings.llm_max_tokens or None)
+    if not settings.llm_small_model or settings.llm_small_model == settings.openai_model:
+        return None, large
+    small = ModelTier(
+        TIER_SMALL, settings.llm_small_model, settings.llm_small_timeout, settings.llm_small_max_tokens or None
+    )
+    return small, large
+
+
+def choose_tier(req: AnalyzeRequest, previous_fallback: bool) -> Tuple[str, str]:
+    """(티어 이름, 이유). 이유는 통계용 ("simple" 또는 큰 모델로 보낸 첫 번째 특징)."""
+    if previous_fallback:
+        return TIER_LARGE, "previous_fallback"
+    if req.scene not in TIERING_SMALL_SCENES:
+        return TIER_LARGE, "scene"
+    norm = compact(req.text)
+    if len(norm) > TIERING_SMALL_MAX_CHARS:
+        return TIER_LARGE, "long_utterance"
+    if len(req.cart.items) > TIERING_SMALL_MAX_CART:
+        return TIER_LARGE, "cart"
+    allergens, prefs = dietary_facts(req.text)
+    if allergens or _HARD_WORDS.search(norm):
+        return TIER_LARGE, "nutrition_allergy"
+    if prefs or parse_filter_query(req.text) is not None or detect_intent(req.text) is not None:
+        return TIER_LARGE, "constraints"
+    return TIER_SMALL, "simple"
+
+
+# ======================================
+# 통계
+# ======================================
+
+class TieringStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.turns: Dict[str, int] = {TIER_SMALL: 0, TIER_LARGE: 0}
+        self.reasons: Dict[str, int] = {}
+        self.escalations: Dict[str, int] = {}
+        # 티어별 턴 전체 시간 (작은 모델에서 escalation된 턴은 "escalated"로 따로)
+        self.turn_ms: Dict[str, float] = {}
+        self.turn_count: Dict[str, int] = {}
+
+    def routed(self, tier: str, reason: str) -> None:
+        with self._lock:
+            self.turns[tier] += 1
+            self.reasons[reason] = self.reasons.get(reason, 0) + 1
+
+    def escalated(self, reason: str) -> None:
+        with self._lock:
+            self.escalations[reason] = self.escalations.get(reason, 0) + 1
+
+    def finished(self, label: str, ms: float) -> None:
+        with self._lock:
+            self.turn_ms[label] = self.turn_ms.get(label, 0.0) + ms
+            self.turn_count[label] = self.turn_count.get(label, 0) + 1
+
+    def stats(self) -> Dict[str, object]:
+        small, large = model_tiers(get_settings())
+        with self._lock:
+            escalated = sum(self.escalations.values())
+            return {
+                "enabled": small is not None,
+                "models": {TIER_SMALL: small.model if small else None, TIER_LARGE: large.model},
+                "turns": dict(self.turns),
+                "reasons": dict(self.reasons),
+                "escalations": dict(self.escalations),
+                "escalation_rate": round(escalated / self.turns[TIER_SMALL], 3) if self.turns[TIER_SMALL] else 0.0,
+                "avg_turn_ms": {
+                    label: round(self.turn_ms[label] / n, 1) for label, n in self.turn_count.items() if n
+                },
+            }
+
+
+tiering_stats = TieringStats()
@@ -40,6 +40,7 @@ class KioskAction(BaseModel):
 class CartItem(BaseModel):
     menuId: str
     qty: int = 1
+    customize: Optional[Customization] = None   # 이 메뉴에 반영된 재료/옵션 변경 (합쳐진 결과)
 
 
 class Cart(BaseModel):
@@ -59,28 +60,72 @@ class MenuItem(BaseModel):
     category: str
     price: int
 
+    # 부가 정보 (CSV: name_en, subcategory, base_menu_id, size, display_order)
+    name_en: Optional[str] = None
+    subcategory: Optional[str] = None
+    base_menu_id: Optional[str] = None   # 세트 → 단품 버거 menuId
+    size: Optional[str] = None           # REGULAR / LARGE / ONE_SIZE
+    display_order: Optional[int] = None
+
     # 태그: "대표메뉴", "가성비", "매운맛", "맵지않음", "아이추천", "어르신추천", ...
     tags: List[str] = Field(default_factory=list)
 
     # 재료/커스터마이즈
     ingredients_ko: Optional[str] = None      # "참깨빵, 양상추, 양파, 피클, 소고기 패티, ..."
     customizable_ko: Optional[str] = None     # "피클, 양파, 소스, 치즈, 베이컨"
+    ingredients_en: Optional[str] = None
 
     # 영양 정보
     kcal: Optional[float] = None
     protein_g: Optional[float] = None
     fat_g: Optional[float] = None
+    saturated_fat_g: Optional[float] = None
     carbs_g: Optional[float] = None
     sugars_g: Optional[float] = None
     sodium_mg: Optional[float] = None
 
     # 알레르기/경고
     allergens_ko: Optional[str] = None           # "밀, 우유, 계란, 대두 함유"
+    allergens_en: Optional[str] = None           # "wheat, milk, egg, soy"
     allergy_warning_ko: Optional[str] = None     # "우유, 밀 알레르기 있는 분은 섭취에 주의하세요."
 
     # 한 줄 영양 요약
     nutrition_summary_ko: Optional[str] = None   # "단백질이 풍부하고, 칼로리는 중간 수준입니다."
 
+    # 분류 플래그 (CSV is_* 컬럼, 없으면 None)
+    is_set: Optional[bool] = None
+    is_burger: Optional[bool] = None
+    is_side: Optional[bool] = None
+    is_drink: Optional[bool] = None
+    is_dessert: Optional[bool] = None
+    is_beef: Optional[bool] = None
+    is_chicken: Optional[bool] = None
+    is_pork: Optional[bool] = None
+    is_fish: Optional[bool] = None
+    is_spicy: Optional[bool] = None
+    is_vegan: Optional[bool] = None
+    is_vegetarian: Optional[bool] = None
+    is_cold_drink: Optional[bool] = None
+    is_carbonated: Optional[bool] = None
+    is_sugar_free: Optional[bool] = None
+    is_caffeine: Optional[bool] = None
+    is_popular: Optional[bool] = None
+    is_limited: Optional[bool] = None
+    combo_allowed: Optional[bool] = None
+
+    # 알레르기 플래그 (CSV allergen_* 컬럼, 없으면 None)
+    allergen_wheat: Optional[bool] = None
+    allergen_egg: Optional[bool] = None
+    allergen_milk: Optional[bool] = None
+    allergen_soy: Optional[bool] = None
+    allergen_peanut: Optional[bool] = None
+    allergen_nut: Optional[bool] = None
+    allergen_fish: Optional[bool] = None
+    allergen_shellfish: Optional[bool] = None
+    allergen_pork: Optional[bool] = None
+    allergen_beef: Optional[bool] = None
+    allergen_shrimp: Optional[bool] = None
+
 
 # --------------------------------------
 # 대화 히스토리 (프론트/백이 넘겨줌)
@@ -95,6 +140,22 @@ class HistoryTurn(BaseModel):
     content: str
 
 
+class DialogueState(BaseModel):
+    """
+    지난 대화를 압축한 구조화 상태 (app.dialogue_state가 턴마다 갱신, LLM 호출 없음).
+    - confirmed: 지금까지 확정된 주문 변경 ("불고기버거 1개 담음 (빼기: 피클)"), 최근 것만
+    - pending: 직전 안내가 묻고 아직 답을 못 받은 질문
+    - preferences: 말했던 선호 ("안 매움", "무설탕", "빼기: 피클")
+    - allergies: 말했던 알레르기 재료 ("우유", "땅콩")
+    - turns: 반영한 턴(사용자 발화) 수
+    """
+    confirmed: List[str] = Field(default_factory=list)
+    pending: Optional[str] = None
+    preferences: List[str] = Field(default_factory=list)
+    allergies: List[str] = Field(default_factory=list)
+    turns: int = 0
+
+
 # --------------------------------------
 # /analyze 요청/응답 모델
 # --------------------------------------
@@ -103,9 +164,25 @@ class AnalyzeRequest(BaseModel):
     React → Spring → Python 으로 들어오는 Body 형식
     """
     text: str                     # 브라우저 STT로 인식한 텍스트
-    scene: str                    # 현재 화면/상황(예: GREETING, SELECT_BURGER 등)
-    cart: Cart                    # 현재 장바구니 상태
-    menu: List[MenuItem]          # 현재 화면에서 선택 가능한 메뉴 리스트
+
+    # sessionId를 보내면 scene/cart/history는 생략 가능 (서버 세션 값 사용)
+    scene: Optional[str] = None   # 현재 화면/상황(예: GREETING, SELECT_BURGER 등)
+    cart: Cart = Field(default_factory=Cart)  # 현재 장바구니 상태
+
+    # 메뉴는 서버 카탈로그(CSV)를 버전으로 참조하는 것이 기본.
+    # menu 배열을 직접 보내면 그것을 우선 사용한다 (fallback).
+    menu: List[MenuItem] = Field(
+        default_factory=list,
+        description="현재 화면에서 선택 가능한 메뉴 리스트 (비우면 서버 카탈로그 사용)"
+    )
+    menuVersion: Optional[str] = Field(
+        default=None,
+        description="Spring이 알고 있는 서버 카탈로그 버전 (GET /menu/version 값)"
+    )
+    menuIds: Optional[List[str]] = Field(
+        default=None,
+        description="카탈로그 중 현재 화면에 보이는 menuId 목록 (없으면 전체)"
+    )
 
     # 🔹 추가: 최근 대화 히스토리 (optional)
     history: List[HistoryTurn] = Field(
@@ -113,6 +190,26 @@ class AnalyzeRequest(BaseModel):
         description="이전 user/assistant 발화 히스토리 (최신이 뒤에 오도록)"
     )
 
+    # 🔹 지난 대화 요약 (optional, sessionId를 쓰면 서버 세션 값으로 채워짐)
+    dialogueState: Optional[DialogueState] = Field(
+        default=None,
+        description="압축된 이전 대화 상태 (없으면 history의 오래된 발화에서 바로 뽑음)"
+    )
+
+    # 🔹 서버 세션 (optional)
+    sessionId: Optional[str] = Field(
+        default=None,
+        description="키오스크 세션 ID. 있으면 서버가 history/cart/scene을 보관"
+    )
+    sessionRevision: Optional[int] = Field(
+        default=None,
+        description="Spring이 마지막으로 받은 세션 revision (불일치 시 경고 로그)"
+    )
+
+    # 🔹 매장/키오스크 식별 (optional, 혼잡 시 매장/키오스크 간 공평한 처리 순서용)
+    storeId: Optional[str] = Field(default=None, description="매장 ID")
+    kioskId: Optional[str] = Field(default=None, description="키오스크 기기 ID")
+
 
 class AnalyzeResponse(BaseModel):
     """
@@ -122,3 +219,6 @@ class AnalyzeResponse(BaseModel):
     actions: List[KioskAction]    # 장바구니에 반영할 액션들
     should_finish: bool           # 주문을 끝낼지 여부
     next_scene: str               # 다음 화면/상태 (예: "CONFIRM", "GREETING" 등)
+    sessionRevision: Optional[int] = None  # sessionId 요청일 때, 이번 턴 반영 후 세션 revision
+    cart: Optional[Cart] = None            # actions를 반영한 결과 장바구니 (cart_engine)
+    totalPrice: Optional[int] = None       # 결과 장바구니 합계 금액(원)
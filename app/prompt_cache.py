@@ -0,0 +1,68 @@
+# app/prompt_cache.py
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+# 렌더링된 프롬프트 조각(메뉴 블록 등)을 몇 개까지 들고 있을지
+PROMPT_CACHE_SIZE = int(os.getenv("PROMPT_CACHE_SIZE", "256"))
+
+
+class LRUCache:
+    """
+    크기 제한이 있는 단순 LRU 캐시 (스레드 안전).
+    hits/misses 카운터를 같이 들고 있어서 stats()로 적중률을 볼 수 있다.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+            }
+
+
+# 메뉴 블록 캐시: key = (메뉴 fingerprint, limit)
+menu_block_cache = LRUCache(PROMPT_CACHE_SIZE)
+
+
+def clear_prompt_cache() -> None:
+    """카탈로그가 바뀌었을 때 렌더링된 프롬프트 조각을 모두 버린다."""
+    menu_block_cache.clear()
+
+
+def prompt_cache_stats() -> Dict[str, int]:
+    return menu_block_cache.stats()
@@ -0,0 +1,331 @@
+# app/recommender.py
+"""
+추천 의도("가볍게", "든든하게", "다이어트", "제일 싼" ...)별 메뉴 점수 계산 (NumPy).
+
+SYSTEM_PROMPT의 [메뉴 태그(tags) 활용 가이드]에 있는 의도를 LLM이 매번 kcal/fat_g/sodium_mg/price/tags를
+읽어 가며 고르던 것을, 메뉴 리스트마다 한 번 만들어 두는 특성 행렬 X(메뉴 × 특성)와
+의도별 가중치 벡터 w로 바꾼다 (점수 = X @ w).
+의도가 잡히면 상위 RECOMMEND_TOP_K개만 프롬프트에 싣고 LLM은 그 안에서 멘트만 만든다 (llm_client.build_messages).
+
+- 수치 컬럼(kcal, price 등)은 메뉴 리스트 안에서 0~1로 min-max 정규화 (값이 없으면 0.5)
+- 플래그(is_*)와 태그는 0/1
+- 가중치는 RECOMMEND_WEIGHTS_FILE(JSON)로 의도별로 덮어쓸 수 있다
+    {"diet": {"kcal": -1.0, "fat_g": -0.8}, "cheap": {"price": -1.0, "tag:가성비": 0.3}}
+"""
+import os
+import re
+import json
+import logging
+import threading
+import warnings
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .menu_catalog import menu_fingerprint
+from .menu_retrieval import lexical_matches, scene_categories
+from .models import AnalyzeRequest, MenuItem
+from .prompt_cache import LRUCache
+from .text_norm import compact
+
+logger = logging.getLogger(__name__)
+
+# --------------------------------------------------
+# 설정
+# - RECOMMEND_ENABLED: false면 추천 의도 감지/점수 계산을 건너뜀
+# - RECOMMEND_TOP_K: 프롬프트에 실을 추천 후보 수 (2~4 권장)
+# - RECOMMEND_WEIGHTS_FILE: 의도별 가중치를 덮어쓸 JSON 파일 경로 (비우면 기본값)
+# --------------------------------------------------
+RECOMMEND_ENABLED = os.getenv("RECOMMEND_ENABLED", "true").lower() == "true"
+RECOMMEND_TOP_K = int(os.getenv("RECOMMEND_TOP_K", "3"))
+RECOMMEND_WEIGHTS_FILE = os.getenv("RECOMMEND_WEIGHTS_FILE", "")
+
+# 메뉴를 직접 주문하는 발화 ("배고파요 더블 치즈버거 세트 주세요")는 추천하지 않는다
+# - _ORDER_VERBS: 주문 동사 (compact()한 발화 기준, "추천해 주세요"/"골라 줘"처럼 추천을 부탁하는 말은 제외)
+# - _NAMED_MENU_MIN_SCORE: 메뉴명 bigram이 이 비율 이상 발화에 나오면 메뉴를 이름으로 말한 것으로 봄
+_ORDER_VERBS = re.compile(r"주세요|줘|줄래|할게|할래|담아|넣어|추가|시킬|주문|로요|로할|로주")
+_RECOMMEND_ASKS = ("추천", "골라", "알아서")
+_NAMED_MENU_MIN_SCORE = 0.8
+
+# 특성 (X의 열 순서)
+NUMERIC_FEATURES: Tuple[str, ...] = ("kcal", "protein_g", "fat_g", "carbs_g", "sugars_g", "sodium_mg", "price")
+FLAG_FEATURES: Tuple[str, ...] = ("is_popular", "is_spicy", "is_sugar_free", "is_vegan", "is_limited")
+TAG_FEATURES: Tuple[str, ...] = (
+    "대표메뉴", "가성비", "포만감", "가벼운", "매운맛", "매운", "부드러운", "어르신추천", "아이추천", "맵지않음",
+)
+FEATURES: Tuple[str, ...] = NUMERIC_FEATURES + FLAG_FEATURES + tuple(f"tag:{t}" for t in TAG_FEATURES)
+_FEATURE_ID: Dict[str, int] = {name: i for i, name in enumerate(FEATURES)}
+
+
+@dataclass(frozen=True)
+class RecommendIntent:
+    name: str
+    label: str                       # 프롬프트/로그용 설명
+    patterns: Tuple[str, ...]        # compact()한 발화에서 찾을 정규식
+    weights: Dict[str, float]        # 특성 이름 → 가중치
+    categories: Tuple[str, ...]      # 추천 대상 카테고리
+    _regex: "re.Pattern" = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "_regex", re.compile("|".join(self.patterns)))
+
+    def matches(self, norm: str) -> bool:
+        return self._regex.search(norm) is not None
+
+    def vector(self) -> np.ndarray:
+        w = np.zeros(len(FEATURES), dtype=np.float32)
+        for name, value in self.weights.items():
+            w[_FEATURE_ID[name]] = value
+        return w
+
+
+# SYSTEM_PROMPT 가이드 순서 그대로 (먼저 걸린 의도를 쓴다)
+DEFAULT_INTENTS: Tuple[RecommendIntent, ...] = (
+    RecommendIntent(
+        "any", "대표/가성비 메뉴",
+        ("아무거나", "제일맛있", "복잡해", "귀찮", "알아서골라"),
+        {"is_popular": 1.0, "tag:대표메뉴": 1.0, "tag:가성비": 0.5, "is_limited": 0.2},
+        ("BURGER", "SET"),
+    ),
+    RecommendIntent(
+        "hearty", "양 많고 든든한 메뉴",
+        ("배가?(?:너무)?고프", "배고파", "양많", "든든"),
+        {"kcal": 1.0, "protein_g": 0.6, "tag:포만감": 1.0},
+        ("BURGER", "SET"),
+    ),
+    RecommendIntent(
+        "light", "가벼운 메뉴",
+        ("입맛이?없", "가볍게", "가벼운", "간단하게"),
+        {"kcal": -1.0, "fat_g": -0.3, "tag:가벼운": 1.0},
+        ("BURGER", "SIDE"),
+    ),
+    RecommendIntent(
+        "spicy", "매운 메뉴",
+        ("스트레스", "매운거땡", "매운게땡", "매운거당"),
+        {"is_spicy": 1.0, "tag:매운맛": 1.0, "tag:매운": 1.0, "is_popular": 0.2},
+        ("BURGER", "SET"),
+    ),
+    RecommendIntent(
+        "diet", "칼로리/지방/나트륨이 낮은 메뉴",
+        ("살덜찌", "살안찌", "다이어트", "칼로리낮", "저칼로리", "칼로리적"),
+        {"kcal": -1.0, "fat_g": -0.6, "sodium_mg": -0.4, "is_sugar_free": 0.5},
+        ("BURGER", "SIDE", "DRINK"),
+    ),
+    RecommendIntent(
+        "soft", "부드러운 메뉴",
+        ("이가안좋", "이가아파", "딱딱한", "못씹", "틀니"),
+        {"tag:부드러운": 1.0, "tag:어르신추천": 1.0, "is_spicy": -0.5, "protein_g": -0.2},
+        ("BURGER", "SIDE", "DESSERT"),
+    ),
+    RecommendIntent(
+        "kids", "아이가 먹기 좋은 메뉴",
+        ("아이가", "아이랑", "애가", "손주", "학생", "어린이", "초등학생"),
+        {"tag:아이추천": 1.0, "tag:맵지않음": 0.7, "is_spicy": -1.0, "sodium_mg": -0.3},
+        ("BURGER", "SET", "SIDE", "DESSERT"),
+    ),
+    RecommendIntent(
+        "cheap", "가격이 낮은 메뉴",
+        ("제일싼", "젤싼", "가장싼", "싼거", "저렴한", "가성비", "돈이없"),
+        {"price": -1.0, "tag:가성비": 0.5},
+        ("BURGER", "SET"),
+    ),
+)
+
+
+def _load_intents(path: str) -> Tuple[RecommendIntent, ...]:
+    """기본 의도에 RECOMMEND_WEIGHTS_FILE의 가중치를 덮어쓴다 (없는 특성 이름이면 ValueError)."""
+    if not path:
+        return DEFAULT_INTENTS
+    with open(path, encoding="utf-8") as f:
+        overrides: Dict[str, Dict[str, float]] = json.load(f)
+    intents = []
+    for intent in DEFAULT_INTENTS:
+        weights = overrides.get(intent.name)
+        if weights is None:
+            intents.append(intent)
+            continue
+        unknown = set(weights) - set(FEATURES)
+        if unknown:
+            raise ValueError(f"{path}: unknown recommend features for {intent.name}: {sorted(unknown)}")
+        intents.append(RecommendIntent(
+            intent.name, intent.label, intent.patterns,
+            {k: float(v) for k, v in weights.items()}, intent.categories,
+        ))
+    logger.info(f"[AI-RECOMMEND] weights loaded from {path}: {sorted(overrides)}")
+    return tuple(intents)
+
+
+INTENTS: Tuple[RecommendIntent, ...] = _load_intents(RECOMMEND_WEIGHTS_FILE)
+
+
+# ======================================
+# 특성 행렬 / 점수
+# ======================================
+
+def feature_matrix(menu: Sequence[MenuItem]) -> np.ndarray:
+    """메뉴 × 특성 float32 행렬 (수치 컬럼은 0~1 정규화, 값이 없으면 0.5)."""
+    n = len(menu)
+    X = np.zeros((n, len(FEATURES)), dtype=np.float32)
+
+    if not n:
+        return X
+
+    raw = np.array(
+        [[getattr(m, name) for name in NUMERIC_FEATURES] for m in menu],
+        dtype=np.float64,
+    )  # None → nan
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # 컬럼 전체가 비어 있으면 nan
+        lo = np.nanmin(raw, axis=0)
+        hi = np.nanmax(raw, axis=0)
+    span = np.where(hi > lo, hi - lo, 1.0)
+    scaled = (raw - lo) / span
+    X[:, :len(NUMERIC_FEATURES)] = np.where(np.isnan(scaled), 0.5, scaled)
+
+    base = len(NUMERIC_FEATURES)
+    for i, m in enumerate(menu):
+        for j, name in enumerate(FLAG_FEATURES):
+            if getattr(m, name):
+                X[i, base + j] = 1.0
+    base += len(FLAG_FEATURES)
+    tag_col = {t: base + j for j, t in enumerate(TAG_FEATURES)}
+    for i, m in enumerate(menu):
+        for t in m.tags:
+            j = tag_col.get(t)
+            if j is not None:
+                X[i, j] = 1.0
+    return X
+
+
+class RecommendIndex:
+    """
+    메뉴 리스트 하나에 대한 추천 인덱스.
+    만들 때 모든 의도의 점수(X @ W.T)를 한 번에 계산하고, 의도별로 대상 카테고리 안에서
+    점수 내림차순 순위를 미리 정렬해 둔다 → 요청마다 하는 일은 순위 앞에서 k개 꺼내기뿐.
+    """
+
+    def __init__(self, menu: Sequence[MenuItem], intents: Sequence[RecommendIntent] = INTENTS):
+        self.items: Tuple[MenuItem, ...] = tuple(menu)
+        self.intents = {intent.name: intent for intent in intents}
+        self.X = feature_matrix(self.items)
+        self.W = np.stack([intent.vector() for intent in intents]) if intents else np.zeros((0, len(FEATURES)))
+        self.scores = self.X @ self.W.T   # (메뉴, 의도)
+
+        categories = np.array([m.category for m in self.items], dtype=object)
+        self.rankings: Dict[str, np.ndarray] = {}
+        for col, intent in enumerate(intents):
+            eligible = np.flatnonzero(np.isin(categories, intent.categories))
+            # 동점이면 원래 메뉴 순서 (stable sort)
+            order = np.argsort(-self.scores[eligible, col], kind="stable")
+            self.rankings[intent.name] = eligible[order]
+
+    def score(self, weights: np.ndarray) -> np.ndarray:
+        """임의 가중치 벡터로 전체 메뉴 점수 (튜닝/벤치마크용)."""
+        return self.X @ weights
+
+    def top_k(
+        self,
+        intent: str,
+        k: int = RECOMMEND_TOP_K,
+        exclude: Iterable[str] = (),
+        categories: Optional[Iterable[str]] = None,
+    ) -> List[MenuItem]:
+        excluded = set(exclude)
+        allowed = set(categories) if categories else None
+        result: List[MenuItem] = []
+        for i in self.rankings[intent]:
+            item = self.items[i]
+            if item.menuId in excluded or (allowed is not None and item.category not in allowed):
+                continue
+            result.append(item)
+            if len(result) >= k:
+                break
+        return result
+
+
+_index_cache = LRUCache(32)
+
+
+def recommend_index(menu: Sequence[MenuItem]) -> RecommendIndex:
+    key = menu_fingerprint(menu)
+    index = _index_cache.get(key)
+    if index is None:
+        index = RecommendIndex(menu)
+        _index_cache.put(key, index)
+    return index
+
+
+def is_order(req: AnalyzeRequest) -> bool:
+    """메뉴 이름을 말했거나 주문 동사가 있는 발화 (추천이 아니라 주문으로 처리할 것)."""
+    norm = compact(req.text)
+    if _ORDER_VERBS.search(norm) and not any(w in norm for w in _RECOMMEND_ASKS):
+        return True
+    return bool(lexical_matches(req.text, req.menu, k=1, min_score=_NAMED_MENU_MIN_SCORE))
+
+
+def detect_intent(text: str) -> Optional[RecommendIntent]:
+    norm = compact(text)
+    for intent in INTENTS:
+        if intent.matches(norm):
+            return intent
+    return None
+
+
+# ======================================
+# 통계
+# ======================================
+
+class RecommendStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.by_intent: Dict[str, int] = {}
+
+    def record(self, intent: str) -> None:
+        with self._lock:
+            self.by_intent[intent] = self.by_intent.get(intent, 0) + 1
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "enabled": RECOMMEND_ENABLED,
+                "top_k": RECOMMEND_TOP_K,
+                "recommended": sum(self.by_intent.values()),
+                "by_intent": dict(self.by_intent),
+            }
+
+
+recommend_stats = RecommendStats()
+
+
+# ======================================
+# 외부 진입점
+# ======================================
+
+def recommend(req: AnalyzeRequest) -> Optional[Tuple[RecommendIntent, List[MenuItem]]]:
+    """
+    build_messages용: 추천 의도가 보이면 (의도, 상위 k개 메뉴), 아니면 None.
+    장바구니에 이미 있는 메뉴는 후보에서 뺀다.
+    메뉴 이름을 말했거나 주문 동사가 있으면(is_order) 추천하지 않는다 (평소처럼 후보를 골라 주문으로 처리).
+    지금 화면 카테고리와 의도 카테고리가 겹치면 겹치는 카테고리 안에서만 고른다
+    (버거 화면에서 "다이어트"면 제로 음료가 아니라 가벼운 버거).
+    """
+    if not RECOMMEND_ENABLED or req.scene == "CUSTOMIZE_BURGER" or not req.menu:
+        return None
+    intent = detect_intent(req.text)
+    if intent is None or is_order(req):
+        return None
+    shown = scene_categories(req) or ()
+    picks = recommend_index(req.menu).top_k(
+        intent.name,
+        RECOMMEND_TOP_K,
+        exclude=(ci.menuId for ci in req.cart.items),
+        categories=[c for c in intent.categories if c in shown],
+    )
+    if not picks:
+        return None
+    recommend_stats.record(intent.name)
+    logger.info(
+        f"[AI-RECOMMEND] intent={intent.name}, picks={[m.menuId for m in picks]}, text={req.text}"
+    )
+    return intent, picks
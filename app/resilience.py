@@ -0,0 +1,336 @@
+# app/resilience.py
+"""
+OpenAI 호출을 감싸는 복원력 계층.
+- 턴 단위 마감 시간(LLM_TURN_DEADLINE): 재시도/헤지 모두 이 안에서만
+- 헤지 요청: 첫 요청이 LLM_HEDGE_DELAY 안에 안 끝나면 두 번째 요청(선택적으로 더 빠른 모델)을 보내고
+  먼저 끝난 쪽을 쓰고 나머지는 취소
+- 재시도: 일시적 오류(연결/타임아웃/429/5xx)만, 지수 백오프 + full jitter, 남은 시간이 있을 때만
+- 서킷 브레이커: 연속 실패가 쌓이면 일정 시간 바로 실패시켜 키오스크가 멈춰 있지 않게 함
+  브레이커와 헤지용 지연 추적은 모델별 (작은 모델 장애가 큰 모델로의 escalation까지 막지 않도록)
+
+llm_client는 call_with_resilience(attempt, model)만 사용한다.
+attempt(model, timeout)는 한 번의 업스트림 호출을 하는 코루틴 함수.
+"""
+import os
+import time
+import random
+import asyncio
+import logging
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+import openai
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# --------------------------------------------------
+# 복원력 설정
+# - LLM_TURN_DEADLINE: 한 턴에서 LLM 호출(재시도/헤지 포함)에 쓸 수 있는 총 시간(초)
+# - LLM_HEDGE_DELAY: 헤지 요청을 보내기까지 기다릴 시간(초)
+#     "auto"면 최근 성공 호출의 p95 (표본이 LLM_HEDGE_MIN_SAMPLES 미만이면 헤지 안 함), "0"/"off"면 끔
+# - LLM_HEDGE_MODEL: 헤지 요청에 쓸 모델 (비우면 같은 모델)
+# - LLM_MAX_RETRIES: 일시적 오류 시 최대 재시도 횟수
+# - LLM_RETRY_BASE_DELAY / LLM_RETRY_MAX_DELAY: 재시도 백오프(초), 실제 대기는 [0, min(max, base*2^n)] 균등 분포
+# - LLM_BREAKER_FAILURES: 연속 실패 몇 번에 서킷을 열지
+# - LLM_BREAKER_RESET: 서킷을 연 뒤 시험 호출 하나를 허용하기까지의 시간(초)
+# --------------------------------------------------
+LLM_TURN_DEADLINE = float(os.getenv("LLM_TURN_DEADLINE", "8"))
+LLM_HEDGE_DELAY = os.getenv("LLM_HEDGE_DELAY", "auto").strip().lower()
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_HEDGE_MODEL = os.getenv("LLM_HEDGE_MODEL", "") or None
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "0.2"))
+LLM_RETRY_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", "1.0"))
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_RESET = float(os.getenv("LLM_BREAKER_RESET", "30"))
+
+_LATENCY_WINDOW = 200
+
+
+class CircuitOpenError(Exception):
+    """서킷이 열려 있어 업스트림을 호출하지 않고 바로 실패."""
+
+
+class DeadlineExceeded(Exception):
+    """턴 마감 시간 안에 성공한 호출이 없음."""
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """재시도해 볼 만한 일시적 오류인지 (요청 자체가 잘못된 4xx는 제외)."""
+    if isinstance(exc, (asyncio.TimeoutError, openai.APIConnectionError, openai.RateLimitError)):
+        return True  # APITimeoutError는 APIConnectionError의 하위 클래스
+    if isinstance(exc, openai.APIStatusError):
+        return exc.status_code >= 500 or exc.status_code in (408, 409)
+    return False
+
+
+class CircuitBreaker:
+    """
+    closed → (연속 실패 failure_threshold번) → open → (reset_timeout 경과) → half_open
+    half_open에서는 시험 호출 하나만 허용하고, 성공하면 closed / 실패하면 다시 open.
+    시험 호출이 결과 없이 사라져도(취소 등) reset_timeout이 지나면 다음 요청이 다시 시험 호출을 한다.
+    """
+
+    def __init__(self, failure_threshold: int = LLM_BREAKER_FAILURES, reset_timeout: float = LLM_BREAKER_RESET):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._probe_started = 0.0
+        self.opened = 0
+        self.rejected = 0
+
+    def allow(self) -> bool:
+        if self.failure_threshold <= 0 or self.state == "closed":
+            return True
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                self.rejected += 1
+                return False
+            self.state = "half_open"
+            self._probe_in_flight = False
+        now = time.monotonic()
+        if self._probe_in_flight and now - self._probe_started < self.reset_timeout:
+            self.rejected += 1
+            return False
+        self._probe_in_flight = True
+        self._probe_started = now
+        return True
+
+    def record_success(self) -> None:
+        if self.state != "closed":
+            logger.info("[AI-BREAKER] closed (upstream recovered)")
+        self.state = "closed"
+        self.failures = 0
+        self._probe_in_flight = False
+
+    def release(self) -> None:
+        """
+        상태는 그대로 두고 half_open 시험 호출 자리만 돌려준다.
+        잘못된 요청(4xx)이나 취소처럼 업스트림 상태를 알려 주지 않는 결과에 쓴다 (다음 요청이 다시 시험 호출).
+        """
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._probe_in_flight = False
+        if self.state == "half_open" or (
+            self.failure_threshold > 0 and self.failures >= self.failure_threshold
+        ):
+            if self.state != "open":
+                self.opened += 1
+                logger.warning(f"[AI-BREAKER] open after {self.failures} consecutive failures")
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "opened": self.opened,
+            "rejected": self.rejected,
+        }
+
+
+class LatencyTracker:
+    """최근 성공 호출 지연(초)의 이동 창. auto 헤지 지연 계산용."""
+
+    def __init__(self, window: int = _LATENCY_WINDOW):
+        self._samples: Deque[float] = deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, p: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        values = sorted(self._samples)
+        return values[min(len(values) - 1, int(p / 100 * len(values)))]
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+
+@dataclass
+class ResiliencePolicy:
+    deadline: float = LLM_TURN_DEADLINE
+    hedge_delay: str = LLM_HEDGE_DELAY
+    hedge_min_samples: int = LLM_HEDGE_MIN_SAMPLES
+    hedge_model: Optional[str] = LLM_HEDGE_MODEL
+    max_retries: int = LLM_MAX_RETRIES
+    retry_base_delay: float = LLM_RETRY_BASE_DELAY
+    retry_max_delay: float = LLM_RETRY_MAX_DELAY
+
+    def resolve_hedge_delay(self, tracker: LatencyTracker) -> Optional[float]:
+        """이번 호출의 헤지 지연(초). None이면 헤지하지 않음."""
+        if self.hedge_delay in ("", "0", "off", "false", "none"):
+            return None
+        if self.hedge_delay == "auto":
+            if len(tracker) < self.hedge_min_samples:
+                return None
+            return tracker.percentile(95)
+        return float(self.hedge_delay)
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * (2 ** attempt)))
+
+
+class ResilienceStats:
+    def __init__(self):
+        self.calls = 0
+        self.attempts = 0
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.deadline_exceeded = 0
+        self.short_circuited = 0
+
+    def stats(self) -> Dict[str, int]:
+        return dict(vars(self))
+
+
+# 모델별 서킷 브레이커 / 지연 추적 (처음 호출할 때 만든다)
+breakers: Dict[str, CircuitBreaker] = {}
+latency_trackers: Dict[str, LatencyTracker] = {}
+# 모델 구분 없는 전체 지연 (admission 대기 예산용)
+latency_tracker = LatencyTracker()
+resilience_stats = ResilienceStats()
+default_policy = ResiliencePolicy()
+
+
+def breaker_for(model: str) -> CircuitBreaker:
+    b = breakers.get(model)
+    if b is None:
+        b = breakers.setdefault(model, CircuitBreaker())
+    return b
+
+
+def tracker_for(model: str) -> LatencyTracker:
+    t = latency_trackers.get(model)
+    if t is None:
+        t = latency_trackers.setdefault(model, LatencyTracker())
+    return t
+
+
+def reset_breakers() -> None:
+    """모든 모델의 서킷/지연 기록을 비운다 (벤치마크 모드 전환용)."""
+    breakers.clear()
+    latency_trackers.clear()
+
+
+async def _timed(attempt: Callable[[str, float], Awaitable[T]], model: str, timeout: float) -> T:
+    resilience_stats.attempts += 1
+    started = time.monotonic()
+    result = await attempt(model, timeout)
+    elapsed = time.monotonic() - started
+    tracker_for(model).record(elapsed)
+    latency_tracker.record(elapsed)
+    return result
+
+
+async def _hedged(
+    attempt: Callable[[str, float], Awaitable[T]],
+    model: str,
+    deadline: float,
+    policy: ResiliencePolicy,
+    hedge: bool,
+) -> T:
+    """한 번의 시도 (필요하면 헤지 포함). 마감까지 끝나지 않으면 asyncio.TimeoutError."""
+    loop = asyncio.get_running_loop()
+    remaining = deadline - loop.time()
+    primary = asyncio.ensure_future(_timed(attempt, model, remaining))
+    tasks = {primary}
+    try:
+        hedge_delay = policy.resolve_hedge_delay(tracker_for(model)) if hedge else None
+        if hedge_delay is not None and hedge_delay < remaining:
+            done, _ = await asyncio.wait(tasks, timeout=hedge_delay)
+            if not done:
+                resilience_stats.hedges += 1
+                hedge_model = policy.hedge_model or model
+                logger.info(f"[AI-HEDGE] primary slower than {hedge_delay:.2f}s, hedging with model={hedge_model}")
+                tasks.add(asyncio.ensure_future(_timed(attempt, hedge_model, deadline - loop.time())))
+
+        errors = []
+        while tasks:
+            done, tasks = await asyncio.wait(
+                tasks, timeout=max(0.0, deadline - loop.time()), return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                raise asyncio.TimeoutError()
+            for t in done:
+                if t.exception() is None:
+                    if t is not primary:
+                        resilience_stats.hedge_wins += 1
+                    return t.result()
+                errors.append(t.exception())
+        raise errors[0]
+    finally:
+        for t in tasks | {primary}:
+            if not t.done():
+                t.cancel()
+
+
+async def call_with_resilience(
+    attempt: Callable[[str, float], Awaitable[T]],
+    model: str,
+    policy: Optional[ResiliencePolicy] = None,
+    hedge: bool = True,
+) -> T:
+    """
+    attempt(model, timeout)를 마감/헤지/재시도/서킷 브레이커 규칙에 따라 실행한다.
+    실패하면 마지막 오류, DeadlineExceeded 또는 CircuitOpenError를 던진다.
+    """
+    policy = policy or default_policy
+    breaker = breaker_for(model)
+    resilience_stats.calls += 1
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + policy.deadline
+
+    last_error: Optional[BaseException] = None
+    for n in range(policy.max_retries + 1):
+        if not breaker.allow():
+            resilience_stats.short_circuited += 1
+            raise CircuitOpenError("upstream circuit is open") from last_error
+        if n:
+            resilience_stats.retries += 1
+        try:
+            result = await _hedged(attempt, model, deadline, policy, hedge)
+        except Exception as e:
+            if not is_retryable(e):
+                # 잘못된 요청(4xx)은 업스트림이 회복됐다는 뜻도, 장애라는 뜻도 아니므로 서킷 상태를 바꾸지 않는다
+                breaker.release()
+                raise
+            breaker.record_failure()
+            last_error = e
+            logger.warning(f"[AI-RETRY] attempt {n + 1} failed: {type(e).__name__}: {e}")
+            if n == policy.max_retries:
+                break
+            delay = policy.backoff(n)
+            if loop.time() + delay >= deadline:
+                resilience_stats.deadline_exceeded += 1
+                raise DeadlineExceeded(f"no successful LLM call within {policy.deadline}s") from e
+            await asyncio.sleep(delay)
+            continue
+        except BaseException:
+            # 취소(CancelledError: 투기 호출 폐기, 스트림 연결 끊김, 헤지 패자 등)도 결과가 아니므로 자리만 돌려준다
+            breaker.release()
+            raise
+        breaker.record_success()
+        return result
+
+    raise last_error
+
+
+def resilience_stats_snapshot() -> Dict[str, Any]:
+    hedge_delay = default_policy.resolve_hedge_delay(latency_tracker)
+    return {
+        **resilience_stats.stats(),
+        "breakers": {model: b.stats() for model, b in list(breakers.items())},
+        "hedge_delay_s": round(hedge_delay, 3) if hedge_delay is not None else None,
+        "latency_p95_s": latency_tracker.percentile(95),
+    }
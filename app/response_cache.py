@@ -0,0 +1,108 @@
+# app/response_cache.py
+import os
+import time
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+# --------------------------------------------------
+# 응답 캐시 설정
+# - RESPONSE_CACHE_ENABLED: false면 캐시를 건너뜀
+# - RESPONSE_CACHE_SIZE: 최대 보관 항목 수 (LRU)
+# - RESPONSE_CACHE_TTL: 항목 유효 시간(초)
+# --------------------------------------------------
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "2048"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "300"))
+
+
+class ResponseCacheBackend(ABC):
+    """
+    응답 캐시 저장소 인터페이스.
+    값은 AnalyzeResponse.model_dump() 결과(dict)라서 Redis 같은 공유 저장소로도 옮길 수 있다.
+    get/set/clear를 다 구현하지 않은 백엔드는 만들 때 TypeError (첫 요청까지 기다리지 않음).
+    """
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: Dict[str, Any], ttl: float) -> None:
+        ...
+
+    @abstractmethod
+    async def clear(self) -> None:
+        ...
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+
+class InMemoryResponseCache(ResponseCacheBackend):
+    """프로세스 내부 LRU + TTL 캐시."""
+
+    def __init__(self, maxsize: int = RESPONSE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._data[key]
+                self.expired += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    async def set(self, key: str, value: Dict[str, Any], ttl: float) -> None:
+        if self.maxsize <= 0 or ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    async def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "enabled": RESPONSE_CACHE_ENABLED,
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+            }
+
+
+response_cache: ResponseCacheBackend = InMemoryResponseCache()
+
+
+def set_response_cache_backend(backend: ResponseCacheBackend) -> None:
+    """공유 저장소 등 다른 백엔드로 교체."""
+    global response_cache
+    response_cache = backend
+
+
+def get_response_cache() -> ResponseCacheBackend:
+    return response_cache
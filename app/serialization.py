@@ -0,0 +1,222 @@
+# app/serialization.py
+"""
+/analyze 요청/응답 직렬화.
+
+strict 모드 (STRICT_SERIALIZATION=true, 예전 동작):
+- 요청 바디 전체를 Pydantic으로 검증 (menu 배열의 MenuItem 하나하나까지)
+- LLM 응답은 AnalyzeResponse(**data)로 다시 검증, FastAPI response_model로 직렬화
+
+fast 모드 (기본):
+- orjson으로 디코딩/인코딩 (없으면 표준 json)
+- 인라인 menu 항목은 검증하지 않은 LazyMenuItem으로 감싸 두고,
+  실제로 프롬프트에 실리는 항목만 MenuItem으로 검증한다 (materialize_menu, 항목 내용별로 결과 캐시)
+  디코딩 때는 필드 값의 JSON 타입만 확인한다 (필수 필드 존재, 숫자는 숫자, 플래그는 true/false/null,
+  tags는 문자열 배열). 추천/조건 검색/장바구니 합계는 검증 전 값을 그대로 읽으므로,
+  하나라도 다르면 ("kcal": "많음", "allergen_milk": "no") strict와 같이 menu 전체를 검증한다
+  (422 또는 pydantic 변환 결과)
+- 응답은 _parse_completion에서 한 번 만든 AnalyzeResponse를 그대로 인코딩한다
+  (FastAPI response_model의 재검증 / SSE final 재검증을 건너뜀)
+  검증 없이 모델을 만드는 것(model_construct 등)은 파이썬 코드라 pydantic-core 검증 한 번보다 느려서 쓰지 않는다
+"""
+import os
+import json
+import logging
+from typing import Any, Dict, FrozenSet, List, Optional, Sequence, Tuple, Union, get_args
+
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
+
+from .models import AnalyzeRequest, AnalyzeResponse, MenuItem
+from .prompt_cache import LRUCache
+from .settings import get_settings
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson은 requirements에 있지만 없어도 동작
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+
+def strict_mode() -> bool:
+    return get_settings().strict_serialization
+
+
+# ======================================
+# JSON
+# ======================================
+
+def loads(data: Union[bytes, str]) -> Any:
+    if orjson is not None and not strict_mode():
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj: Any) -> bytes:
+    """UTF-8 JSON bytes (한글을 이스케이프하지 않음)."""
+    if orjson is not None and not strict_mode():
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+
+def dumps_str(obj: Any) -> str:
+    return dumps(obj).decode("utf-8")
+
+
+# ======================================
+# 인라인 메뉴 (지연 검증)
+# ======================================
+
+_MENU_DEFAULTS: Dict[str, Any] = {
+    name: field.default
+    for name, field in MenuItem.model_fields.items()
+    if not field.is_required() and field.default_factory is None
+}
+_MENU_DEFAULTS["tags"] = ()
+
+
+def _json_types(annotation: Any) -> Tuple[type, ...]:
+    """MenuItem 필드 타입 → 검증 없이 받아도 되는 JSON 값 타입 (float 필드는 정수도 허용)."""
+    kinds = get_args(annotation) or (annotation,)
+    if float in kinds:
+        kinds += (int,)
+    return tuple(kinds)
+
+
+# 받아도 되는 (필드, 값 타입) 쌍. MenuItem에 없는 키가 오면 전체 검증으로 넘긴다 (드묾)
+_FIELD_TYPES: FrozenSet[Tuple[str, type]] = frozenset(
+    (name, kind)
+    for name, field in MenuItem.model_fields.items() if name != "tags"
+    for kind in _json_types(field.annotation)
+) | {("tags", list)}
+_REQUIRED_FIELDS: FrozenSet[str] = frozenset(
+    name for name, field in MenuItem.model_fields.items() if field.is_required()
+)
+
+# 항목 JSON bytes → 검증된 MenuItem
+_validated_items = LRUCache(int(os.getenv("LAZY_MENU_CACHE_SIZE", "2048")))
+
+
+class LazyMenuItem:
+    """
+    검증 전의 메뉴 항목 (요청 JSON dict를 그대로 속성으로 노출).
+    보내지 않은 필드는 MenuItem 기본값. MenuItem이 필요할 때 validated()로 한 번만 검증한다.
+    """
+
+    def __init__(self, raw: Dict[str, Any]):
+        self.__dict__ = raw
+
+    def __getattr__(self, name: str):
+        try:
+            return _MENU_DEFAULTS[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def validated(self) -> MenuItem:
+        raw = self.__dict__
+        item = raw.get("_validated")
+        if item is None:
+            # Spring은 매 턴 같은 메뉴를 보내므로 항목 JSON이 같으면 이전 검증 결과를 재사용
+            key = dumps(raw)
+            item = _validated_items.get(key)
+            if item is None:
+                item = MenuItem.model_validate(raw)
+                _validated_items.put(key, item)
+            raw["_validated"] = item
+        return item
+
+
+class LazyMenu(list):
+    """LazyMenuItem 리스트. menu_fingerprint 결과를 요청 동안 한 번만 계산해 붙여 둔다."""
+    _fingerprint = None
+
+
+def _lazy_menu(raw_menu: Any) -> Optional[List[Any]]:
+    """필드 값 타입을 확인하고 감싼다. 형태가 이상한 항목이 있으면 None (전체 검증으로 넘김)."""
+    if not isinstance(raw_menu, list):
+        return None
+    items = LazyMenu()
+    for raw in raw_menu:
+        if (
+            not isinstance(raw, dict)
+            or not raw.keys() >= _REQUIRED_FIELDS
+            or not _FIELD_TYPES.issuperset(zip(raw, map(type, raw.values())))
+            or not all(type(t) is str for t in raw.get("tags", ()))
+        ):
+            return None
+        items.append(LazyMenuItem(raw))
+    return items
+
+
+def materialize_menu(menu: Sequence[Any], n_focus: int = 0) -> Tuple[List[MenuItem], int]:
+    """
+    프롬프트에 실을 메뉴만 MenuItem으로 검증한다 (검증에 실패한 항목은 경고 후 제외).
+    반환: (메뉴, 제외 후의 n_focus)
+    """
+    if not any(type(m) is LazyMenuItem for m in menu):
+        return list(menu), n_focus
+    result: List[MenuItem] = []
+    focus = n_focus
+    for idx, m in enumerate(menu):
+        if type(m) is LazyMenuItem:
+            try:
+                m = m.validated()
+            except ValidationError as e:
+                logger.warning(f"[MENU] Invalid inline menu item skipped: menuId={m.menuId}, {e.errors()[:2]}")
+                if idx < n_focus:
+                    focus -= 1
+                continue
+        result.append(m)
+    return result, focus
+
+
+# ======================================
+# 요청 디코딩
+# ======================================
+
+def _request_error(e: ValidationError) -> RequestValidationError:
+    # FastAPI 기본 422 응답과 같은 형태 (loc 앞에 "body")
+    errors = e.errors(include_url=False)
+    for err in errors:
+        err["loc"] = ("body",) + tuple(err["loc"])
+    return RequestValidationError(errors)
+
+
+def parse_analyze_request(body: Union[bytes, str]) -> AnalyzeRequest:
+    """요청 바디 → AnalyzeRequest. 잘못된 요청이면 ValidationError / ValueError."""
+    if strict_mode():
+        return AnalyzeRequest.model_validate_json(body)
+
+    data = loads(body)
+    if not isinstance(data, dict):
+        return AnalyzeRequest.model_validate(data)  # ValidationError
+    raw_menu = data.pop("menu", None)
+    menu = _lazy_menu(raw_menu) if raw_menu else None
+    if raw_menu and menu is None:
+        # strict와 같은 에러(loc 포함)를 내도록 menu까지 전체 검증
+        return AnalyzeRequest.model_validate(dict(data, menu=raw_menu))
+    req = AnalyzeRequest.model_validate(data)
+    if menu:
+        req.menu = menu
+    return req
+
+
+def decode_analyze_request(body: bytes) -> AnalyzeRequest:
+    """엔드포인트용: 잘못된 요청은 FastAPI 기본 422 응답으로."""
+    try:
+        return parse_analyze_request(body)
+    except ValidationError as e:
+        raise _request_error(e)
+    except ValueError as e:  # JSON 디코딩 실패 (orjson.JSONDecodeError / json.JSONDecodeError)
+        raise RequestValidationError(
+            [{"type": "json_invalid", "loc": ("body",), "msg": f"JSON decode error: {e}", "input": {}}]
+        )
+
+
+# ======================================
+# 응답 인코딩
+# ======================================
+
+def encode_response(response: AnalyzeResponse) -> bytes:
+    """응답을 JSON bytes로 (FastAPI response_model의 재검증/직렬화를 거치지 않음)."""
+    return dumps(response.model_dump())
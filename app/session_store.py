@@ -0,0 +1,179 @@
+# app/session_store.py
+import os
+import time
+import logging
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+from .cart_engine import apply_actions, cart_index
+from .dialogue_state import update_dialogue_state
+from .models import AnalyzeRequest, AnalyzeResponse, Cart, DialogueState, HistoryTurn
+
+logger = logging.getLogger(__name__)
+
+# --------------------------------------------------
+# 세션 저장소 설정
+# - SESSION_TTL: 마지막 턴 이후 세션을 유지할 시간(초)
+# - SESSION_MAX_SESSIONS: 동시에 들고 있을 최대 세션 수 (넘으면 가장 오래된 것부터 제거)
+# - SESSION_MAX_HISTORY: 세션당 보관할 최대 발화 수
+# --------------------------------------------------
+SESSION_TTL = float(os.getenv("SESSION_TTL", "1800"))
+SESSION_MAX_SESSIONS = int(os.getenv("SESSION_MAX_SESSIONS", "10000"))
+SESSION_MAX_HISTORY = int(os.getenv("SESSION_MAX_HISTORY", "20"))
+
+DEFAULT_SCENE = "GREETING"
+
+
+class SessionState(BaseModel):
+    """키오스크 세션 1개의 서버 측 상태."""
+    history: List[HistoryTurn] = Field(default_factory=list)
+    cart: Cart = Field(default_factory=Cart)
+    scene: Optional[str] = None
+    dialogue: DialogueState = Field(default_factory=DialogueState)  # 지난 대화 요약 (턴마다 갱신)
+    revision: int = 0
+
+
+class SessionStoreBackend(ABC):
+    """
+    세션 저장소 인터페이스 (Redis 등 공유 저장소로 교체 가능).
+    get/put/delete를 다 구현하지 않은 백엔드는 만들 때 TypeError (첫 요청까지 기다리지 않음).
+    """
+
+    @abstractmethod
+    async def get(self, session_id: str) -> Optional[SessionState]:
+        ...
+
+    @abstractmethod
+    async def put(self, session_id: str, state: SessionState) -> None:
+        ...
+
+    @abstractmethod
+    async def delete(self, session_id: str) -> None:
+        ...
+
+    def stats(self) -> Dict[str, int]:
+        return {}
+
+
+class InMemorySessionStore(SessionStoreBackend):
+    """프로세스 내부 세션 저장소 (TTL + 최대 개수 제한)."""
+
+    def __init__(self, ttl: float = SESSION_TTL, max_sessions: int = SESSION_MAX_SESSIONS):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._data: "OrderedDict[str, Tuple[float, SessionState]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evicted = 0
+        self.expired = 0
+
+    async def get(self, session_id: str) -> Optional[SessionState]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(session_id)
+            if entry is None:
+                return None
+            expires_at, state = entry
+            if expires_at <= now:
+                del self._data[session_id]
+                self.expired += 1
+                return None
+            return state.model_copy(deep=True)
+
+    async def put(self, session_id: str, state: SessionState) -> None:
+        with self._lock:
+            self._data[session_id] = (time.monotonic() + self.ttl, state)
+            self._data.move_to_end(session_id)
+            while len(self._data) > self.max_sessions:
+                self._data.popitem(last=False)
+                self.evicted += 1
+
+    async def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._data.pop(session_id, None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "sessions": len(self._data),
+                "max_sessions": self.max_sessions,
+                "expired": self.expired,
+                "evicted": self.evicted,
+            }
+
+
+session_store: SessionStoreBackend = InMemorySessionStore()
+
+
+def set_session_store_backend(backend: SessionStoreBackend) -> None:
+    global session_store
+    session_store = backend
+
+
+def get_session_store() -> SessionStoreBackend:
+    return session_store
+
+
+# ======================================
+# /analyze 연동
+# ======================================
+
+async def load_session(req: AnalyzeRequest) -> Optional[SessionState]:
+    """
+    sessionId가 있으면 저장된 상태로 요청의 빈 부분을 채운다.
+    - cart / history를 보내지 않았으면 서버에 저장된 값을 사용
+    - scene을 보내지 않았으면 직전 턴의 next_scene 사용
+    - dialogueState를 보내지 않았으면 저장된 대화 요약 사용
+    보낸 값이 있으면 그것이 우선 (Spring이 상태를 바로잡는 경로).
+    """
+    if not req.sessionId:
+        return None
+
+    state = await session_store.get(req.sessionId) or SessionState()
+    if req.sessionRevision is not None and req.sessionRevision != state.revision:
+        logger.warning(
+            f"[SESSION] Revision drift: session={req.sessionId}, "
+            f"client={req.sessionRevision}, server={state.revision}"
+        )
+
+    sent = req.model_fields_set
+    if "cart" not in sent:
+        req.cart = state.cart
+    if "history" not in sent:
+        req.history = state.history
+    if req.scene is None:
+        req.scene = state.scene or DEFAULT_SCENE
+    if req.dialogueState is None:
+        req.dialogueState = state.dialogue
+    return state
+
+
+async def save_turn(req: AnalyzeRequest, state: SessionState, response: AnalyzeResponse) -> int:
+    """
+    이번 턴 결과를 세션에 반영하고 새 revision을 돌려준다.
+    - history: 이번 사용자 발화 + assistant 응답을 뒤에 추가
+    - cart: 응답의 결과 장바구니 (CART_ENGINE_ENABLED=false면 여기서 actions를 반영)
+    - scene: 응답의 next_scene
+    - dialogue: 이번 발화 / 반영된 actions / 응답 문장으로 대화 요약 갱신
+    """
+    history = list(req.history)
+    history.append(HistoryTurn(role="user", content=req.text))
+    history.append(HistoryTurn(role="assistant", content=response.assistant_text))
+
+    state.history = history[-SESSION_MAX_HISTORY:]
+    index = cart_index(req.menu)
+    if response.cart is not None:
+        state.cart = response.cart
+        actions = response.actions
+    else:
+        actions, state.cart = apply_actions(req.cart, response.actions, index)
+    state.dialogue = update_dialogue_state(
+        req.dialogueState or state.dialogue, req.text, response.assistant_text, actions, index
+    )
+    state.scene = response.next_scene
+    state.revision += 1
+    await session_store.put(req.sessionId, state)
+    return state.revision
@@ -0,0 +1,110 @@
+# app/settings.py
+"""
+LLM 클라이언트 설정.
+import 시점에는 아무것도 읽지 않고, 처음 get_settings()를 부를 때 .env + 환경 변수에서 만든다.
+테스트/도구에서는 set_settings()로 원하는 값을 주입할 수 있다.
+"""
+import os
+import threading
+from dataclasses import dataclass
+from typing import Optional
+
+from dotenv import load_dotenv
+
+_env_loaded = False
+_env_lock = threading.Lock()
+
+
+def load_env() -> None:
+    """.env를 한 번만 읽는다 (이미 설정된 환경 변수가 우선)."""
+    global _env_loaded
+    if _env_loaded:
+        return
+    with _env_lock:
+        if not _env_loaded:
+            load_dotenv()
+            _env_loaded = True
+
+
+@dataclass(frozen=True)
+class Settings:
+    # OpenAI
+    openai_api_key: Optional[str] = None
+    openai_base_url: Optional[str] = None   # 미지정 시 SDK 기본값 (OPENAI_BASE_URL 또는 api.openai.com)
+    openai_model: str = "gpt-4.1-mini"
+
+    # 업스트림 커넥션 풀 / 동시성
+    # - max_connections: 풀 전체 최대 커넥션 수
+    # - max_keepalive_connections: 유휴 상태로 유지할 keep-alive 커넥션 수
+    # - keepalive_expiry: 유휴 커넥션을 닫기까지의 시간(초)
+    # - llm_max_concurrency: 동시에 진행 중인 업스트림 호출 상한
+    # - llm_timeout: LLM 호출 1회당 타임아웃(초). 턴 전체 마감은 resilience.LLM_TURN_DEADLINE
+    max_connections: int = 200
+    max_keepalive_connections: int = 50
+    keepalive_expiry: float = 30.0
+    llm_max_concurrency: int = 200
+    llm_timeout: float = 10.0
+
+    # 워밍업 시 미리 열어 둘 업스트림 커넥션 수 (0이면 열지 않음)
+    warmup_connections: int = 4
+
+    # 요청/응답 직렬화 (app.serialization)
+    # - False(기본): orjson + 인라인 메뉴 지연 검증 + 보정된 actions는 검증 없이 생성
+    # - True: 요청/응답 전체를 Pydantic으로 검증 (예전 동작)
+    strict_serialization: bool = False
+
+    # LLM 출력 형식
+    # - "json"(기본): SYSTEM_PROMPT의 JSON 스키마 그대로 (assistant_text / actions / should_finish / next_scene)
+    # - "compact": 짧은 키 + 메뉴 목록 번호 + 기본값 생략 (llm_client.COMPACT_OUTPUT_PROMPT 참고), 생성 토큰 절약용
+    llm_output_format: str = "json"
+
+    # 턴별 모델 티어 (app.model_tiering)
+    # - llm_small_model: 단순한 턴에 쓸 작고 빠른 모델. 비우면 티어 없이 항상 openai_model
+    # - llm_small_timeout / llm_small_max_tokens: 작은 모델 호출 1회 타임아웃(초) / 최대 출력 토큰
+    # - llm_max_tokens: 큰 모델(openai_model)의 최대 출력 토큰 (0이면 지정하지 않음)
+    llm_small_model: Optional[str] = None
+    llm_small_timeout: float = 4.0
+    llm_small_max_tokens: int = 300
+    llm_max_tokens: int = 0
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        load_env()
+        return cls(
+            openai_api_key=os.getenv("OPENAI_API_KEY") or None,
+            openai_base_url=os.getenv("OPENAI_BASE_URL") or None,
+            openai_model=os.getenv("OPENAI_MODEL", "gpt-4.1-mini"),
+            max_connections=int(os.getenv("OPENAI_MAX_CONNECTIONS", "200")),
+            max_keepalive_connections=int(os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", "50")),
+            keepalive_expiry=float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "30")),
+            llm_max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "200")),
+            llm_timeout=float(os.getenv("LLM_TIMEOUT", "10")),
+            warmup_connections=int(os.getenv("LLM_WARMUP_CONNECTIONS", "4")),
+            strict_serialization=os.getenv("STRICT_SERIALIZATION", "false").lower() == "true",
+            llm_output_format=os.getenv("LLM_OUTPUT_FORMAT", "json").lower(),
+            llm_small_model=os.getenv("LLM_SMALL_MODEL") or None,
+            llm_small_timeout=float(os.getenv("LLM_SMALL_TIMEOUT", "4")),
+            llm_small_max_tokens=int(os.getenv("LLM_SMALL_MAX_TOKENS", "300")),
+            llm_max_tokens=int(os.getenv("LLM_MAX_TOKENS", "0")),
+        )
+
+    def require_api_key(self) -> str:
+        if not self.openai_api_key:
+            raise RuntimeError("OPENAI_API_KEY가 설정되지 않았습니다. .env 파일을 확인해주세요.")
+        return self.openai_api_key
+
+
+_settings: Optional[Settings] = None
+
+
+def get_settings() -> Settings:
+    global _settings
+    if _settings is None:
+        _settings = Settings.from_env()
+    return _settings
+
+
+def set_settings(settings: Optional[Settings]) -> None:
+    """설정 주입 (None이면 다음 get_settings()에서 환경 변수로 다시 만든다)."""
+    global _settings
+    _settings = settings
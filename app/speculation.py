@@ -0,0 +1,175 @@
+# app/speculation.py
+"""
+중간(interim) STT 결과로 미리 분석해 두기.
+
+브라우저 STT는 최종 문장보다 훨씬 먼저 중간 결과를 내는데, /analyze는 최종 text가 Spring을 거쳐
+도착해야 시작한다. Spring이 중간 결과를 POST /analyze/interim으로 흘려 주면
+- 정규화한 발화(+ scene/장바구니/메뉴/최근 히스토리, 즉 response_cache_key)가 SPECULATION_STABLE_MS 동안
+  바뀌지 않을 때 call_llm을 미리 시작하고
+- 그 사이 발화가 실질적으로 바뀌면(정규화 결과가 달라지면) 대기 중이거나 진행 중인 호출을 취소하고 새로 건다
+- 최종 /analyze(또는 /analyze/stream)의 키가 같으면 이미 끝났거나 진행 중인 결과를 그대로 쓴다
+  (세션 저장은 최종 요청에서만 한다)
+
+세션별 상태는 프로세스 메모리에 있으므로 워커가 여러 개면 같은 sessionId의 요청이 같은 워커로 가야 적중한다
+(다른 워커로 가면 그냥 미스이고, 미리 건 호출은 낭비로 집계된다).
+"""
+import os
+import time
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+from .llm_client import call_llm_with_status, response_cache_key
+from .models import AnalyzeRequest, AnalyzeResponse
+from .text_norm import normalize_utterance
+
+logger = logging.getLogger(__name__)
+
+# --------------------------------------------------
+# 설정
+# - SPECULATION_ENABLED: false면 /analyze/interim을 무시하고 최종 요청도 항상 새로 분석
+# - SPECULATION_STABLE_MS: 중간 결과가 이 시간 동안 바뀌지 않아야 미리 호출 시작
+# - SPECULATION_MIN_CHARS: 정규화한 발화가 이보다 짧으면 시작하지 않음
+# - SPECULATION_TTL: 최종 요청이 오지 않은 미리 분석 결과를 버리기까지의 시간(초)
+# --------------------------------------------------
+SPECULATION_ENABLED = os.getenv("SPECULATION_ENABLED", "true").lower() == "true"
+SPECULATION_STABLE_MS = float(os.getenv("SPECULATION_STABLE_MS", "250"))
+SPECULATION_MIN_CHARS = int(os.getenv("SPECULATION_MIN_CHARS", "2"))
+SPECULATION_TTL = float(os.getenv("SPECULATION_TTL", "15"))
+
+
+class _Speculation:
+    __slots__ = ("key", "task", "created_at", "started_at")
+
+    def __init__(self, key: str):
+        self.key = key
+        self.task: Optional[asyncio.Task] = None
+        self.created_at = time.monotonic()
+        self.started_at: Optional[float] = None   # 디바운스가 끝나고 call_llm을 시작한 시각
+
+
+class Speculator:
+    """
+    sessionId → 진행 중인 미리 분석 하나.
+    (이벤트 루프 스레드 하나에서만 쓰므로 락은 두지 않는다)
+    """
+
+    def __init__(self):
+        self._by_session: Dict[str, _Speculation] = {}
+        self.interim = 0       # 받은 중간 결과 수
+        self.started = 0       # 디바운스를 넘겨 call_llm까지 간 수
+        self.finals = 0        # sessionId가 있는 최종 요청 수
+        self.hits = 0          # 미리 분석한 결과를 쓴 최종 요청 수
+        self.wasted = 0        # call_llm까지 갔지만 쓰이지 않은(취소/불일치/만료/fallback) 수
+        self.head_start_ms = 0.0  # 적중 시 미리 시작한 덕에 앞당긴 시간 합계
+
+    # ---------------------------------
+    # 중간 결과
+    # ---------------------------------
+    def offer(self, req: AnalyzeRequest) -> str:
+        """
+        중간 결과 하나를 반영한다. 반환: scheduled / unchanged / ignored / disabled
+        req는 세션/카탈로그가 채워진 요청이어야 한다 (최종 요청과 같은 키를 만들기 위해).
+        """
+        if not SPECULATION_ENABLED or not req.sessionId:
+            return "disabled"
+        self.interim += 1
+        self._expire()
+
+        if len(normalize_utterance(req.text)) < SPECULATION_MIN_CHARS:
+            return "ignored"
+        key = response_cache_key(req)
+        current = self._by_session.get(req.sessionId)
+        if current is not None:
+            if current.key == key:
+                return "unchanged"
+            self._discard(current)
+
+        spec = _Speculation(key)
+        spec.task = asyncio.create_task(self._run(spec, req))
+        self._by_session[req.sessionId] = spec
+        return "scheduled"
+
+    async def _run(self, spec: _Speculation, req: AnalyzeRequest) -> Tuple[AnalyzeResponse, bool]:
+        await asyncio.sleep(SPECULATION_STABLE_MS / 1000)
+        spec.started_at = time.monotonic()
+        self.started += 1
+        logger.info(f"[SPEC] start session={req.sessionId}, text={req.text}")
+        return await call_llm_with_status(req)
+
+    def _discard(self, spec: _Speculation) -> None:
+        if spec.started_at is not None:
+            self.wasted += 1
+        if not spec.task.done():
+            spec.task.cancel()
+
+    def _expire(self) -> None:
+        now = time.monotonic()
+        for session_id, spec in list(self._by_session.items()):
+            if now - spec.created_at > SPECULATION_TTL:
+                del self._by_session[session_id]
+                self._discard(spec)
+
+    # ---------------------------------
+    # 최종 요청
+    # ---------------------------------
+    async def take(self, req: AnalyzeRequest) -> Optional[AnalyzeResponse]:
+        """
+        최종 요청과 키가 같은 미리 분석이 있으면 그 결과 (진행 중이면 끝날 때까지 기다림).
+        없거나 다르면 None (호출 측에서 평소대로 분석). 어느 쪽이든 세션의 미리 분석은 비운다.
+        """
+        if not SPECULATION_ENABLED or not req.sessionId:
+            return None
+        self.finals += 1
+        spec = self._by_session.pop(req.sessionId, None)
+        if spec is None:
+            return None
+        if spec.key != response_cache_key(req) or spec.started_at is None:
+            # 발화가 달라졌거나, 아직 디바운스 중이라 미리 시작한 것이 없음 → 새로 분석하는 편이 빠르다
+            self._discard(spec)
+            return None
+
+        head_start = (time.monotonic() - spec.started_at) * 1000
+        try:
+            # shield: 최종 요청이 끊겨도 미리 분석 태스크 자체는 취소하지 않는다
+            response, fallback = await asyncio.shield(spec.task)
+        except asyncio.CancelledError:
+            if spec.task.cancelled():  # 미리 분석이 취소된 경우 (최종 요청 자체의 취소는 그대로 전파)
+                self.wasted += 1
+                return None
+            raise
+        except Exception as e:
+            logger.error(f"[SPEC] speculative analysis failed: {e}")
+            self.wasted += 1
+            return None
+        if fallback:
+            # 미리 건 호출이 일시적으로 실패했을 수 있으니 최종 요청은 다시 시도
+            self.wasted += 1
+            return None
+
+        self.hits += 1
+        self.head_start_ms += head_start
+        logger.info(f"[SPEC] hit session={req.sessionId}, head_start_ms={head_start:.0f}")
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": SPECULATION_ENABLED,
+            "pending": len(self._by_session),
+            "interim": self.interim,
+            "started": self.started,
+            "finals": self.finals,
+            "hits": self.hits,
+            "hit_rate": round(self.hits / self.finals, 3) if self.finals else 0.0,
+            "wasted_calls": self.wasted,
+            "avg_head_start_ms": round(self.head_start_ms / self.hits, 1) if self.hits else 0.0,
+        }
+
+
+async def replay(response: AnalyzeResponse) -> AsyncIterator[Tuple[str, Any]]:
+    """미리 분석한 결과를 stream_llm과 같은 이벤트로 (delta 한 번 + final)."""
+    yield "delta", {"text": response.assistant_text}
+    yield "final", response
+
+
+speculator = Speculator()
@@ -0,0 +1,39 @@
+# app/text_norm.py
+import re
+
+# 공백/문장부호 제거용 (한글, 영문, 숫자만 남김)
+_NON_WORD = re.compile(r"[^0-9a-z가-힣]+")
+
+# 발화 끝의 높임/요청 어미. 긴 것부터 검사해야 "주세요"가 "요"보다 먼저 잘림.
+_ENDINGS = tuple(sorted(
+    [
+        "주시겠어요", "주실래요", "주세요", "줄래요", "줘요", "줘",
+        "해주세요", "해줘요", "해줘", "할게요", "할께요", "할게", "할께",
+        "하겠습니다", "할래요", "할래", "해요", "입니다", "이요", "요",
+    ],
+    key=len,
+    reverse=True,
+))
+
+
+def compact(text: str) -> str:
+    """소문자화 + 공백/문장부호 제거."""
+    return _NON_WORD.sub("", text.lower())
+
+
+def normalize_utterance(text: str) -> str:
+    """
+    규칙 매칭/캐시 키용 발화 정규화.
+    - 공백, 문장부호 제거
+    - 끝의 높임/요청 어미 제거 ("콜라 주세요." → "콜라", "네 결제할게요" → "네결제")
+    """
+    s = compact(text)
+    stripped = True
+    while stripped and s:
+        stripped = False
+        for ending in _ENDINGS:
+            if s.endswith(ending) and len(s) > len(ending):
+                s = s[: -len(ending)]
+                stripped = True
+                break
+    return s
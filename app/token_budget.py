@@ -0,0 +1,72 @@
+# app/token_budget.py
+import os
+from typing import Dict, List, Tuple
+
+from .models import HistoryTurn
+from .tokens import estimate_tokens
+
+# --------------------------------------------------
+# 턴당 입력 토큰 예산 (섹션별 허용치)
+# - PROMPT_BUDGET_HISTORY: 이전 대화 히스토리 전체
+# - PROMPT_BUDGET_MENU: [주문 가능 메뉴 목록] 블록
+# - PROMPT_BUDGET_UTTERANCE: 이번 턴 사용자 발화
+# system 프롬프트와 장바구니는 줄이지 않는다 (정확성에 직접 영향).
+# --------------------------------------------------
+PROMPT_BUDGET_HISTORY = int(os.getenv("PROMPT_BUDGET_HISTORY", "600"))
+PROMPT_BUDGET_MENU = int(os.getenv("PROMPT_BUDGET_MENU", "4500"))
+PROMPT_BUDGET_UTTERANCE = int(os.getenv("PROMPT_BUDGET_UTTERANCE", "200"))
+
+# 메뉴 블록 축약 단계 (숫자가 클수록 짧음)
+# 0: 전체
+# 1: 보조 메뉴(장바구니/발화 매칭 외)의 영양요약 제거
+# 2: 모든 메뉴의 영양요약 제거
+# 3: 보조 메뉴의 재료/조절가능/알레르기 제거
+# 4: 3 + 예산을 넘는 보조 메뉴 행 자체를 뒤에서부터 제거
+MENU_DETAIL_LEVELS = (0, 1, 2, 3, 4)
+
+_ELLIPSIS = " … "
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    max_tokens를 넘는 문장을 앞/뒤만 남기고 가운데를 생략한다.
+    (긴 발화도 첫 요청과 마지막 정정이 모두 남도록)
+    """
+    if max_tokens <= 0:
+        return ""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+
+    lo, hi = 0, len(text) // 2
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        candidate = text[:mid] + _ELLIPSIS + text[-mid:]
+        if estimate_tokens(candidate) <= max_tokens:
+            lo = mid
+        else:
+            hi = mid - 1
+    return text[:lo] + _ELLIPSIS + text[-lo:] if lo else text[-1:]
+
+
+def fit_history(history: List[HistoryTurn], max_turns: int, max_tokens: int) -> Tuple[List[Dict[str, str]], int]:
+    """
+    최신 턴부터 거꾸로 담으면서 예산을 넘으면 더 오래된 턴은 버린다.
+    가장 최근 턴 하나가 혼자 예산을 넘으면 그 턴을 줄여서 담는다.
+    반환: (messages에 넣을 dict 리스트, 사용한 토큰 수)
+    """
+    kept: List[Dict[str, str]] = []
+    used = 0
+    for h in reversed(history[-max_turns:] if max_turns > 0 else []):
+        if h.role not in ("user", "assistant"):
+            continue
+        content = h.content
+        cost = estimate_tokens(content)
+        if used + cost > max_tokens:
+            if kept:
+                break
+            content = truncate_to_tokens(content, max_tokens)
+            cost = estimate_tokens(content)
+        kept.append({"role": h.role, "content": content})
+        used += cost
+    kept.reverse()
+    return kept, used
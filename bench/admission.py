@@ -0,0 +1,152 @@
+# bench/admission.py
+"""
+과부하에서 admission control(app.admission) 켬/끔 비교.
+
+업스트림은 프로세스 안의 가짜 클라이언트로, 동시에 --capacity개까지만 처리하고(나머지는 업스트림 안에서 줄을 섬)
+하나에 --llm-ms가 걸린다. 요청은 --rps로 --duration초 동안 포아송 도착시키고 (처리량보다 많게),
+매장 --stores곳에 고르게 나눠 ASGI로 /analyze를 직접 호출한다.
+
+우선순위(payment / order / small_talk)별로
+- ok: LLM 답을 받은 비율과 그 지연 p50/p95
+- shed: 대기열에서 포기하고 짧은 안내로 응답한 비율
+- fallback: 턴 마감(--deadline)에 걸려 오류 안내로 끝난 비율
+을 출력한다. admission을 끄면 모든 요청이 업스트림에서 기다리다 마감에 걸리는 것을 볼 수 있다.
+
+실행 예시:
+    python -m bench.admission --rps 60 --duration 10 --capacity 16 --llm-ms 500 --deadline 3
+"""
+import os
+import json
+import time
+import random
+import asyncio
+import argparse
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+os.environ["FAST_PATH_ENABLED"] = "false"
+os.environ["RESPONSE_CACHE_ENABLED"] = "false"
+os.environ["SPECULATION_ENABLED"] = "false"
+
+import httpx  # noqa: E402
+
+from app import admission, llm_client, resilience  # noqa: E402
+from app.main import create_app  # noqa: E402
+from app.models import AnalyzeRequest  # noqa: E402
+from app.settings import Settings  # noqa: E402
+
+from .payloads import PayloadFactory  # noqa: E402
+from .run import summarize  # noqa: E402
+from .stub_openai import _render_reply  # noqa: E402
+
+_SHED_TEXTS = frozenset(admission._SHED_TEXTS.values()) | {admission._SHED_DEFAULT_TEXT}
+_FALLBACK_TEXT = llm_client._build_safe_fallback_response(AnalyzeRequest(text="", scene="GREETING")).assistant_text
+
+
+class _BoundedCompletions:
+    """chat.completions.create 대역 (동시에 capacity개까지만 처리, 하나에 llm_ms)."""
+
+    def __init__(self, seed: int, llm_ms: float, capacity: int):
+        self.rng = random.Random(seed)
+        self.llm_ms = llm_ms
+        self.capacity = asyncio.Semaphore(capacity)
+        self.calls = 0
+
+    async def create(self, *, messages, **kwargs):
+        self.calls += 1
+        async with self.capacity:
+            await asyncio.sleep(self.llm_ms / 1000)
+        content = json.dumps(_render_reply(messages, self.rng), ensure_ascii=False)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+async def run_mode(args, enabled: bool) -> Dict[str, Any]:
+    admission.ADMISSION_ENABLED = enabled
+    controller = admission.AdmissionController(max_inflight=args.capacity, queue_size=args.queue_size)
+    admission.admission_controller = controller
+    llm_client.admission_controller = controller
+    resilience.default_policy.deadline = args.deadline
+    resilience.reset_breakers()  # 이전 모드에서 열린 서킷이 다음 모드에 넘어가지 않도록
+    resilience.latency_tracker = tracker = resilience.LatencyTracker()
+    admission.latency_tracker = tracker
+
+    app = create_app(Settings(openai_api_key="bench-dummy-key"))
+    completions = _BoundedCompletions(args.seed, args.llm_ms, args.capacity)
+    llm_client.set_llm_client(SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+
+    rng = random.Random(args.seed)
+    n = int(args.rps * args.duration)
+    bodies = PayloadFactory(seed=args.seed).make_many(n)
+    for i, body in enumerate(bodies):
+        body["storeId"] = f"store-{rng.randrange(args.stores)}"
+
+    outcomes: Dict[str, Dict[str, List[float]]] = {
+        name: {"ok": [], "shed": [], "fallback": []} for name in admission.PRIORITY_NAMES
+    }
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60.0) as http:
+        async def one(body):
+            priority = admission.PRIORITY_NAMES[admission.request_priority(AnalyzeRequest(**body))]
+            started = time.perf_counter()
+            response = await http.post("/analyze", json=body)
+            elapsed = (time.perf_counter() - started) * 1000
+            text = response.json()["assistant_text"]
+            kind = "shed" if text in _SHED_TEXTS else "fallback" if text == _FALLBACK_TEXT else "ok"
+            outcomes[priority][kind].append(elapsed)
+
+        tasks = []
+        for body in bodies:
+            tasks.append(asyncio.create_task(one(body)))
+            await asyncio.sleep(rng.expovariate(args.rps))
+        await asyncio.gather(*tasks)
+
+    llm_client.set_llm_client(None)
+    by_priority = {}
+    for name, kinds in outcomes.items():
+        total = sum(len(v) for v in kinds.values())
+        by_priority[name] = {
+            "requests": total,
+            "ok_rate": round(len(kinds["ok"]) / total, 3) if total else 0.0,
+            "shed_rate": round(len(kinds["shed"]) / total, 3) if total else 0.0,
+            "fallback_rate": round(len(kinds["fallback"]) / total, 3) if total else 0.0,
+            "ok_latency_ms": summarize(kinds["ok"]),
+        }
+    return {
+        "admission": enabled,
+        "by_priority": by_priority,
+        "upstream_calls": completions.calls,
+        "stats": controller.stats(),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="과부하에서 admission control 켬/끔 비교")
+    parser.add_argument("--rps", type=float, default=60.0, help="초당 도착 요청 수")
+    parser.add_argument("--duration", type=float, default=10.0, help="요청을 보내는 시간(초)")
+    parser.add_argument("--capacity", type=int, default=16, help="업스트림 동시 처리 수 (= ADMISSION_MAX_INFLIGHT)")
+    parser.add_argument("--queue-size", type=int, default=admission.ADMISSION_QUEUE_SIZE)
+    parser.add_argument("--llm-ms", type=float, default=500.0, help="가짜 업스트림 처리 시간")
+    parser.add_argument("--deadline", type=float, default=3.0, help="턴 마감 (LLM_TURN_DEADLINE)")
+    parser.add_argument("--stores", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", default=None)
+    args = parser.parse_args(argv)
+
+    results = [asyncio.run(run_mode(args, enabled)) for enabled in (False, True)]
+    for r in results:
+        print(f"admission={'on ' if r['admission'] else 'off'} upstream_calls={r['upstream_calls']} "
+              f"max_queue_depth={r['stats']['max_queue_depth']} avg_wait_ms={r['stats']['avg_wait_ms']}")
+        for name, p in r["by_priority"].items():
+            lat = p["ok_latency_ms"]
+            print(
+                f"  {name:<10} n={p['requests']:>4} ok={p['ok_rate']:>5} shed={p['shed_rate']:>5} "
+                f"fallback={p['fallback_rate']:>5} ok_p50={lat['p50'] or 0:>8.1f}ms ok_p95={lat['p95'] or 0:>8.1f}ms"
+            )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
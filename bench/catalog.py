@@ -0,0 +1,106 @@
+# bench/catalog.py
+"""
+메뉴 카탈로그 로딩 방식 비교: CSV 파싱 vs 컴파일된 카탈로그 파일 mmap (app.menu_pack).
+
+- load_ms: 워커 하나가 카탈로그를 쓸 수 있게 되기까지 걸리는 시간
+- warm_ms: 워밍업(아래) 시간. tracemalloc이 할당마다 비용을 더하므로 새로 읽은 카탈로그로 따로 잰다
+- heap_kb: 워커 프로세스 힙에 새로 잡히는 메모리 (tracemalloc, 워커 수만큼 곱해짐)
+  = 로딩 + 워밍업과 같은 일 (전체 메뉴 select(None)를 한 번 훑고, 플래그/추천 인덱스 생성)
+  mmap 쪽은 파일(file_kb)이 OS 페이지 캐시에 노드당 한 벌만 올라가고, 워커 힙에는 행 뷰(MappedMenuRow,
+  자주 읽는 필드 포함), 디코딩한 문자열, 인덱스(비트셋 / 점수 배열)만 남는다
+- --scale N: CSV 행을 menuId만 바꿔 N배로 늘려서 큰 카탈로그를 흉내
+
+실행 예시:
+    python -m bench.catalog --scale 50 --workers 8
+"""
+import os
+import csv
+import gc
+import io
+import time
+import argparse
+import tempfile
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, Tuple
+
+from app.menu_catalog import MENU_CSV_PATH, MenuCatalog, load_catalog
+from app.menu_filter import MenuFlagIndex
+from app.menu_pack import compile_catalog, load_compiled_catalog
+from app.recommender import RecommendIndex
+
+
+def _scaled_csv(src: Path, scale: int, out: Path) -> None:
+    rows = list(csv.DictReader(src.read_text(encoding="utf-8-sig").splitlines()))
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=list(rows[0].keys()))
+    writer.writeheader()
+    for k in range(scale):
+        for row in rows:
+            writer.writerow(dict(row, menu_id=row["menu_id"] if k == 0 else f"{row['menu_id']}_{k}"))
+    out.write_text(buf.getvalue(), encoding="utf-8")
+
+
+def _measure(fn: Callable[[], Any]) -> Tuple[Any, float, float]:
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = fn()
+    elapsed = (time.perf_counter() - started) * 1000
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, current / 1024
+
+
+def _warm(catalog: MenuCatalog) -> Tuple[Any, ...]:
+    """워밍업이 워커에 남기는 것 (인덱스 캐시를 거치지 않고 직접 만든다: 두 카탈로그의 버전이 같음)."""
+    menu = catalog.select(None)
+    for m in menu:
+        m.name, m.category, m.price
+    return menu, MenuFlagIndex(menu), RecommendIndex(menu)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="CSV vs 컴파일된 카탈로그(mmap) 로딩 비교")
+    parser.add_argument("--scale", type=int, default=1, help="카탈로그 행 수 배율")
+    parser.add_argument("--workers", type=int, default=8, help="노드당 워커 수 (메모리 합계 계산용)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = Path(tmp) / "menu.csv"
+        _scaled_csv(Path(MENU_CSV_PATH), max(1, args.scale), csv_path)
+        bin_path, _ = compile_catalog(csv_path, Path(tmp) / "menu_catalog.bin")
+
+        file_kb = os.path.getsize(bin_path) / 1024
+        results: Dict[str, Dict[str, float]] = {}
+        n = 0
+        for name, load, shared_kb in (
+            ("csv", lambda: load_catalog(csv_path), 0.0),
+            ("mmap", lambda: load_compiled_catalog(bin_path), file_kb),
+        ):
+            fresh = load()
+            started = time.perf_counter()
+            _warm(fresh)
+            warm_ms = (time.perf_counter() - started) * 1000
+            del fresh
+            catalog, load_ms, load_kb = _measure(load)
+            warmed, _, warm_kb = _measure(lambda: _warm(catalog))
+            n = len(catalog)
+            heap_kb = load_kb + warm_kb
+            results[name] = {
+                "load_ms": load_ms,
+                "warm_ms": warm_ms,
+                "heap_kb": heap_kb,
+                "node_kb": heap_kb * args.workers + shared_kb,
+            }
+            del catalog, warmed
+
+        print(f"items={n} workers={args.workers} csv_kb={csv_path.stat().st_size / 1024:.0f} file_kb={file_kb:.0f}")
+        for name, r in results.items():
+            print(f"  {name:<5} load={r['load_ms']:>8.1f}ms  warm={r['warm_ms']:>8.1f}ms  "
+                  f"heap/worker={r['heap_kb']:>9.0f}KB  node={r['node_kb']:>10.0f}KB")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,75 @@
+# bench/history.py
+"""
+히스토리 섹션 비교: 최근 MAX_HISTORY_TURNS개 원문 vs 대화 요약(app.dialogue_state) + 최근 원문.
+
+대화 길이(--turns)별로 가짜 세션을 만들고(첫 턴에 알레르기, 두 번째 턴에 "피클 빼 주세요"를 말하고
+이후엔 메뉴를 담는 발화), 각 방식의 히스토리 토큰 수와 첫 두 턴의 사실이 프롬프트에 남아 있는지를 출력한다.
+세션 경로(save_turn과 같은 update_dialogue_state)와 세션 없는 history 경로를 모두 잰다.
+
+실행 예시:
+    python -m bench.history --turns 2 6 12 20 40
+"""
+import random
+import argparse
+from typing import Dict, List
+
+from app.dialogue_state import compact_history, update_dialogue_state
+from app.llm_client import MAX_HISTORY_TURNS
+from app.menu_catalog import get_catalog
+from app.models import AnalyzeRequest, Customization, HistoryTurn, KioskAction
+from app.token_budget import PROMPT_BUDGET_HISTORY, fit_history
+
+from .payloads import _ASSISTANT_TURNS, _UTTERANCES
+
+
+def _session(n_turns: int, seed: int):
+    rng = random.Random(seed)
+    catalog = get_catalog()
+    burgers = [m for m in catalog.items if m.category == "BURGER"] or list(catalog.items)
+    index = catalog.by_id
+
+    history: List[HistoryTurn] = []
+    state = None
+    for i in range(n_turns):
+        item = rng.choice(burgers)
+        if i == 0:
+            user, actions = "저 우유 알레르기 있어요", [KioskAction(type="NONE")]
+        elif i == 1:
+            user = f"{item.name} 하나 피클 빼 주세요"
+            actions = [KioskAction(type="ADD_ITEM", menuId=item.menuId, qty=1, customize=Customization(remove=["피클"]))]
+        else:
+            user = rng.choice(_UTTERANCES["SELECT_BURGER"]).format(name=item.name)
+            actions = [KioskAction(type="ADD_ITEM", menuId=item.menuId, qty=1)]
+        assistant = rng.choice(_ASSISTANT_TURNS).format(name=item.name)
+        state = update_dialogue_state(state, user, assistant, actions, index)
+        history += [HistoryTurn(role="user", content=user), HistoryTurn(role="assistant", content=assistant)]
+    return history, state
+
+
+def _remembers(messages: List[Dict[str, str]]) -> str:
+    text = "\n".join(m["content"] for m in messages)
+    return ("우유" if "우유" in text else "-") + "/" + ("피클" if "피클" in text else "-")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="원문 히스토리 창 vs 대화 요약 토큰 비교")
+    parser.add_argument("--turns", type=int, nargs="+", default=[2, 6, 12, 20, 40])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    print(f"{'turns':>5}  {'raw_tokens':>10} {'raw_facts':>9}  {'session_tokens':>14} {'session_facts':>13}  "
+          f"{'stateless_tokens':>16} {'stateless_facts':>15}")
+    for n in args.turns:
+        history, state = _session(n, args.seed)
+        raw, raw_tokens = fit_history(history, MAX_HISTORY_TURNS, PROMPT_BUDGET_HISTORY)
+        session, session_tokens = compact_history(
+            AnalyzeRequest(text="", history=history, dialogueState=state), PROMPT_BUDGET_HISTORY
+        )
+        stateless, stateless_tokens = compact_history(AnalyzeRequest(text="", history=history), PROMPT_BUDGET_HISTORY)
+        print(f"{n:>5}  {raw_tokens:>10} {_remembers(raw):>9}  {session_tokens:>14} {_remembers(session):>13}  "
+              f"{stateless_tokens:>16} {_remembers(stateless):>15}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,119 @@
+# bench/payloads.py
+"""
+메뉴 마스터 CSV로 실제와 비슷한 /analyze 요청 바디를 만든다.
+- 화면(scene)마다 그 화면에서 나올 법한 발화를 메뉴 이름으로 채움
+- 장바구니 0~3개, 히스토리 0~6턴
+- menu_mode="catalog": menu를 비우고 서버 카탈로그 사용 (menuIds로 화면 메뉴 지정)
+- menu_mode="inline": 예전 Spring처럼 menu 배열을 통째로 보냄
+"""
+import random
+from typing import Any, Dict, List, Optional
+
+from app.menu_catalog import MENU_CSV_PATH, load_catalog
+from app.models import MenuItem
+
+SCENES = ("GREETING", "SELECT_BURGER", "CUSTOMIZE_BURGER", "SELECT_SIDE", "SELECT_DRINK", "CONFIRM")
+
+# 화면별로 보여주는 카테고리 (menuIds 구성용)
+_SCENE_MENU_CATEGORIES = {
+    "GREETING": None,
+    "SELECT_BURGER": ("BURGER", "SET"),
+    "CUSTOMIZE_BURGER": ("BURGER", "SET"),
+    "SELECT_SIDE": ("SIDE", "DESSERT"),
+    "SELECT_DRINK": ("DRINK", "DESSERT"),
+    "CONFIRM": None,
+}
+
+_UTTERANCES = {
+    "GREETING": [
+        "{name} 하나 주세요",
+        "안녕하세요 {name} 있어요?",
+        "뭐가 제일 잘 나가요?",
+        "가볍게 먹을 만한 거 추천해 주세요",
+    ],
+    "SELECT_BURGER": [
+        "{name}로 할게요",
+        "{name} 두 개 주세요",
+        "매운 거 말고 {name}으로 주세요",
+        "소고기 들어간 버거 중에 뭐가 괜찮아요?",
+    ],
+    "CUSTOMIZE_BURGER": [
+        "피클 빼 주세요",
+        "양파 빼고 치즈 추가해 주세요",
+        "그냥 그대로 주세요",
+    ],
+    "SELECT_SIDE": [
+        "{name} 추가해 주세요",
+        "사이드는 괜찮아요",
+        "감자튀김 말고 {name}으로요",
+    ],
+    "SELECT_DRINK": [
+        "{name}로 주세요",
+        "음료는 제로 콜라로 할게요",
+        "음료는 됐어요",
+    ],
+    "CONFIRM": [
+        "네 결제할게요",
+        "{name} 하나 빼 주세요",
+        "주문 내역 다시 알려 주세요",
+    ],
+}
+
+_ASSISTANT_TURNS = [
+    "안녕하세요! 어떤 메뉴로 도와드릴까요?",
+    "{name} 담아드렸어요. 사이드도 고르시겠어요?",
+    "음료는 어떤 걸로 하시겠어요?",
+]
+
+
+class PayloadFactory:
+    """CSV 카탈로그 기반 요청 생성기 (seed 고정 시 같은 순서로 재현 가능)."""
+
+    def __init__(self, csv_path=MENU_CSV_PATH, seed: Optional[int] = 0, menu_mode: str = "catalog"):
+        if menu_mode not in ("catalog", "inline"):
+            raise ValueError(f"unknown menu_mode: {menu_mode}")
+        self.catalog = load_catalog(csv_path)
+        self.menu_mode = menu_mode
+        self.rng = random.Random(seed)
+        self._by_category: Dict[str, List[MenuItem]] = {}
+        for m in self.catalog.items:
+            self._by_category.setdefault(m.category, []).append(m)
+
+    def _screen_menu(self, scene: str) -> List[MenuItem]:
+        categories = _SCENE_MENU_CATEGORIES.get(scene)
+        if not categories:
+            return list(self.catalog.items)
+        return [m for c in categories for m in self._by_category.get(c, [])]
+
+    def make(self, scene: Optional[str] = None) -> Dict[str, Any]:
+        rng = self.rng
+        scene = scene or rng.choice(SCENES)
+        screen_menu = self._screen_menu(scene) or list(self.catalog.items)
+        item = rng.choice(screen_menu)
+
+        cart_items = rng.sample(self.catalog.items, k=rng.randint(0, 3))
+        history = []
+        for i in range(rng.choice((0, 2, 4, 6))):
+            if i % 2 == 0:
+                text = rng.choice(_UTTERANCES["GREETING"]).format(name=rng.choice(self.catalog.items).name)
+                history.append({"role": "user", "content": text})
+            else:
+                text = rng.choice(_ASSISTANT_TURNS).format(name=rng.choice(self.catalog.items).name)
+                history.append({"role": "assistant", "content": text})
+
+        body: Dict[str, Any] = {
+            "text": rng.choice(_UTTERANCES[scene]).format(name=item.name),
+            "scene": scene,
+            "cart": {"items": [{"menuId": m.menuId, "qty": rng.randint(1, 2)} for m in cart_items]},
+            "history": history,
+        }
+        if self.menu_mode == "inline":
+            body["menu"] = [m.model_dump(exclude_none=True) for m in screen_menu]
+        else:
+            body["menuVersion"] = self.catalog.version
+            if _SCENE_MENU_CATEGORIES.get(scene):
+                body["menuIds"] = [m.menuId for m in screen_menu]
+        return body
+
+    def make_many(self, n: int) -> List[Dict[str, Any]]:
+        return [self.make() for _ in range(n)]
@@ -0,0 +1,111 @@
+# bench/recommend.py
+"""
+추천 점수 계산(app.recommender) 마이크로 벤치마크 (전체 카탈로그 기준).
+
+- index_build: RecommendIndex 생성 (특성 행렬 + 모든 의도 점수 + 정렬), 메뉴 리스트당 1회
+- top_k: 미리 정렬된 순위에서 k개 꺼내기 (요청마다 하는 일)
+- score_numpy: 임의 가중치 벡터로 전체 메뉴 점수 (X @ w)
+- score_python: 같은 계산을 MenuItem 속성으로 파이썬 루프를 돌려 한 것 (비교용)
+- detect_intent: 발화에서 의도 찾기
+
+실행 예시:
+    python -m bench.recommend --repeat 2000
+    python -m bench.recommend --repeat 2000 --scale 10   # 카탈로그를 10배로 복제해서
+"""
+import time
+import argparse
+from typing import Callable, Dict, List, Sequence
+
+import numpy as np
+
+from app.menu_catalog import MENU_CSV_PATH, load_catalog
+from app.models import MenuItem
+from app.recommender import (
+    FEATURES,
+    FLAG_FEATURES,
+    INTENTS,
+    NUMERIC_FEATURES,
+    RecommendIndex,
+    detect_intent,
+)
+
+_UTTERANCES = (
+    "가볍게 먹을 만한 거 추천해 주세요",
+    "배고파요 든든한 걸로",
+    "다이어트 중인데 뭐가 좋아요",
+    "제일 싼 거 뭐예요",
+    "콜라 하나 주세요",
+)
+
+
+def _timeit(fn: Callable[[], object], repeat: int) -> Dict[str, float]:
+    samples: List[float] = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1e6)
+    samples.sort()
+    return {
+        "p50_us": round(samples[len(samples) // 2], 2),
+        "p95_us": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 2),
+        "mean_us": round(sum(samples) / len(samples), 2),
+    }
+
+
+def _score_python(menu: Sequence[MenuItem], weights: Dict[str, float]) -> List[float]:
+    """feature_matrix + X @ w를 파이썬으로 그대로 옮긴 것."""
+    bounds = {}
+    for name in NUMERIC_FEATURES:
+        values = [getattr(m, name) for m in menu if getattr(m, name) is not None]
+        bounds[name] = (min(values), max(values)) if values else (0.0, 0.0)
+    scores = []
+    for m in menu:
+        total = 0.0
+        for name, w in weights.items():
+            if name in bounds:
+                v = getattr(m, name)
+                lo, hi = bounds[name]
+                x = 0.5 if v is None else (v - lo) / (hi - lo if hi > lo else 1.0)
+            elif name in FLAG_FEATURES:
+                x = 1.0 if getattr(m, name) else 0.0
+            else:
+                x = 1.0 if name[len("tag:"):] in m.tags else 0.0
+            total += w * x
+        scores.append(total)
+    return scores
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="추천 점수 계산 마이크로 벤치마크")
+    parser.add_argument("--repeat", type=int, default=1000)
+    parser.add_argument("--scale", type=int, default=1, help="카탈로그를 N배로 복제해서 잼")
+    parser.add_argument("--k", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    catalog = load_catalog(MENU_CSV_PATH)
+    menu = list(catalog.items) * max(1, args.scale)
+    index = RecommendIndex(menu)
+    intent = next(i for i in INTENTS if i.name == "diet")
+    w = intent.vector()
+
+    # 두 방식이 같은 점수를 내는지 먼저 확인
+    np.testing.assert_allclose(index.score(w), _score_python(menu, intent.weights), rtol=1e-4, atol=1e-4)
+
+    results = {
+        "index_build": _timeit(lambda: RecommendIndex(menu), max(1, args.repeat // 10)),
+        "top_k": _timeit(lambda: index.top_k(intent.name, args.k), args.repeat),
+        "score_numpy": _timeit(lambda: index.score(w), args.repeat),
+        "score_python": _timeit(lambda: _score_python(menu, intent.weights), args.repeat),
+        "detect_intent": _timeit(lambda: [detect_intent(t) for t in _UTTERANCES], args.repeat),
+    }
+
+    print(f"menus={len(menu)} features={len(FEATURES)} intents={len(INTENTS)} repeat={args.repeat}")
+    for name, r in results.items():
+        print(f"  {name:<14} p50={r['p50_us']:>10.2f}us  p95={r['p95_us']:>10.2f}us  mean={r['mean_us']:>10.2f}us")
+    for i in INTENTS:
+        print(f"  {i.name:<8} → {[m.menuId for m in index.top_k(i.name, args.k)]}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,417 @@
+# bench/run.py
+"""
+/analyze 부하 벤치마크.
+
+1) OpenAI 스텁 서버(bench.stub_openai)를 별도 프로세스로 띄우고
+2) 이 프로세스 안에서 uvicorn으로 app.main:app을 띄운 뒤 (단계별 시간 측정을 위해 in-process)
+3) CSV 기반 요청을 정해진 속도로 보내고 throughput / p50 / p95 / p99와
+   build_messages / JSON 파싱 / _normalize_actions / upstream 대기 시간을 나눠서 보고한다.
+
+결과는 JSON(-o)으로 저장되어 --compare로 이전 실행과 비교할 수 있다.
+
+실행 예시:
+    python -m bench.run --requests 500 --rate 50 --latency lognormal:600,0.35 -o bench_results.json
+    python -m bench.run --requests 500 --concurrency 64 --malformed-rate 0.05 --compare bench_results.json
+    python -m bench.run --target http://127.0.0.1:8000 --requests 200 --rate 20   # 이미 떠 있는 서버 (단계별 시간 없음)
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import datetime
+import threading
+import subprocess
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+
+from .payloads import PayloadFactory
+from .stub_openai import add_profile_arguments
+
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    k = min(len(values) - 1, max(0, int(round(p / 100 * (len(values) - 1)))))
+    return round(values[k], 3)
+
+
+def summarize(values: List[float]) -> Dict[str, Any]:
+    return {
+        "count": len(values),
+        "mean": round(sum(values) / len(values), 3) if values else None,
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": round(max(values), 3) if values else None,
+    }
+
+
+# ======================================
+# 단계별 시간 측정 (in-process 서버에서만)
+# ======================================
+
+class StageTimers:
+    """llm_client의 단계 함수들을 감싸 호출별 소요 시간(ms)을 모은다."""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+        self.fallbacks = 0
+        self._normalize_total = 0.0
+        self._enabled = False
+
+    def _record(self, name: str, ms: float) -> None:
+        if self._enabled:
+            self.samples.setdefault(name, []).append(ms)
+
+    def _wrap_sync(self, fn: Callable, name: str) -> Callable:
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self._record(name, (time.perf_counter() - started) * 1000)
+        return wrapper
+
+    def install(self) -> None:
+        from app import llm_client
+
+        build_messages = llm_client.build_messages
+        parse_completion = llm_client._parse_completion
+        normalize_actions = llm_client._normalize_actions
+        fallback = llm_client._build_safe_fallback_response
+        completions = llm_client.get_llm_client().chat.completions
+        create = completions.create
+
+        llm_client.build_messages = self._wrap_sync(build_messages, "build_messages")
+
+        def timed_normalize(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return normalize_actions(*args, **kwargs)
+            finally:
+                ms = (time.perf_counter() - started) * 1000
+                self._normalize_total += ms
+                self._record("normalize_actions", ms)
+
+        def timed_parse(*args, **kwargs):
+            started = time.perf_counter()
+            normalize_before = self._normalize_total
+            try:
+                return parse_completion(*args, **kwargs)
+            finally:
+                ms = (time.perf_counter() - started) * 1000
+                self._record("parse_completion", ms)
+                # JSON 디코딩 + 기본값 보정 + 모델 생성 (normalize 제외)
+                self._record("parse_excl_normalize", ms - (self._normalize_total - normalize_before))
+
+        def counted_fallback(*args, **kwargs):
+            if self._enabled:
+                self.fallbacks += 1
+            return fallback(*args, **kwargs)
+
+        async def timed_create(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await create(*args, **kwargs)
+            finally:
+                self._record("upstream", (time.perf_counter() - started) * 1000)
+
+        llm_client._normalize_actions = timed_normalize
+        llm_client._parse_completion = timed_parse
+        llm_client._build_safe_fallback_response = counted_fallback
+        completions.create = timed_create
+
+    def start(self) -> None:
+        self.samples.clear()
+        self.fallbacks = 0
+        self._enabled = True
+
+    def report(self) -> Dict[str, Any]:
+        return {name: summarize(values) for name, values in sorted(self.samples.items())}
+
+
+# ======================================
+# 서버 기동
+# ======================================
+
+def _wait_http(url: str, timeout: float = 15.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1.0).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"server did not start: {url}")
+
+
+def start_stub(args) -> subprocess.Popen:
+    cmd = [
+        sys.executable, "-m", "bench.stub_openai",
+        "--port", str(args.stub_port),
+        "--latency", args.latency,
+        "--timeout-rate", str(args.timeout_rate),
+        "--hang-ms", str(args.hang_ms),
+        "--error-rate", str(args.error_rate),
+        "--malformed-rate", str(args.malformed_rate),
+        "--bad-id-rate", str(args.bad_id_rate),
+        "--token-ms", str(args.token_ms),
+    ]
+    if args.reply:
+        cmd += ["--reply", args.reply]
+    if args.seed is not None:
+        cmd += ["--seed", str(args.seed)]
+    proc = subprocess.Popen(cmd, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    try:
+        _wait_http(f"http://127.0.0.1:{args.stub_port}/v1/models")
+    except Exception:
+        proc.terminate()
+        raise
+    return proc
+
+
+def start_app(args, timers: StageTimers):
+    """app.main:app을 이 프로세스의 별도 스레드에서 띄운다."""
+    import uvicorn
+
+    # llm_client import 전에 환경 변수를 맞춰 둔다
+    os.environ.setdefault("OPENAI_API_KEY", "bench-dummy-key")
+    os.environ["OPENAI_BASE_URL"] = args.stub_url or f"http://127.0.0.1:{args.stub_port}/v1"
+    os.environ["FAST_PATH_ENABLED"] = "true" if args.fast_path else "false"
+    os.environ["RESPONSE_CACHE_ENABLED"] = "true" if args.response_cache else "false"
+    os.environ["LLM_OUTPUT_FORMAT"] = args.output_format
+
+    from app.main import app
+
+    timers.install()
+    config = uvicorn.Config(app, host="127.0.0.1", port=args.app_port, log_level="warning")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    # 워밍업(카탈로그 / 프롬프트 조각 / 커넥션)까지 끝난 뒤부터 잰다
+    _wait_http(f"http://127.0.0.1:{args.app_port}/ready")
+    return server, thread
+
+
+# ======================================
+# 부하 생성
+# ======================================
+
+async def _send(http: httpx.AsyncClient, path: str, body: Dict[str, Any], stream: bool) -> Dict[str, Any]:
+    started = time.perf_counter()
+    result: Dict[str, Any] = {"status": None, "error": None, "ttfb_ms": None}
+    try:
+        if stream:
+            async with http.stream("POST", path, json=body) as resp:
+                result["status"] = resp.status_code
+                async for _ in resp.aiter_bytes():
+                    if result["ttfb_ms"] is None:
+                        result["ttfb_ms"] = (time.perf_counter() - started) * 1000
+        else:
+            resp = await http.post(path, json=body)
+            result["status"] = resp.status_code
+    except httpx.HTTPError as e:
+        result["error"] = type(e).__name__
+    result["latency_ms"] = (time.perf_counter() - started) * 1000
+    return result
+
+
+async def drive(args, payloads: List[Dict[str, Any]], base_url: str, on_measure_start: Callable[[], None]):
+    path = "/analyze/stream" if args.stream else "/analyze"
+    limits = httpx.Limits(max_connections=max(args.concurrency, 1) * 2, max_keepalive_connections=max(args.concurrency, 1))
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.client_timeout, limits=limits) as http:
+        for body in payloads[: args.warmup]:
+            await _send(http, path, body, args.stream)
+        measured = payloads[args.warmup:]
+        on_measure_start()
+
+        results: List[Dict[str, Any]] = []
+        started = time.perf_counter()
+
+        if args.rate > 0:
+            # open-loop: 응답을 기다리지 않고 정해진 도착 간격으로 보낸다 (fixed 또는 poisson)
+            rng = random.Random(args.seed)
+            in_flight = asyncio.Semaphore(args.max_in_flight)
+            tasks = []
+            next_at = started
+
+            async def fire(body):
+                async with in_flight:
+                    results.append(await _send(http, path, body, args.stream))
+
+            for body in measured:
+                delay = next_at - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                tasks.append(asyncio.create_task(fire(body)))
+                gap = rng.expovariate(args.rate) if args.arrival == "poisson" else 1.0 / args.rate
+                next_at += gap
+            await asyncio.gather(*tasks)
+        else:
+            # closed-loop: concurrency개의 가상 키오스크가 응답을 받자마자 다음 요청
+            queue = list(reversed(measured))
+
+            async def worker():
+                while queue:
+                    results.append(await _send(http, path, queue.pop(), args.stream))
+
+            await asyncio.gather(*(worker() for _ in range(max(1, args.concurrency))))
+
+        elapsed = time.perf_counter() - started
+    return results, elapsed
+
+
+def build_report(args, results, elapsed, timers: Optional[StageTimers], stub_stats) -> Dict[str, Any]:
+    ok = [r for r in results if r["status"] == 200]
+    statuses: Dict[str, int] = {}
+    for r in results:
+        key = str(r["status"]) if r["status"] is not None else (r["error"] or "unknown")
+        statuses[key] = statuses.get(key, 0) + 1
+
+    report: Dict[str, Any] = {
+        "label": args.label,
+        "started_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "config": {
+            "endpoint": "/analyze/stream" if args.stream else "/analyze",
+            "requests": len(results),
+            "warmup": args.warmup,
+            "rate": args.rate,
+            "arrival": args.arrival if args.rate > 0 else "closed",
+            "concurrency": args.concurrency,
+            "menu_mode": args.menu_mode,
+            "fast_path": args.fast_path,
+            "response_cache": args.response_cache,
+            "output_format": args.output_format,
+            "seed": args.seed,
+            "stub": None if args.target or args.stub_url else {
+                "latency": args.latency,
+                "timeout_rate": args.timeout_rate,
+                "error_rate": args.error_rate,
+                "malformed_rate": args.malformed_rate,
+                "bad_id_rate": args.bad_id_rate,
+                "token_ms": args.token_ms,
+            },
+        },
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(ok) / elapsed, 2) if elapsed else None,
+        "ok": len(ok),
+        "statuses": statuses,
+        "latency_ms": summarize([r["latency_ms"] for r in ok]),
+    }
+    if args.stream:
+        report["ttfb_ms"] = summarize([r["ttfb_ms"] for r in ok if r["ttfb_ms"] is not None])
+    if timers is not None:
+        from app.menu_fuzzy import menu_repair_stats
+        from app.resilience import resilience_stats_snapshot
+
+        report["fallbacks"] = timers.fallbacks
+        report["stages_ms"] = timers.report()
+        report["resilience"] = resilience_stats_snapshot()
+        report["menu_repair"] = menu_repair_stats.stats()
+    if stub_stats is not None:
+        report["stub_counters"] = stub_stats
+        answered = stub_stats["requests"] - stub_stats["timeouts"] - stub_stats["errors"]
+        if answered > 0 and "completion_tokens" in stub_stats:
+            report["output_tokens_avg"] = round(stub_stats["completion_tokens"] / answered, 1)
+    return report
+
+
+def print_summary(report: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None) -> None:
+    def line(name, cur, base):
+        if cur is None:
+            return
+        delta = ""
+        if base:
+            delta = f"  ({(cur - base) / base * 100:+.1f}% vs baseline {base})"
+        print(f"  {name:<28} {cur}{delta}", file=sys.stderr)
+
+    print(f"[BENCH] {report['label'] or ''} ok={report['ok']} statuses={report['statuses']}", file=sys.stderr)
+    line("throughput_rps", report["throughput_rps"], baseline and baseline.get("throughput_rps"))
+    for p in ("p50", "p95", "p99"):
+        line(f"latency_ms.{p}", report["latency_ms"][p], baseline and baseline["latency_ms"].get(p))
+    for stage, s in (report.get("stages_ms") or {}).items():
+        base = baseline and (baseline.get("stages_ms") or {}).get(stage, {}).get("p50")
+        line(f"{stage}.p50", s["p50"], base)
+    if "output_tokens_avg" in report:
+        line("output_tokens_avg", report["output_tokens_avg"], baseline and baseline.get("output_tokens_avg"))
+    if "fallbacks" in report:
+        line("fallbacks", report["fallbacks"], None)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="/analyze 부하 벤치마크 (OpenAI 스텁 사용)")
+    parser.add_argument("--requests", type=int, default=200, help="측정 요청 수 (warmup 제외)")
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--rate", type=float, default=0.0, help="초당 요청 수 (open-loop). 0이면 closed-loop")
+    parser.add_argument("--arrival", choices=["fixed", "poisson"], default="poisson")
+    parser.add_argument("--concurrency", type=int, default=16, help="closed-loop 동시 요청 수")
+    parser.add_argument("--max-in-flight", type=int, default=1000, help="open-loop에서 동시에 열어 둘 최대 요청 수")
+    parser.add_argument("--client-timeout", type=float, default=60.0)
+    parser.add_argument("--stream", action="store_true", help="/analyze/stream으로 보냄 (TTFB 포함)")
+    parser.add_argument("--menu-mode", choices=["catalog", "inline"], default="catalog")
+    parser.add_argument("--fast-path", action="store_true", help="규칙 기반 fast path 켜기 (기본 끔)")
+    parser.add_argument("--response-cache", action="store_true", help="응답 캐시 켜기 (기본 끔)")
+    parser.add_argument("--output-format", choices=["json", "compact"], default="json",
+                        help="LLM 출력 형식 (LLM_OUTPUT_FORMAT)")
+    parser.add_argument("--label", default="")
+    parser.add_argument("--stub-port", type=int, default=8900)
+    parser.add_argument("--stub-url", default=None, help="이미 떠 있는 스텁/업스트림 base URL (.../v1)")
+    parser.add_argument("--app-port", type=int, default=8901)
+    parser.add_argument("--target", default=None, help="이미 떠 있는 서비스 URL (단계별 시간 없음)")
+    parser.add_argument("-o", "--output", default=None, help="결과 JSON 경로")
+    parser.add_argument("--compare", default=None, help="비교할 이전 결과 JSON")
+    add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+
+    if args.seed is None:
+        args.seed = 0
+    payloads = PayloadFactory(seed=args.seed, menu_mode=args.menu_mode).make_many(args.requests + args.warmup)
+
+    stub = server = thread = None
+    timers: Optional[StageTimers] = None
+    stub_stats = None
+    try:
+        if args.target:
+            base_url = args.target.rstrip("/")
+        else:
+            if not args.stub_url:
+                stub = start_stub(args)
+            timers = StageTimers()
+            server, thread = start_app(args, timers)
+            base_url = f"http://127.0.0.1:{args.app_port}"
+
+        results, elapsed = asyncio.run(drive(args, payloads, base_url, timers.start if timers else (lambda: None)))
+
+        if stub is not None:
+            stub_stats = httpx.get(f"http://127.0.0.1:{args.stub_port}/stub/stats", timeout=5.0).json()
+    finally:
+        if server is not None:
+            server.should_exit = True
+            thread.join(timeout=10)
+        if stub is not None:
+            stub.terminate()
+            stub.wait(timeout=10)
+
+    report = build_report(args, results, elapsed, timers, stub_stats)
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_summary(report, baseline)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    else:
+        print(json.dumps(report, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+# bench/serialization.py
+"""
+요청/응답 직렬화 모드(app.serialization)별 요청당 CPU 시간 비교.
+
+업스트림은 프로세스 안의 가짜 클라이언트(bench.stub_openai의 응답 템플릿, 지연 0)로 바꾸고
+ASGI로 /analyze를 직접 호출해서, 요청 하나를 처리하는 데 쓴 CPU 시간(time.process_time)을 잰다.
+strict(STRICT_SERIALIZATION=true) / fast 모드 × 카탈로그 메뉴 / 인라인 메뉴 조합을 모두 돌린다.
+
+- decode: 요청 바디 → AnalyzeRequest
+- build_messages: 프롬프트 생성 (fast 모드면 인라인 메뉴 지연 검증 포함)
+- request: ASGI 호출 전체 (디코딩 ~ 응답 인코딩)
+
+fast path / 응답 캐시는 끄고 잰다 (항상 LLM 경로).
+공유 머신에서는 편차가 커서 --rounds번 돌린 것 중 평균이 가장 낮은 회차를 보고한다.
+
+실행 예시:
+    python -m bench.serialization --requests 300 --rounds 5
+    python -m bench.serialization --requests 300 -o serialization_results.json
+"""
+import os
+import gc
+import json
+import time
+import random
+import asyncio
+import argparse
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List
+
+os.environ["FAST_PATH_ENABLED"] = "false"
+os.environ["RESPONSE_CACHE_ENABLED"] = "false"
+
+import httpx  # noqa: E402
+
+from app import llm_client  # noqa: E402
+from app.main import create_app  # noqa: E402
+from app.menu_catalog import apply_catalog_menu  # noqa: E402
+from app.serialization import parse_analyze_request  # noqa: E402
+from app.settings import Settings  # noqa: E402
+
+from .payloads import PayloadFactory  # noqa: E402
+from .stub_openai import _render_reply  # noqa: E402
+
+
+class _FakeCompletions:
+    """chat.completions.create 대역 (네트워크 없이 템플릿 응답)."""
+
+    def __init__(self, seed: int):
+        self.rng = random.Random(seed)
+
+    async def create(self, *, messages, **kwargs):
+        content = json.dumps(_render_reply(messages, self.rng), ensure_ascii=False)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def _fake_client(seed: int):
+    return SimpleNamespace(chat=SimpleNamespace(completions=_FakeCompletions(seed)))
+
+
+def _cpu_us(fn: Callable[[], Any], items: List[Any]) -> Dict[str, float]:
+    gc.collect()
+    samples = []
+    for item in items:
+        started = time.process_time()
+        fn(item)
+        samples.append((time.process_time() - started) * 1e6)
+    samples.sort()
+    return {
+        "mean_us": round(sum(samples) / len(samples), 1),
+        "p50_us": round(samples[len(samples) // 2], 1),
+        "p95_us": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 1),
+    }
+
+
+async def _measure_requests(app, bodies: List[bytes]) -> Dict[str, float]:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+        headers = {"content-type": "application/json"}
+        for body in bodies[:10]:  # 워밍업 (캐시/인덱스)
+            await http.post("/analyze", content=body, headers=headers)
+        gc.collect()
+        samples = []
+        for body in bodies:
+            started = time.process_time()
+            response = await http.post("/analyze", content=body, headers=headers)
+            samples.append((time.process_time() - started) * 1e6)
+            if response.status_code != 200:
+                raise RuntimeError(f"/analyze returned {response.status_code}: {response.text[:200]}")
+    samples.sort()
+    return {
+        "mean_us": round(sum(samples) / len(samples), 1),
+        "p50_us": round(samples[len(samples) // 2], 1),
+        "p95_us": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 1),
+    }
+
+
+def run_mode(strict: bool, menu_mode: str, n: int, seed: int) -> Dict[str, Any]:
+    settings = Settings(openai_api_key="bench-dummy-key", strict_serialization=strict)
+    app = create_app(settings)
+    llm_client.set_llm_client(_fake_client(seed))
+
+    factory = PayloadFactory(seed=seed, menu_mode=menu_mode)
+    bodies = [json.dumps(b, ensure_ascii=False).encode("utf-8") for b in factory.make_many(n)]
+
+    def decode(body: bytes):
+        return apply_catalog_menu(parse_analyze_request(body))
+
+    result = {
+        "mode": "strict" if strict else "fast",
+        "menu_mode": menu_mode,
+        "body_bytes": round(sum(len(b) for b in bodies) / len(bodies)),
+        "decode": _cpu_us(decode, bodies),
+        # 지연 검증 결과가 남지 않도록 매번 새로 디코딩한 요청으로
+        "build_messages": _cpu_us(llm_client.build_messages, [decode(b) for b in bodies]),
+        "request": asyncio.run(_measure_requests(app, bodies)),
+    }
+    llm_client.set_llm_client(None)
+    return result
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="직렬화 모드별 요청당 CPU 시간")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--rounds", type=int, default=3, help="조합별 반복 횟수 (가장 좋은 회차를 보고)")
+    parser.add_argument("-o", "--output", default=None, help="결과 JSON 저장 경로")
+    args = parser.parse_args(argv)
+
+    best: Dict[Any, Dict[str, Any]] = {}
+    for _ in range(max(1, args.rounds)):
+        # 모드를 번갈아 돌려 머신 상태 변화가 한쪽에만 몰리지 않게
+        for menu_mode in ("catalog", "inline"):
+            for strict in (True, False):
+                r = run_mode(strict, menu_mode, args.requests, args.seed)
+                key = (menu_mode, strict)
+                if key in best:
+                    for stage in ("decode", "build_messages", "request"):
+                        if r[stage]["mean_us"] < best[key][stage]["mean_us"]:
+                            best[key][stage] = r[stage]
+                else:
+                    best[key] = r
+    results = list(best.values())
+
+    print(f"{'mode':<8}{'menu':<9}{'bytes':>8}  {'decode':>10}{'build':>10}{'request':>10}  (mean CPU us)")
+    for r in results:
+        print(
+            f"{r['mode']:<8}{r['menu_mode']:<9}{r['body_bytes']:>8}  "
+            f"{r['decode']['mean_us']:>10.1f}{r['build_messages']['mean_us']:>10.1f}{r['request']['mean_us']:>10.1f}"
+        )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
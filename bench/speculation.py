@@ -0,0 +1,127 @@
+# bench/speculation.py
+"""
+중간 STT 결과 미리 분석(app.speculation) 효과 측정.
+
+발화마다 단어를 하나씩 늘린 중간 결과를 --word-ms 간격으로 /analyze/interim에 보내고,
+마지막 중간 결과 뒤 --final-delay-ms(STT 종료 판정 + Spring 경유 시간)가 지나서 최종 /analyze를 보낸다.
+최종 요청을 보낸 뒤 응답을 받기까지의 시간(사용자가 체감하는 지연)을 미리 분석 켬/끔으로 비교한다.
+업스트림은 프로세스 안의 가짜 클라이언트(--llm-ms만큼 대기 후 템플릿 응답)이고, ASGI로 직접 호출한다.
+
+실행 예시:
+    python -m bench.speculation --sessions 40 --concurrency 8 --llm-ms 800
+"""
+import os
+import json
+import time
+import random
+import asyncio
+import argparse
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+os.environ["FAST_PATH_ENABLED"] = "false"
+os.environ["RESPONSE_CACHE_ENABLED"] = "false"
+
+import httpx  # noqa: E402
+
+from app import llm_client, speculation  # noqa: E402
+from app.main import create_app  # noqa: E402
+from app.settings import Settings  # noqa: E402
+
+from .payloads import PayloadFactory  # noqa: E402
+from .run import summarize  # noqa: E402
+from .stub_openai import _render_reply  # noqa: E402
+
+
+class _SlowCompletions:
+    """chat.completions.create 대역 (llm_ms 대기 후 템플릿 응답, 취소되면 중단)."""
+
+    def __init__(self, seed: int, llm_ms: float):
+        self.rng = random.Random(seed)
+        self.llm_ms = llm_ms
+        self.calls = 0
+
+    async def create(self, *, messages, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.llm_ms / 1000)
+        content = json.dumps(_render_reply(messages, self.rng), ensure_ascii=False)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+async def _session(http: httpx.AsyncClient, body: Dict[str, Any], args, speculate: bool) -> float:
+    words = body["text"].split()
+    if speculate:
+        for i in range(1, len(words) + 1):
+            await http.post("/analyze/interim", json=dict(body, text=" ".join(words[:i])))
+            await asyncio.sleep(args.word_ms / 1000)
+    else:
+        await asyncio.sleep(len(words) * args.word_ms / 1000)
+    await asyncio.sleep(args.final_delay_ms / 1000)
+
+    started = time.perf_counter()
+    response = await http.post("/analyze", json=body)
+    if response.status_code != 200:
+        raise RuntimeError(f"/analyze returned {response.status_code}: {response.text[:200]}")
+    return (time.perf_counter() - started) * 1000
+
+
+async def run_mode(args, speculate: bool) -> Dict[str, Any]:
+    speculation.SPECULATION_ENABLED = speculate
+    speculation.speculator = speculator = speculation.Speculator()
+    import app.main as main_module
+    main_module.speculator = speculator
+
+    app = create_app(Settings(openai_api_key="bench-dummy-key"))
+    completions = _SlowCompletions(args.seed, args.llm_ms)
+    llm_client.set_llm_client(SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+
+    bodies = PayloadFactory(seed=args.seed).make_many(args.sessions)
+    for i, body in enumerate(bodies):
+        body["sessionId"] = f"bench-{i}"
+
+    latencies: List[float] = []
+    semaphore = asyncio.Semaphore(args.concurrency)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=30.0) as http:
+        async def one(body):
+            async with semaphore:
+                latencies.append(await _session(http, body, args, speculate))
+
+        await asyncio.gather(*(one(b) for b in bodies))
+
+    llm_client.set_llm_client(None)
+    return {
+        "speculation": speculate,
+        "final_latency_ms": summarize(latencies),
+        "upstream_calls": completions.calls,
+        "stats": speculator.stats(),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="중간 STT 결과 미리 분석 켬/끔 비교")
+    parser.add_argument("--sessions", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--llm-ms", type=float, default=800.0, help="가짜 업스트림 응답 시간")
+    parser.add_argument("--word-ms", type=float, default=250.0, help="중간 결과 사이 간격 (단어 하나)")
+    parser.add_argument("--final-delay-ms", type=float, default=600.0, help="마지막 중간 결과 → 최종 요청 도착")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", default=None)
+    args = parser.parse_args(argv)
+
+    results = [asyncio.run(run_mode(args, speculate)) for speculate in (False, True)]
+    for r in results:
+        lat = r["final_latency_ms"]
+        print(
+            f"speculation={'on ' if r['speculation'] else 'off'} p50={lat['p50']:>8.1f}ms p95={lat['p95']:>8.1f}ms "
+            f"upstream_calls={r['upstream_calls']} hit_rate={r['stats']['hit_rate']} "
+            f"wasted={r['stats']['wasted_calls']}"
+        )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,310 @@
+# bench/stub_openai.py
+"""
+벤치마크용 OpenAI 호환 스텁 서버 (/v1/chat/completions).
+실제 API 비용 없이 서비스 오버헤드 / 동시성 한계를 재기 위한 용도.
+
+- 응답: 프롬프트의 [주문 가능 메뉴 목록]에서 menuId를 하나 골라 채운 템플릿 JSON (또는 --reply로 고정 응답)
+  system 프롬프트가 축약 출력 형식을 요구하면 같은 내용을 축약 형식(#번호, 기본값 생략)으로 낸다
+- 지연: fixed:<ms> / uniform:<min_ms>,<max_ms> / lognormal:<p50_ms>,<sigma>
+  + --token-ms × 생성 토큰 수 (출력 토큰 수에 비례하는 디코딩 시간 흉내)
+- usage.completion_tokens: app.tokens 추정치 (/stub/stats의 completion_tokens에 누적)
+- 실패: --timeout-rate(응답 없이 --hang-ms 동안 대기), --error-rate(HTTP 500), --malformed-rate(깨진 JSON)
+- --bad-id-rate: action의 menuId를 메뉴 이름 / 받침이 빠진 이름(STT 잡음) / O·0이 섞인 ID로 바꾸는 비율
+
+실행 예시:
+    python -m bench.stub_openai --port 8900 --latency lognormal:800,0.4 --malformed-rate 0.02
+"""
+import re
+import json
+import math
+import time
+import random
+import asyncio
+import argparse
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from app.tokens import estimate_tokens
+
+# 축약 출력 형식이면 줄 앞에 "#번호 "가 붙는다
+_MENU_ID_RE = re.compile(r"^(?:#\d+ )?\[([A-Za-z0-9_\-]+)\] ", re.MULTILINE)
+_COMPACT_MARKER = "[출력 형식: 축약]"
+_COMPACT_OPS = {"ADD_ITEM": "A", "REMOVE_ITEM": "R", "CUSTOMIZE": "C"}
+
+# 받침 하나를 떨어뜨린 음절 ("클" → "크"): STT 잡음 흉내
+_HANGUL_BASE = 0xAC00
+
+
+def _drop_tail(name: str, rng: random.Random) -> str:
+    positions = [i for i, ch in enumerate(name) if 0 <= ord(ch) - _HANGUL_BASE < 11172 and (ord(ch) - _HANGUL_BASE) % 28]
+    if not positions:
+        return name
+    i = rng.choice(positions)
+    code = ord(name[i]) - _HANGUL_BASE
+    return name[:i] + chr(_HANGUL_BASE + code - code % 28) + name[i + 1:]
+
+
+def _bad_menu_id(menu_id: str, name: str, rng: random.Random) -> str:
+    kind = rng.randrange(3)
+    if kind == 0:
+        return name
+    if kind == 1:
+        return _drop_tail(name, rng)
+    return menu_id.lower().replace("0", "o", 1)
+
+
+_TEMPLATES = [
+    ("{name} 하나 담아드렸어요. 더 필요하신 건 없으세요?", "ADD_ITEM"),
+    ("{name} 말씀이시죠? 장바구니에 넣어드렸어요.", "ADD_ITEM"),
+    ("{name}은 인기 메뉴예요. 이걸로 하시겠어요?", None),
+]
+
+
+@dataclass
+class LatencyProfile:
+    kind: str = "fixed"
+    a: float = 0.0
+    b: float = 0.0
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyProfile":
+        kind, _, args = spec.partition(":")
+        values = [float(v) for v in args.split(",") if v] if args else []
+        if kind == "fixed":
+            return cls(kind, values[0] if values else 0.0)
+        if kind in ("uniform", "lognormal") and len(values) == 2:
+            return cls(kind, values[0], values[1])
+        raise ValueError(f"unknown latency spec: {spec}")
+
+    def sample_ms(self, rng: random.Random) -> float:
+        if self.kind == "uniform":
+            return rng.uniform(self.a, self.b)
+        if self.kind == "lognormal":
+            # a = 중앙값(ms), b = sigma
+            return rng.lognormvariate(math.log(max(self.a, 1e-3)), self.b)
+        return self.a
+
+
+@dataclass
+class StubProfile:
+    latency: LatencyProfile
+    timeout_rate: float = 0.0
+    error_rate: float = 0.0
+    malformed_rate: float = 0.0
+    bad_id_rate: float = 0.0
+    hang_ms: float = 30000.0
+    stream_chunk_chars: int = 8
+    stream_interval_ms: float = 15.0
+    token_ms: float = 0.0
+    reply: Optional[Dict[str, Any]] = None
+    seed: Optional[int] = None
+
+
+def _extract_menu_ids(messages: List[Dict[str, Any]]) -> List[str]:
+    for m in messages:
+        if m.get("role") == "user" and "[주문 가능 메뉴 목록]" in (m.get("content") or ""):
+            return _MENU_ID_RE.findall(m["content"])
+    return []
+
+
+def _extract_menu_name(messages: List[Dict[str, Any]], menu_id: str) -> str:
+    for m in messages:
+        content = m.get("content") or ""
+        idx = content.find(f"[{menu_id}] ")
+        if idx >= 0:
+            line = content[idx + len(menu_id) + 3:].split("\n", 1)[0]
+            return line.split(" / ", 1)[0]
+    return "메뉴"
+
+
+def _render_reply(messages: List[Dict[str, Any]], rng: random.Random) -> Dict[str, Any]:
+    menu_ids = _extract_menu_ids(messages)
+    if not menu_ids:
+        return {
+            "assistant_text": "원하시는 메뉴를 말씀해 주세요.",
+            "actions": [{"type": "NONE"}],
+            "should_finish": False,
+            "next_scene": "GREETING",
+        }
+    menu_id = rng.choice(menu_ids)
+    template, action_type = rng.choice(_TEMPLATES)
+    actions = [{"type": action_type, "menuId": menu_id, "qty": 1}] if action_type else [{"type": "NONE"}]
+    return {
+        "assistant_text": template.format(name=_extract_menu_name(messages, menu_id)),
+        "actions": actions,
+        "should_finish": False,
+        "next_scene": "SELECT_SIDE" if action_type else "SELECT_BURGER",
+    }
+
+
+def _compact_reply(messages: List[Dict[str, Any]], reply: Dict[str, Any]) -> Dict[str, Any]:
+    """_render_reply 결과를 축약 출력 형식으로 (llm_client._expand_compact의 역)."""
+    menu_ids = _extract_menu_ids(messages)
+    out: Dict[str, Any] = {"t": reply.get("assistant_text", "")}
+    actions = []
+    for a in reply.get("actions") or []:
+        op = _COMPACT_OPS.get(a.get("type"))
+        if op is None:
+            continue
+        # 목록에 없는 값(--bad-id-rate로 망가뜨린 ID/이름)은 번호 대신 문자열 그대로
+        ref = menu_ids.index(a["menuId"]) + 1 if a.get("menuId") in menu_ids else a.get("menuId")
+        action: Dict[str, Any] = {"o": op, "i": ref}
+        if a.get("qty", 1) != 1:
+            action["q"] = a["qty"]
+        actions.append(action)
+    if actions:
+        out["a"] = actions
+    if reply.get("should_finish"):
+        out["f"] = 1
+    if reply.get("next_scene"):
+        out["n"] = reply["next_scene"]
+    return out
+
+
+def _wants_compact(messages: List[Dict[str, Any]]) -> bool:
+    return any(m.get("role") == "system" and _COMPACT_MARKER in (m.get("content") or "") for m in messages)
+
+
+def create_stub_app(profile: StubProfile) -> FastAPI:
+    app = FastAPI(title="OpenAI stub")
+    rng = random.Random(profile.seed)
+    counters = {"requests": 0, "timeouts": 0, "errors": 0, "malformed": 0, "bad_ids": 0, "completion_tokens": 0}
+
+    @app.get("/v1/models")
+    async def models():
+        return {"object": "list", "data": [{"id": "stub", "object": "model"}]}
+
+    @app.get("/stub/stats")
+    async def stats():
+        return counters
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        model = body.get("model", "stub")
+        messages = body.get("messages") or []
+        counters["requests"] += 1
+
+        roll = rng.random()
+        if roll < profile.timeout_rate:
+            counters["timeouts"] += 1
+            await asyncio.sleep(profile.hang_ms / 1000)
+            return JSONResponse({"error": {"message": "stub timeout"}}, status_code=504)
+        roll -= profile.timeout_rate
+
+        await asyncio.sleep(profile.latency.sample_ms(rng) / 1000)
+
+        if roll < profile.error_rate:
+            counters["errors"] += 1
+            return JSONResponse({"error": {"message": "stub error", "type": "server_error"}}, status_code=500)
+        roll -= profile.error_rate
+
+        reply = profile.reply or _render_reply(messages, rng)
+        if profile.bad_id_rate and rng.random() < profile.bad_id_rate:
+            for a in reply.get("actions") or []:
+                if a.get("menuId"):
+                    counters["bad_ids"] += 1
+                    a["menuId"] = _bad_menu_id(a["menuId"], _extract_menu_name(messages, a["menuId"]), rng)
+        if _wants_compact(messages) and "t" not in reply:
+            reply = _compact_reply(messages, reply)
+        content = json.dumps(reply, ensure_ascii=False, separators=(",", ":"))
+        if roll < profile.malformed_rate:
+            counters["malformed"] += 1
+            # 잘린 JSON (max_tokens에 걸린 것처럼)
+            content = content[: max(1, len(content) // 2)]
+
+        prompt_tokens = sum(estimate_tokens(m.get("content") or "") for m in messages)
+        completion_tokens = estimate_tokens(content)
+        counters["completion_tokens"] += completion_tokens
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        if profile.token_ms and not body.get("stream"):
+            await asyncio.sleep(completion_tokens * profile.token_ms / 1000)
+        created = int(time.time())
+
+        if body.get("stream"):
+            async def chunks():
+                step = max(1, profile.stream_chunk_chars)
+                per_chunk_ms = profile.stream_interval_ms + profile.token_ms * completion_tokens * step / max(1, len(content))
+                for i in range(0, len(content), step):
+                    chunk = {
+                        "id": "stub", "object": "chat.completion.chunk", "created": created, "model": model,
+                        "choices": [{"index": 0, "delta": {"content": content[i:i + step]}, "finish_reason": None}],
+                    }
+                    yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+                    if per_chunk_ms:
+                        await asyncio.sleep(per_chunk_ms / 1000)
+                done = {
+                    "id": "stub", "object": "chat.completion.chunk", "created": created, "model": model,
+                    "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                }
+                yield f"data: {json.dumps(done)}\n\n"
+                yield "data: [DONE]\n\n"
+
+            return StreamingResponse(chunks(), media_type="text/event-stream")
+
+        return {
+            "id": "stub",
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": usage,
+        }
+
+    return app
+
+
+def add_profile_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--latency", default="lognormal:600,0.35",
+                        help="fixed:<ms> | uniform:<min>,<max> | lognormal:<p50_ms>,<sigma>")
+    parser.add_argument("--timeout-rate", type=float, default=0.0, help="응답하지 않고 매달리는 비율")
+    parser.add_argument("--hang-ms", type=float, default=30000.0, help="타임아웃 케이스에서 매달리는 시간")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="HTTP 500 비율")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="잘린 JSON을 돌려주는 비율")
+    parser.add_argument("--bad-id-rate", type=float, default=0.0,
+                        help="menuId를 이름/잡음 섞인 이름/틀린 ID로 바꾸는 비율 (menuId 복구 측정용)")
+    parser.add_argument("--token-ms", type=float, default=0.0,
+                        help="생성 토큰당 추가 지연(ms). 출력 형식(json/compact)별 지연 비교용")
+    parser.add_argument("--reply", default=None, help="고정 응답 JSON 파일 경로 (생략 시 템플릿 응답)")
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def profile_from_args(args) -> StubProfile:
+    reply = None
+    if args.reply:
+        with open(args.reply, encoding="utf-8") as f:
+            reply = json.load(f)
+    return StubProfile(
+        latency=LatencyProfile.parse(args.latency),
+        timeout_rate=args.timeout_rate,
+        error_rate=args.error_rate,
+        malformed_rate=args.malformed_rate,
+        bad_id_rate=args.bad_id_rate,
+        hang_ms=args.hang_ms,
+        token_ms=args.token_ms,
+        reply=reply,
+        seed=args.seed,
+    )
+
+
+def main(argv=None) -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="OpenAI 호환 스텁 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+
+    uvicorn.run(create_stub_app(profile_from_args(args)), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
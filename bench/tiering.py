@@ -0,0 +1,141 @@
+# bench/tiering.py
+"""
+턴별 모델 티어(app.model_tiering) 켬/끔 비교.
+
+업스트림은 프로세스 안의 가짜 클라이언트로, model 값에 따라
+- 큰 모델(OPENAI_MODEL): --large-ms 대기 후 템플릿 응답
+- 작은 모델(LLM_SMALL_MODEL): --small-ms 대기 후 템플릿 응답, --small-invalid-rate 확률로 깨진 JSON,
+  --small-bad-id-rate 확률로 메뉴에 없는 menuId (복구도 안 되는 값)
+을 돌려준다. PayloadFactory 요청을 --concurrency개씩 ASGI로 /analyze에 보내
+전체 / scene별 지연, 티어별 턴 수와 escalation 비율, 모델별 호출 수를 출력한다.
+
+실행 예시:
+    python -m bench.tiering --requests 300 --small-ms 250 --large-ms 900 --small-invalid-rate 0.05
+"""
+import os
+import json
+import time
+import random
+import asyncio
+import argparse
+from collections import Counter
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+os.environ["FAST_PATH_ENABLED"] = "false"
+os.environ["RESPONSE_CACHE_ENABLED"] = "false"
+os.environ["SPECULATION_ENABLED"] = "false"
+
+import httpx  # noqa: E402
+
+from app import llm_client, model_tiering, resilience  # noqa: E402
+from app.main import create_app  # noqa: E402
+from app.settings import Settings  # noqa: E402
+
+from .payloads import PayloadFactory  # noqa: E402
+from .run import summarize  # noqa: E402
+from .stub_openai import _render_reply  # noqa: E402
+
+_LARGE_MODEL = "bench-large"
+_SMALL_MODEL = "bench-small"
+
+
+class _TieredCompletions:
+    """chat.completions.create 대역 (모델별 지연, 작은 모델만 가끔 깨진 JSON / 없는 menuId)."""
+
+    def __init__(self, args):
+        self.rng = random.Random(args.seed)
+        self.args = args
+        self.calls: Counter = Counter()
+        self.broken: Counter = Counter()
+
+    async def create(self, *, model, messages, **kwargs):
+        self.calls[model] += 1
+        small = model == _SMALL_MODEL
+        await asyncio.sleep((self.args.small_ms if small else self.args.large_ms) / 1000)
+        reply = _render_reply(messages, self.rng)
+        if small and self.rng.random() < self.args.small_invalid_rate:
+            self.broken["invalid_json"] += 1
+            content = '{"assistant_text": "네, '
+        else:
+            if small and self.rng.random() < self.args.small_bad_id_rate:
+                for a in reply["actions"]:
+                    if a.get("menuId"):
+                        a["menuId"] = "X999"
+                        self.broken["bad_id"] += 1
+            content = json.dumps(reply, ensure_ascii=False)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+async def run_mode(args, tiered: bool) -> Dict[str, Any]:
+    model_tiering.tiering_stats = stats = model_tiering.TieringStats()
+    llm_client.tiering_stats = stats
+    resilience.reset_breakers()
+
+    app = create_app(Settings(
+        openai_api_key="bench-dummy-key",
+        openai_model=_LARGE_MODEL,
+        llm_small_model=_SMALL_MODEL if tiered else None,
+    ))
+    completions = _TieredCompletions(args)
+    llm_client.set_llm_client(SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+
+    bodies = PayloadFactory(seed=args.seed).make_many(args.requests)
+    latencies: List[float] = []
+    by_scene: Dict[str, List[float]] = {}
+    sem = asyncio.Semaphore(args.concurrency)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60.0) as http:
+        async def one(body):
+            async with sem:
+                started = time.perf_counter()
+                response = await http.post("/analyze", json=body)
+                elapsed = (time.perf_counter() - started) * 1000
+            if response.status_code != 200:
+                raise RuntimeError(f"/analyze returned {response.status_code}: {response.text[:200]}")
+            latencies.append(elapsed)
+            by_scene.setdefault(body["scene"], []).append(elapsed)
+
+        await asyncio.gather(*(one(body) for body in bodies))
+
+    llm_client.set_llm_client(None)
+    return {
+        "tiering": tiered,
+        "latency_ms": summarize(latencies),
+        "by_scene_p50_ms": {scene: summarize(v)["p50"] for scene, v in sorted(by_scene.items())},
+        "upstream_calls": dict(completions.calls),
+        "small_broken": dict(completions.broken),
+        "stats": stats.stats(),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="턴별 모델 티어 켬/끔 비교")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--small-ms", type=float, default=250.0, help="작은 모델 응답 시간")
+    parser.add_argument("--large-ms", type=float, default=900.0, help="큰 모델 응답 시간")
+    parser.add_argument("--small-invalid-rate", type=float, default=0.05, help="작은 모델이 JSON을 깨뜨리는 확률")
+    parser.add_argument("--small-bad-id-rate", type=float, default=0.05, help="작은 모델이 없는 menuId를 내는 확률")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", default=None)
+    args = parser.parse_args(argv)
+
+    results = [asyncio.run(run_mode(args, tiered)) for tiered in (False, True)]
+    for r in results:
+        lat, s = r["latency_ms"], r["stats"]
+        print(f"tiering={'on ' if r['tiering'] else 'off'} p50={lat['p50']:.1f}ms p95={lat['p95']:.1f}ms "
+              f"calls={r['upstream_calls']} turns={s['turns']} escalation_rate={s['escalation_rate']}")
+        print(f"  by_scene_p50_ms={r['by_scene_p50_ms']}")
+        if r["tiering"]:
+            print(f"  reasons={s['reasons']} escalations={s['escalations']} small_broken={r['small_broken']}")
+            print(f"  avg_turn_ms={s['avg_turn_ms']}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())